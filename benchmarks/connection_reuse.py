@@ -0,0 +1,67 @@
+# benchmarks/connection_reuse.py
+"""
+Latencia por invocación con conexión abierta/cerrada por request (antes)
+vs. conexión reutilizada entre invocaciones warm (shared/connection.py).
+
+Usa la misma configuración que los handlers (DB_NAME, DB_USER, DB_PASSWORD,
+DB_HOST, DB_PORT). Contra Postgres/RDS la diferencia es el handshake
+TCP + TLS + auth; sin DB_NAME corre contra SQLite en memoria y solo sirve
+para probar el script.
+
+    python -m benchmarks.connection_reuse --invocations 200
+"""
+import argparse
+import statistics
+import time
+
+from shared.connection import db_connection, get_manager, reset_managers
+from shared.models import db
+
+
+def invocation():
+    """Cuerpo típico de un handler: una consulta corta."""
+    db.execute_sql("SELECT 1").fetchone()
+
+
+def run(invocations: int, keep_alive: bool):
+    reset_managers()
+    manager = get_manager(db)
+    manager.keep_alive = keep_alive
+    handler = db_connection(db)(invocation)
+
+    if not db.is_closed():
+        db.close()
+
+    timings = []
+    for _ in range(invocations):
+        start = time.perf_counter()
+        handler()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, manager.connects
+
+
+def summary(name: str, result):
+    timings, connects = result
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{name:<28} p50={statistics.median(ordered):8.3f} ms  "
+          f"p95={p95:8.3f} ms  mean={statistics.mean(ordered):8.3f} ms  "
+          f"conexiones={connects}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"Base de datos: {type(db).__name__} ({db.database})")
+    summary("connect/close por request", run(args.invocations, keep_alive=False))
+    summary("conexión reutilizada", run(args.invocations, keep_alive=True))
+
+    if not db.is_closed():
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
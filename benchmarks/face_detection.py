@@ -0,0 +1,70 @@
+# benchmarks/face_detection.py
+"""
+Latencia y precisión de extract_embedding: resolución completa (antes)
+vs. decodificación reducida + detección sobre imagen chica (ahora).
+
+Recibe una carpeta con fotos JPEG de rostros (no se versionan fotos de
+personas en el repo). Para cada configuración informa la mediana y p95 de
+latencia, cuántas fotos encontraron rostro y la distancia entre su embedding
+y el de resolución completa (face_recognition considera misma persona por
+debajo de 0.6).
+
+    python -m benchmarks.face_detection --images ./fotos --detect-max-side 480,640,800
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.face_service import extract_embedding
+
+
+def run(images, encode_max_side: int, detect_max_side: int):
+    timings, embeddings = [], []
+    for data in images:
+        start = time.perf_counter()
+        try:
+            embeddings.append(np.array(extract_embedding(data, encode_max_side, detect_max_side)))
+        except ValueError:
+            embeddings.append(None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, embeddings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", required=True, type=Path)
+    parser.add_argument("--encode-max-side", type=int, default=1600)
+    parser.add_argument("--detect-max-side", default="480,640,800",
+                        help="Valores separados por coma")
+    args = parser.parse_args(argv)
+
+    paths = sorted(p for p in args.images.iterdir()
+                   if p.suffix.lower() in (".jpg", ".jpeg"))
+    images = [p.read_bytes() for p in paths]
+    if not images:
+        parser.error(f"No hay JPEGs en {args.images}")
+
+    baseline_timings, baseline = run(images, 0, 0)
+    configs = [(0, 0, baseline_timings, baseline)]
+    for detect in (int(v) for v in args.detect_max_side.split(",")):
+        configs.append((args.encode_max_side, detect, *run(images, args.encode_max_side, detect)))
+
+    print(f"{len(images)} imágenes")
+    print(f"{'encode':>7} {'detect':>7} {'p50 ms':>8} {'p95 ms':>8} {'rostros':>8} "
+          f"{'dist. media':>11} {'dist. máx':>10}")
+    for encode, detect, timings, embeddings in configs:
+        found = sum(e is not None for e in embeddings)
+        distances = [float(np.linalg.norm(e - b)) for e, b in zip(embeddings, baseline)
+                     if e is not None and b is not None]
+        p95 = sorted(timings)[int(0.95 * (len(timings) - 1))]
+        print(f"{encode or 'full':>7} {detect or 'full':>7} {statistics.median(timings):>8.1f} "
+              f"{p95:>8.1f} {found:>8} "
+              f"{statistics.mean(distances) if distances else 0:>11.4f} "
+              f"{max(distances) if distances else 0:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
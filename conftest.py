@@ -50,3 +50,26 @@ def set_db_env_vars(monkeypatch):
 
     yield
     # No es necesario limpiar: pytest revierte monkeypatch automáticamente.
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    """Las caches por contenedor (shared.cache) no deben filtrarse entre tests."""
+    from shared.cache import clear_all
+    clear_all()
+    yield
+    clear_all()
+
+
+@pytest.fixture(autouse=True)
+def close_db_after_test():
+    """
+    En Lambda la conexión queda abierta entre invocaciones (shared.connection);
+    entre tests se cierra para que cada fixture arranque con la BD cerrada.
+    """
+    yield
+    from shared.connection import reset_managers
+    from shared.models import db
+    reset_managers()
+    if not db.is_closed():
+        db.close()
@@ -0,0 +1,62 @@
+# handlers/build_device_snapshot.py
+import logging
+import os
+
+import boto3
+from botocore.config import Config
+
+from shared.models import db
+from shared.connection import db_connection
+from services.device_snapshot_service import DeviceSnapshotService
+from services.iot_publisher import max_concurrency
+from repositories.device_repo import DeviceRepository
+from repositories.device_user_mapping_repo import DeviceUserMappingRepository
+from repositories.outbox_repo import get_outbox
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+_endpoint = os.environ.get("IOT_ENDPOINT") or "localhost"
+_iot = boto3.client(
+    "iot-data",
+    endpoint_url=_endpoint if _endpoint.startswith("http") else f"https://{_endpoint}",
+    config=Config(max_pool_connections=max_concurrency())
+)
+_device_repo = DeviceRepository()
+_service = DeviceSnapshotService(
+    _device_repo,
+    DeviceUserMappingRepository(),
+    outbox=get_outbox(),
+    iot=_iot
+)
+
+
+@db_connection(db)
+def lambda_handler(event, context):
+    """
+    Genera snapshots de galería. Evento:
+    - {"location": "FCEE"} o {"locations": [...]}: esos dispositivos
+    - sin ubicaciones: todos los dispositivos, y después se purga el log de
+      cambios más antiguo que DEVICE_SYNC_RETENTION_DAYS
+    - "notify": false para solo refrescar el snapshot sin avisar (por defecto true)
+    """
+    event = event or {}
+    locations = event.get("locations") or ([event["location"]] if event.get("location") else None)
+    prune = locations is None
+    if locations is None:
+        locations = [device.location for device in _device_repo.get_all()]
+    notify = event.get("notify", True)
+
+    built, failed = [], {}
+    for location in locations:
+        try:
+            built.append(_service.build(location, notify=notify))
+        except Exception as e:
+            logger.exception(f"Error generando snapshot de {location}")
+            failed[location] = str(e)
+
+    result = {"snapshots": built, "failed": failed}
+    if prune:
+        # Los snapshots recién generados cubren lo purgado
+        result["pruned"] = _service.sync.prune_changes()
+    return result
@@ -2,25 +2,24 @@
 import json
 import logging
 from shared.models import db
+from shared.connection import db_connection
 from services.access_users_service import AccessUserService
 from repositories.access_user_repo import AccessUserRepository
+from repositories.outbox_repo import get_outbox
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Inicializar servicio
-_service = AccessUserService(AccessUserRepository())
+_service = AccessUserService(AccessUserRepository(), outbox=get_outbox())
 
 
+@db_connection(db)
 def lambda_handler(event, context):
     """
     Handler para DELETE /access_users/delete/{id}
     """
     try:
-        # Conectar a la BD si está cerrada
-        if db.is_closed():
-            db.connect()
-
         # Extraer user_id del path
         user_id = event.get('pathParameters', {}).get('id')
 
@@ -68,8 +67,3 @@ def lambda_handler(event, context):
                 "details": str(e)
             })
         }
-
-    finally:
-        # Cerrar conexión
-        if not db.is_closed():
-            db.close()
@@ -0,0 +1,34 @@
+# handlers/drain_outbox.py
+import logging
+import os
+
+import boto3
+from botocore.config import Config
+
+from shared.models import db
+from shared.connection import db_connection
+from services.iot_publisher import IotPublisher, max_concurrency
+from services.outbox_service import OutboxDrainer
+from repositories.outbox_repo import OutboxRepository
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+_endpoint = os.environ.get("IOT_ENDPOINT") or "localhost"
+_iot = boto3.client(
+    "iot-data",
+    endpoint_url=_endpoint if _endpoint.startswith("http") else f"https://{_endpoint}",
+    config=Config(max_pool_connections=max_concurrency())
+)
+_drainer = OutboxDrainer(OutboxRepository(), IotPublisher(_iot))
+
+
+@db_connection(db)
+def lambda_handler(event, context):
+    """
+    Handler programado (EventBridge) que publica el outbox de notificaciones IoT
+    """
+    time_left = None
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        time_left = lambda: context.get_remaining_time_in_millis() / 1000
+    return _drainer.drain(time_left=time_left)
@@ -2,10 +2,12 @@
 import json
 import logging
 from shared.models import db
+from shared.connection import db_connection
 from services.device_access_service import DeviceAccessService
 from repositories.access_user_repo import AccessUserRepository
 from repositories.device_repo import DeviceRepository
 from repositories.device_user_mapping_repo import DeviceUserMappingRepository
+from repositories.outbox_repo import get_outbox
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -14,19 +16,17 @@ logger.setLevel(logging.INFO)
 _service = DeviceAccessService(
     AccessUserRepository(),
     DeviceRepository(),
-    DeviceUserMappingRepository()
+    DeviceUserMappingRepository(),
+    outbox=get_outbox()
 )
 
 
+@db_connection(db)
 def lambda_handler(event, context):
     """
     Handler para PUT /edit-user-allowed-devices/{id}
     """
     try:
-        # Conectar a la BD si está cerrada
-        if db.is_closed():
-            db.connect()
-        
         # Extraer user_id del path
         user_id = event.get('pathParameters', {}).get('id')
         
@@ -95,8 +95,3 @@ def lambda_handler(event, context):
                 "details": str(e)
             })
         }
-    
-    finally:
-        # Cerrar conexión
-        if not db.is_closed():
-            db.close()
\ No newline at end of file
@@ -0,0 +1,62 @@
+# handlers/export_access_logs.py
+import json
+import logging
+from shared.models import db
+from shared.connection import db_connection
+from services.log_export_service import LogExportService
+from repositories.access_log_repo import AccessLogRepository
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar servicio
+_service = LogExportService(AccessLogRepository())
+
+
+@db_connection(db)
+def lambda_handler(event, context):
+    """
+    Handler para GET /access_logs/export.
+
+    Query params: format (ndjson|csv, por defecto ndjson), user_id, device_id,
+    event, from y to (ISO8601). Sube el archivo a S3 y responde con una URL
+    firmada de descarga en lugar del contenido.
+    """
+    try:
+        query_params = event.get('queryStringParameters', {}) or {}
+
+        logger.info(f"Exportando logs con filtros: {query_params}")
+
+        result = _service.export_logs(
+            user_id=query_params.get('user_id'),
+            device_id=query_params.get('device_id'),
+            event=query_params.get('event'),
+            start=query_params.get('from'),
+            end=query_params.get('to'),
+            fmt=query_params.get('format') or 'ndjson'
+        )
+
+        logger.info(f"Exportados {result['rows']} logs a {result['key']}")
+
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(result)
+        }
+
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"error": str(ve)})
+        }
+
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        logger.exception("Error completo:")
+        return {
+            "statusCode": 500,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"error": str(e)})
+        }
@@ -2,6 +2,7 @@
 import json
 import logging
 from shared.models import db
+from shared.connection import db_connection
 from services.access_log_service import AccessLogService
 from repositories.access_log_repo import AccessLogRepository
 
@@ -11,16 +12,21 @@ logger.setLevel(logging.INFO)
 # Inicializar servicio
 _service = AccessLogService(AccessLogRepository())
 
+# Query params que activan la respuesta paginada por cursor
+PAGINATION_PARAMS = ('cursor', 'limit', 'from', 'to', 'event', 'count')
 
+
+@db_connection(db)
 def lambda_handler(event, context):
     """
-    Handler para GET /access_logs con filtros opcionales
+    Handler para GET /access_logs con filtros opcionales.
+    
+    Query params: user_id, device_id y, para la respuesta paginada,
+    event, from, to (ISO8601), limit y cursor (el `next_cursor` anterior).
+    Con count=exact|cached|estimated la página incluye además `total` y
+    `total_mode` (el modo efectivamente usado).
     """
     try:
-        # Conectar a la BD si está cerrada
-        if db.is_closed():
-            db.connect()
-        
         # Extraer query parameters
         query_params = event.get('queryStringParameters', {}) or {}
         user_id = query_params.get('user_id')
@@ -28,6 +34,37 @@ def lambda_handler(event, context):
         
         logger.info(f"Obteniendo logs con filtros: user_id={user_id}, device_id={device_id}")
         
+        # Con parámetros de paginación/rango se responde {"items", "next_cursor"}
+        if any(query_params.get(p) for p in PAGINATION_PARAMS):
+            page = _service.get_logs_page(
+                user_id=user_id,
+                device_id=device_id,
+                event=query_params.get('event'),
+                start=query_params.get('from'),
+                end=query_params.get('to'),
+                cursor=query_params.get('cursor'),
+                limit=query_params.get('limit')
+            )
+            
+            count_mode = query_params.get('count')
+            if count_mode:
+                page['total'], page['total_mode'] = _service.count_logs(
+                    user_id=user_id,
+                    device_id=device_id,
+                    event=query_params.get('event'),
+                    start=query_params.get('from'),
+                    end=query_params.get('to'),
+                    mode=count_mode
+                )
+            
+            logger.info(f"Página con {len(page['items'])} logs")
+            
+            return {
+                "statusCode": 200,
+                "headers": {"Content-Type": "application/json"},
+                "body": json.dumps(page)
+            }
+        
         # Obtener logs
         logs = _service.get_logs(user_id=user_id, device_id=device_id)
         
@@ -55,8 +92,3 @@ def lambda_handler(event, context):
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({"error": str(e)})
         }
-    
-    finally:
-        # Cerrar conexión
-        if not db.is_closed():
-            db.close()
\ No newline at end of file
@@ -2,6 +2,7 @@
 import json
 import logging
 from shared.models import db
+from shared.connection import db_connection
 from services.access_users_service import AccessUserService
 from repositories.access_user_repo import AccessUserRepository
 
@@ -12,15 +13,12 @@ logger.setLevel(logging.INFO)
 _service = AccessUserService(AccessUserRepository())
 
 
+@db_connection(db)
 def lambda_handler(event, context):
     """
     Handler para GET /access_users y GET /access_users/{id}
     """
     try:
-        # Conectar a la BD si está cerrada
-        if db.is_closed():
-            db.connect()
-        
         # Extraer path parameter si existe
         user_id = event.get('pathParameters', {}).get('id')
         
@@ -68,8 +66,3 @@ def lambda_handler(event, context):
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({"message": "Error interno del servidor"})
         }
-    
-    finally:
-        # Cerrar conexión
-        if not db.is_closed():
-            db.close()
\ No newline at end of file
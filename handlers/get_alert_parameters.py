@@ -2,6 +2,7 @@
 import json
 import logging
 from shared.models import db
+from shared.connection import db_connection
 from services.configuration_service import ConfigurationService
 from repositories.configuration_repo import ConfigurationRepository
 
@@ -12,15 +13,12 @@ logger.setLevel(logging.INFO)
 _service = ConfigurationService(ConfigurationRepository())
 
 
+@db_connection(db)
 def lambda_handler(event, context):
     """
     Handler para GET /configurations
     """
     try:
-        # Conectar a la BD si está cerrada
-        if db.is_closed():
-            db.connect()
-        
         logger.info("Obteniendo parámetros de alerta")
         
         # Por ahora no se usa device_id, pero está preparado para futuro
@@ -45,8 +43,3 @@ def lambda_handler(event, context):
             "headers": {"Content-Type": "application/json"},
             "body": json.dumps({"error": str(e)})
         }
-    
-    finally:
-        # Cerrar conexión
-        if not db.is_closed():
-            db.close()
\ No newline at end of file
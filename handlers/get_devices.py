@@ -2,6 +2,7 @@
 import json
 import logging
 from shared.models import db
+from shared.connection import db_connection
 from services.device_service import DeviceService
 from repositories.device_repo import DeviceRepository
 
@@ -12,6 +13,7 @@ logger.setLevel(logging.INFO)
 _service = DeviceService(DeviceRepository())
 
 
+@db_connection(db)
 def lambda_handler(event, context):
     """
     Handler para GET /devices y GET /devices/{id}
@@ -19,10 +21,6 @@ def lambda_handler(event, context):
     logger.info("Evento recibido: %s", json.dumps(event))
     
     try:
-        # Conectar a la BD si está cerrada
-        if db.is_closed():
-            db.connect()
-        
         # Extraer device_id del path si existe
         device_id = event.get('pathParameters', {}).get('id')
         
@@ -73,8 +71,3 @@ def lambda_handler(event, context):
                 "details": str(e)
             })
         }
-    
-    finally:
-        # Cerrar conexión
-        if not db.is_closed():
-            db.close()
\ No newline at end of file
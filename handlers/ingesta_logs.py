@@ -3,9 +3,12 @@
 import json
 import logging
 import os
+from typing import Any, Dict, List, Optional
+
 import boto3
 
 from shared.models import db
+from shared.connection import db_connection
 from services.access_service import AccessService
 from repositories.access_log_repo import AccessLogRepository
 from repositories.device_repo import DeviceRepository
@@ -15,6 +18,8 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 EVENT_BUS = os.environ.get("EVENT_BUS_NAME", "default")
+# PutEvents acepta como máximo 10 entradas por llamada
+EB_MAX_ENTRIES = 10
 eb = boto3.client("events")
 
 # Inyectamos repositorios en el servicio
@@ -25,30 +30,145 @@ _service = AccessService(
 )
 
 
+def _is_batch(event) -> bool:
+    """Un lote es una lista de payloads (IoT rule) o un evento SQS con 'Records'."""
+    return isinstance(event, list) or (
+        isinstance(event, dict) and isinstance(event.get("Records"), list))
+
+
+def _event_entry(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "Source": "tic2.access",
+        "DetailType": "AccessLog",
+        "Detail": json.dumps(payload),
+        "EventBusName": EVENT_BUS,
+    }
+
+
+def _publish_batch(payloads: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Publica en EventBridge en bloques de EB_MAX_ENTRIES.
+
+    Returns:
+        Lista paralela a `payloads` con True si la entrada fue aceptada
+    """
+    published: List[bool] = []
+    for start in range(0, len(payloads), EB_MAX_ENTRIES):
+        chunk = payloads[start:start + EB_MAX_ENTRIES]
+        try:
+            resp = eb.put_events(Entries=[_event_entry(p) for p in chunk])
+        except Exception as exc:
+            logger.error("Error publicando en EventBridge: %s", exc)
+            published.extend([False] * len(chunk))
+            continue
+        entries = resp.get("Entries") or [{}] * len(chunk)
+        published.extend("ErrorCode" not in e for e in entries)
+    return published
+
+
+def _is_redelivery(record: Dict[str, Any]) -> bool:
+    """True si SQS ya entregó antes este mensaje (ApproximateReceiveCount > 1)."""
+    try:
+        return int(record.get("attributes", {}).get("ApproximateReceiveCount", 1)) > 1
+    except (TypeError, ValueError):
+        return False
+
+
+def _should_publish(status: str, redelivered: bool) -> bool:
+    """
+    Se publican los logs insertados y los duplicados reentregados: si el
+    intento anterior guardó el log pero no llegó a publicarlo, la reentrega
+    es la única oportunidad de hacerlo (EventBridge queda at-least-once).
+    """
+    return status == "inserted" or (status == "duplicate" and redelivered)
+
+
+def _handle_batch(event) -> Dict[str, Any]:
+    """
+    Procesa un lote (SQS o lista de payloads) y reporta el resultado por registro.
+    Para SQS devuelve además `batchItemFailures` (partial batch response) con los
+    mensajes que no pudieron procesarse por errores no de validación o cuyo
+    evento no se pudo publicar en EventBridge. En la reentrega el log ya
+    existe ("duplicate"), pero se vuelve a publicar igual.
+    """
+    records = event if isinstance(event, list) else event["Records"]
+    message_ids: List[Optional[str]] = []
+    payloads: List[Any] = []
+    redelivered: List[bool] = []
+    for record in records:
+        if isinstance(record, dict) and "body" in record and "messageId" in record:
+            message_ids.append(record["messageId"])
+            redelivered.append(_is_redelivery(record))
+            try:
+                payloads.append(json.loads(record["body"]))
+            except (TypeError, json.JSONDecodeError):
+                payloads.append(None)
+        else:
+            message_ids.append(None)
+            redelivered.append(False)
+            payloads.append(record)
+
+    logger.info("Lote recibido con %d registros", len(records))
+
+    failures = []
+    try:
+        results = _service.ingest_batch(payloads)
+    except Exception as exc:
+        # Error de BD: todo el lote falla y SQS lo reintenta completo
+        logger.error("Error procesando lote: %s", exc)
+        results = [{"uuid": p.get("uuid") if isinstance(p, dict) else None,
+                    "status": "error", "error": str(exc)} for p in payloads]
+        failures = [mid for mid in message_ids if mid]
+    else:
+        to_publish = [i for i, r in enumerate(results)
+                      if _should_publish(r["status"], redelivered[i])]
+        published = _publish_batch([payloads[i] for i in to_publish])
+        for i, ok in zip(to_publish, published):
+            results[i]["published"] = ok
+            if not ok and message_ids[i]:
+                # El log ya quedó guardado: el reintento es un no-op en la BD
+                # y solo vuelve a publicar el evento
+                failures.append(message_ids[i])
+
+    for mid, result in zip(message_ids, results):
+        if mid:
+            result["messageId"] = mid
+
+    response = {
+        "statusCode": 200,
+        "body": json.dumps({"results": results}),
+    }
+    if isinstance(event, dict):
+        response["batchItemFailures"] = [{"itemIdentifier": mid} for mid in failures]
+    return response
+
+
+@db_connection(db)
 def handler(event, context):
     try:
-        # 1) Abrir conexión Peewee (si aún está cerrada)
-        if db.is_closed():
-            db.connect()
+        if _is_batch(event):
+            return _handle_batch(event)
 
         logger.info("Evento recibido: %s", json.dumps(event))
 
-        # 2) Ejecutar lógica de negocio
-        _service.ingest(event)
+        # 1) Ejecutar lógica de negocio (idempotente)
+        status = _service.ingest(event)
 
-        # 3) Publicar en EventBridge
-        eb.put_events(
-            Entries=[{
-                "Source": "tic2.access",
-                "DetailType": "AccessLog",
-                "Detail": json.dumps(event),
-                "EventBusName": EVENT_BUS,
-            }]
-        )
+        # 2) Publicar en EventBridge. La invocación directa no trae contador
+        # de entregas: un uuid repetido solo llega por reentrega (MQTT QoS 1
+        # o reintento tras fallar la publicación), así que cuenta como tal.
+        if _should_publish(status, redelivered=True) and not _publish_batch([event])[0]:
+            # El log ya quedó guardado: el reintento solo vuelve a publicar
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"error": "No se pudo publicar el evento en EventBridge"})
+            }
 
+        message = ("Log duplicado republicado" if status == "duplicate"
+                   else "Log insertado correctamente")
         return {
             "statusCode": 200,
-            "body": json.dumps({"message": "Log insertado correctamente"})
+            "body": json.dumps({"message": message})
         }
 
     except ValueError as ve:
@@ -58,8 +178,3 @@ def handler(event, context):
     except Exception as exc:
         logger.error("Error procesando evento: %s", exc)
         return {"statusCode": 500, "body": json.dumps({"error": str(exc)})}
-
-    finally:
-        # 4) Cerrar la conexión Peewee
-        if not db.is_closed():
-            db.close()
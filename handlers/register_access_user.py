@@ -1,17 +1,92 @@
 # handlers/register_access_user.py
+import time
+
+_init_started = time.perf_counter()
+
 import json
-from services.access_users_service import AccessUserService
+import logging
+import os
+from shared.models import db
+from shared.connection import db_connection
+from shared.metrics import emit_metrics
+from services.access_users_service import AccessUserService, DuplicateFaceError
+from services.face_match_service import get_face_index
 from repositories.access_user_repo import AccessUserRepository
+from repositories.outbox_repo import get_outbox
+
+logger = logging.getLogger()
+
+# Fase de init: importar face_recognition carga los modelos de dlib
+# (detector HOG, landmarks y encoder); se hace acá y no en el primer registro
+_models_started = time.perf_counter()
+try:
+    from services import face_service
+except ImportError as e:  # imagen sin OpenCV/dlib: se cargará (y fallará) al registrar
+    logger.warning("Modelos faciales no disponibles en init: %s", e)
+    face_service = None
+_model_load_ms = (time.perf_counter() - _models_started) * 1000
+
+_warm_up_ms = 0.0
+if face_service is not None and os.environ.get("FACE_WARMUP", "1") != "0":
+    _warm_started = time.perf_counter()
+    try:
+        face_service.warm_up()
+    except Exception as e:
+        # Un fallo acá no debe tumbar el init del contenedor: el primer
+        # registro paga la carga diferida de libjpeg/dlib
+        logger.exception("Warm-up de modelos faciales falló: %s", e)
+    _warm_up_ms = (time.perf_counter() - _warm_started) * 1000
 
-svc = AccessUserService(AccessUserRepository())
+svc = AccessUserService(AccessUserRepository(), face_index=get_face_index(),
+                        outbox=get_outbox())
+
+_init_ms = (time.perf_counter() - _init_started) * 1000
+_init_reported = False
+
+
+def _is_ping(event) -> bool:
+    """Evento de calentamiento (p. ej. una regla programada con {"ping": true})."""
+    return isinstance(event, dict) and bool(
+        event.get("ping") or event.get("warmup")
+        or event.get("source") == "serverless-plugin-warmup")
+
+
+def _report_init() -> None:
+    """Publica una vez por contenedor los tiempos de la fase de init (EMF)."""
+    global _init_reported
+    if _init_reported:
+        return
+    _init_reported = True
+    emit_metrics(
+        {"InitDuration": _init_ms, "ModelLoad": _model_load_ms, "WarmUp": _warm_up_ms},
+        properties={"ModelsLoaded": face_service is not None},
+    )
 
 
 def lambda_handler(event, context):
+    _report_init()
+    # El ping solo mantiene el contenedor caliente: no toca BD ni S3
+    if _is_ping(event):
+        return {"statusCode": 200, "body": json.dumps({
+            "status": "warm",
+            "models_loaded": face_service is not None,
+        })}
+    return _register(event, context)
+
+
+@db_connection(db)
+def _register(event, context):
     body = event.get("body", event)
     body = json.loads(body) if isinstance(body, str) else body
     try:
         result = svc.create_user(body)
         return {"statusCode": 201, "body": json.dumps(result)}
+    except DuplicateFaceError as e:
+        return {"statusCode": 409, "body": json.dumps({
+            "error": str(e),
+            "user_id": e.user_id,
+            "distance": round(e.distance, 4),
+        })}
     except LookupError as e:
         return {"statusCode": 409, "body": json.dumps({"error": str(e)})}
     except ValueError as e:
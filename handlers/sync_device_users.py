@@ -0,0 +1,62 @@
+# handlers/sync_device_users.py
+import json
+import logging
+from shared.models import db
+from shared.connection import db_connection
+from services.device_sync_service import DeviceSyncService
+from repositories.device_repo import DeviceRepository
+from repositories.device_user_mapping_repo import DeviceUserMappingRepository
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Inicializar servicio
+_service = DeviceSyncService(DeviceRepository(), DeviceUserMappingRepository())
+
+
+def _response(status: int, body) -> dict:
+    return {
+        "statusCode": status,
+        "headers": {"Content-Type": "application/json"},
+        "body": json.dumps(body)
+    }
+
+
+@db_connection(db)
+def lambda_handler(event, context):
+    """
+    Handler para:
+    - GET  /devices/{location}/sync?since=N  -> cambios desde la revisión N
+      (&after=M: página siguiente del snapshot tomado en la revisión N)
+    - POST /devices/{location}/sync          -> {"revision": N} confirma lo aplicado
+    """
+    try:
+        location = (event.get('pathParameters') or {}).get('location')
+        if not location:
+            return _response(400, {"error": "Device location is required"})
+
+        if event.get('httpMethod', 'GET') == 'POST':
+            body = event.get('body') or {}
+            if isinstance(body, str):
+                try:
+                    body = json.loads(body)
+                except json.JSONDecodeError:
+                    return _response(400, {"error": "Invalid JSON in request body"})
+            result = _service.acknowledge(location, body.get('revision'))
+        else:
+            params = event.get('queryStringParameters') or {}
+            result = _service.get_changes(location, params.get('since', 0), params.get('after'))
+
+        return _response(200, result)
+
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        return _response(400, {"error": str(ve)})
+
+    except LookupError as le:
+        logger.error(f"Dispositivo no encontrado: {le}")
+        return _response(404, {"error": "Device not found"})
+
+    except Exception as e:
+        logger.exception("Error interno del servidor")
+        return _response(500, {"error": "Internal server error", "details": str(e)})
@@ -0,0 +1,35 @@
+#!/usr/bin/env bash
+# Empaqueta lambda_alert_check en lambda_alert_check.zip.
+#
+# build/ junta las dependencias de requirements.txt, el código propio
+# (handlers, infra, repositories, services) y el motor de conexiones
+# compartido (shared/db.py), que el handler importa como `shared.db`.
+# shared/db.py solo depende de psycopg2, así que no hace falta el resto
+# de shared/ (Peewee, modelos).
+#
+# Uso: ./lambda_alert_check/build.sh   (FORCE_PIP=1 reinstala dependencias)
+set -euo pipefail
+
+cd "$(dirname "$0")"
+ROOT=..
+BUILD=build
+
+mkdir -p "$BUILD"
+if [ "${FORCE_PIP:-0}" = "1" ] || [ ! -d "$BUILD/psycopg2" ]; then
+    pip install -r requirements.txt -t "$BUILD" --upgrade --quiet
+fi
+
+for package in handlers infra repositories services; do
+    rm -rf "$BUILD/$package"
+    cp -r "$package" "$BUILD/$package"
+done
+
+rm -rf "$BUILD/shared"
+mkdir -p "$BUILD/shared"
+cp "$ROOT/shared/__init__.py" "$ROOT/shared/db.py" "$BUILD/shared/"
+
+find "$BUILD" -name '__pycache__' -type d -prune -exec rm -rf {} +
+
+rm -f lambda_alert_check.zip
+(cd "$BUILD" && zip -qr ../lambda_alert_check.zip . -x 'handlers.zip')
+echo "lambda_alert_check.zip listo"
@@ -2,41 +2,116 @@ import os
 import json
 from datetime import datetime
 
-import boto3
-import psycopg2
-
+from shared.db import get_engine
 from infra.sns_client import SnsClient
-from repositories.log_repository import LogRepository
-from services.alert_service import AlertService
+from repositories.log_repository import ConfigCache, LogRepository
+from services.alert_service import AlertService, AlertState
+from services.deny_window import DenyCounter
+
+# Configuración resuelta por dispositivo; se revalida cada CONFIG_CACHE_TTL_SECONDS
+_config_cache = ConfigCache(
+    ttl_seconds=float(os.environ.get('CONFIG_CACHE_TTL_SECONDS', 60)),
+)
+
+# Ventanas de denies por dispositivo: viven entre invocaciones warm
+_deny_counter = DenyCounter(
+    bucket_seconds=int(os.environ.get('DENY_BUCKET_SECONDS', 1)),
+    resync_seconds=float(os.environ.get('DENY_RESYNC_SECONDS', 60)),
+)
+
+# Incidentes abiertos por dispositivo (cooldown y escalado de alertas)
+_alert_state = AlertState(
+    cooldown_seconds=float(os.environ.get('ALERT_COOLDOWN_SECONDS', 300)),
+    escalation_factor=float(os.environ.get('ALERT_ESCALATION_FACTOR', 2)),
+    max_level=int(os.environ.get('ALERT_MAX_LEVEL', 3)),
+)
+
+
+_sns_client = None
+
+
+def _get_sns_client():
+    # El cliente boto3 también se reutiliza entre invocaciones warm
+    global _sns_client
+    if _sns_client is None:
+        _sns_client = SnsClient(os.environ['SNS_TOPIC_ARN'])
+    return _sns_client
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _group_denies(records) -> dict:
+    """
+    Agrupa los registros SQS (cada body es un evento de EventBridge) por
+    dispositivo: {device_name: [(messageId, timestamp), ...]}. Los eventos
+    que no son 'denied' o no se pueden leer se descartan.
+    """
+    groups = {}
+    for record in records:
+        try:
+            body = json.loads(record['body'])
+            detail = body.get('detail') if isinstance(body, dict) else None
+            if not isinstance(detail, dict) or detail.get('event') != 'denied':
+                continue
+            timestamp = _parse_timestamp(detail['timestamp'])
+            device_name = detail['device_name']
+        except (KeyError, TypeError, ValueError):
+            continue
+        groups.setdefault(device_name, []).append((record.get('messageId'), timestamp))
+    return groups
+
+
+def _handle_batch(records) -> dict:
+    """
+    Lote de SQS: un umbral evaluado y como máximo una alerta por
+    dispositivo, todo con una sola conexión. Si falla un dispositivo se
+    devuelven sus mensajes en batchItemFailures para que SQS los reintente
+    (requiere ReportBatchItemFailures en el event source mapping).
+    """
+    groups = _group_denies(records)
+    alerted = []
+    failures = []
+    if not groups:
+        return {"alerted": alerted, "batchItemFailures": failures}
+
+    with get_engine().connection() as conn:
+        service = AlertService(LogRepository(conn, _config_cache), _get_sns_client(),
+                               _deny_counter, _alert_state)
+        for device_name, items in groups.items():
+            try:
+                if service.process_denied_batch(device_name, [ts for _, ts in items]):
+                    alerted.append(device_name)
+            except Exception:
+                # Solo lecturas: el rollback deja la conexión usable para el resto
+                conn.rollback()
+                failures.extend({"itemIdentifier": message_id} for message_id, _ in items)
+
+    return {"alerted": alerted, "batchItemFailures": failures}
 
 
 def lambda_handler(event, context):
+    # Modo lote: eventos de EventBridge encolados en SQS
+    if 'Records' in event:
+        return _handle_batch(event['Records'])
+
     # Filtrar solo los eventos 'denied'
     detail = event.get('detail', {})
     if detail.get('event') != 'denied':
         return {"status": "ignored"}
 
-    # Conexión a la base de datos
-    conn = psycopg2.connect(
-        host=os.environ['DB_HOST'],
-        port=int(os.environ.get('DB_PORT', 5432)),
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        dbname=os.environ['DB_NAME']
-    )
-
-    # Inicializar capas
-    repo = LogRepository(conn)
-    sns_client = SnsClient(os.environ['SNS_TOPIC_ARN'])
-    service = AlertService(repo, sns_client)
-
-    # Procesar evento
-    timestamp = datetime.fromisoformat(
-        detail['timestamp'].replace('Z', '+00:00'))
-    alerted = service.process_denied_event(
-        device_name=detail['device_name'],
-        timestamp=timestamp
-    )
-
-    conn.close()
+    # Conexión del motor compartido (shared/db.py): se reutiliza entre
+    # invocaciones warm en lugar de abrir una nueva por evento
+    with get_engine().connection() as conn:
+        # Inicializar capas
+        repo = LogRepository(conn, _config_cache)
+        service = AlertService(repo, _get_sns_client(), _deny_counter, _alert_state)
+
+        # Procesar evento
+        alerted = service.process_denied_event(
+            device_name=detail['device_name'],
+            timestamp=_parse_timestamp(detail['timestamp'])
+        )
+
     return {"alerted": alerted}
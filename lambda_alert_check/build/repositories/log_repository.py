@@ -1,9 +1,51 @@
+import time
 from datetime import datetime
 
 
+class ConfigCache:
+    """
+    Configuración resuelta (threshold, window_seconds) por dispositivo,
+    compartida entre invocaciones warm.
+
+    Durante `ttl_seconds` se sirve de memoria sin tocar la BD. Al vencer se
+    lee la fila 'config_version' de configurations (la actualiza
+    ConfigurationService en cada edición): si no cambió se conservan las
+    entradas, si cambió (o no existe) se descartan.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = {}
+        self._version = None
+        self._checked_at = None
+
+    def expired(self) -> bool:
+        return (self._checked_at is None
+                or self._clock() - self._checked_at >= self.ttl_seconds)
+
+    def validate(self, version) -> None:
+        if version is None or version != self._version:
+            self._entries.clear()
+        self._version = version
+        self._checked_at = self._clock()
+
+    def get(self, device_id):
+        return self._entries.get(device_id)
+
+    def put(self, device_id, config: tuple) -> None:
+        self._entries[device_id] = config
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._version = None
+        self._checked_at = None
+
+
 class LogRepository:
-    def __init__(self, connection):
+    def __init__(self, connection, config_cache: ConfigCache = None):
         self._conn = connection
+        self._config_cache = config_cache
 
     def get_device_id(self, device_name: str) -> int:
         with self._conn.cursor() as cur:
@@ -14,7 +56,31 @@ class LogRepository:
             row = cur.fetchone()
             return row[0] if row else None
 
+    def get_config_version(self):
+        with self._conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT value FROM configurations
+                WHERE name_config = 'config_version' AND device_id IS NULL
+                """
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+
     def get_config(self, device_id: int) -> tuple:
+        cache = self._config_cache
+        if cache is None:
+            return self._load_config(device_id)
+
+        if cache.expired():
+            cache.validate(self.get_config_version())
+        config = cache.get(device_id)
+        if config is None:
+            config = self._load_config(device_id)
+            cache.put(device_id, config)
+        return config
+
+    def _load_config(self, device_id: int) -> tuple:
         query = """
         WITH cfg AS (
           SELECT
@@ -50,3 +116,26 @@ class LogRepository:
                 (device_id, start, end)
             )
             return cur.fetchone()[0]
+
+    def get_deny_buckets(self, device_id: int, start: datetime, end: datetime,
+                         bucket_seconds: int) -> list:
+        """
+        Denies del dispositivo en [start, end] agrupados en buckets de
+        `bucket_seconds` (bucket = epoch // bucket_seconds), para rehidratar
+        la ventana deslizante de DenyCounter con pocas filas.
+        """
+        with self._conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT FLOOR(EXTRACT(EPOCH FROM timestamp) / %s)::bigint AS bucket,
+                       COUNT(*)
+                FROM access_logs
+                WHERE device_id = %s
+                  AND event = 'denied'
+                  AND timestamp BETWEEN %s AND %s
+                GROUP BY bucket
+                ORDER BY bucket
+                """,
+                (bucket_seconds, device_id, start, end)
+            )
+            return cur.fetchall()
@@ -0,0 +1,157 @@
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+
+def _epoch(ts: datetime) -> float:
+    """Segundos epoch; los datetime naive se interpretan como UTC."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class DenyWindow:
+    """
+    Ventana deslizante de denies de un dispositivo con conteos por bucket.
+
+    Guarda como máximo window_seconds / bucket_seconds buckets; `add` y
+    `count` son O(1) amortizado (cada bucket entra y sale una sola vez).
+    """
+
+    def __init__(self, window_seconds: int, bucket_seconds: int = 1):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self._buckets = deque()  # [bucket, count], en orden creciente
+        self._total = 0
+
+    def _bucket(self, ts: datetime) -> int:
+        return int(_epoch(ts) // self.bucket_seconds)
+
+    def add_bucket(self, bucket: int, count: int = 1) -> None:
+        if self._buckets and self._buckets[-1][0] == bucket:
+            self._buckets[-1][1] += count
+        elif not self._buckets or self._buckets[-1][0] < bucket:
+            self._buckets.append([bucket, count])
+        else:
+            # Evento fuera de orden (poco frecuente): se ubica desde la derecha
+            for i in range(len(self._buckets) - 1, -1, -1):
+                if self._buckets[i][0] == bucket:
+                    self._buckets[i][1] += count
+                    break
+                if self._buckets[i][0] < bucket:
+                    self._buckets.insert(i + 1, [bucket, count])
+                    break
+            else:
+                self._buckets.appendleft([bucket, count])
+        self._total += count
+
+    def add(self, ts: datetime) -> None:
+        self.add_bucket(self._bucket(ts))
+
+    def count(self, now: datetime, pending=()) -> int:
+        """
+        Denies en los window_seconds / bucket_seconds buckets que terminan en
+        el de `now` (el bucket de now - window_seconds queda afuera: con él
+        la ventana cubriría un bucket de más), más los de `pending` que caen
+        en la ventana sin agregarlos.
+        """
+        oldest = self._bucket(now) - self.window_seconds // self.bucket_seconds + 1
+        while self._buckets and self._buckets[0][0] < oldest:
+            self._total -= self._buckets.popleft()[1]
+        return self._total + sum(1 for ts in pending if self._bucket(ts) >= oldest)
+
+
+class DenyCounter:
+    """
+    Contadores de denies por dispositivo que viven en el contenedor Lambda.
+
+    La primera vez que se ve un dispositivo (cold start), o si cambió su
+    window_seconds, o pasaron más de `resync_seconds` desde la última
+    carga, la ventana se reconstruye desde access_logs. Entre cargas cada
+    evento solo suma a su bucket, sin consultar la BD.
+
+    Los eventos de un mismo dispositivo pueden repartirse entre varios
+    contenedores; `resync_seconds` acota cuánto puede quedar desfasado el
+    conteo local.
+
+    La carga incluye los denies ya insertados hasta su marca de agua (el
+    timestamp con el que se cargó); si su evento de EventBridge llega
+    después, se descarta para no contarlo dos veces.
+    """
+
+    def __init__(self, bucket_seconds: int = 1, resync_seconds: float = 60,
+                 clock=time.monotonic):
+        self.bucket_seconds = bucket_seconds
+        self.resync_seconds = resync_seconds
+        self._clock = clock
+        self._windows = {}
+        self._synced_at = {}
+        self._watermarks = {}
+
+    def _needs_hydration(self, device_id, window_seconds: int) -> bool:
+        window = self._windows.get(device_id)
+        if window is None or window.window_seconds != window_seconds:
+            return True
+        return self._clock() - self._synced_at[device_id] >= self.resync_seconds
+
+    def _hydrate(self, repository, device_id, now: datetime, window_seconds: int) -> DenyWindow:
+        window = DenyWindow(window_seconds, self.bucket_seconds)
+        buckets = repository.get_deny_buckets(
+            device_id, now - timedelta(seconds=window_seconds), now, self.bucket_seconds)
+        for bucket, count in buckets:
+            window.add_bucket(int(bucket), int(count))
+        self._windows[device_id] = window
+        self._synced_at[device_id] = self._clock()
+        self._watermarks[device_id] = now
+        return window
+
+    def _unseen(self, device_id, timestamps) -> list:
+        """Denies posteriores a la marca de agua de la última carga."""
+        watermark = self._watermarks[device_id]
+        return [ts for ts in timestamps if ts > watermark]
+
+    def count(self, repository, device_id, timestamps, window_seconds: int) -> int:
+        """
+        Conteo de la ventana que termina en el más reciente de `timestamps`,
+        incluyéndolos pero sin registrarlos: se registran con `record` solo
+        si el procesamiento termina bien (si falla, el reintento de SQS los
+        vuelve a traer).
+        """
+        now = max(timestamps)
+        if self._needs_hydration(device_id, window_seconds):
+            # La carga desde access_logs ya incluye estos eventos
+            window = self._hydrate(repository, device_id, now, window_seconds)
+        else:
+            window = self._windows[device_id]
+        return window.count(now, pending=self._unseen(device_id, timestamps))
+
+    def record(self, device_id, timestamps) -> None:
+        """Registra denies ya contados con `count`."""
+        window = self._windows.get(device_id)
+        if window is None:
+            return
+        for timestamp in self._unseen(device_id, timestamps):
+            window.add(timestamp)
+
+    def record_and_count(self, repository, device_id, timestamp: datetime,
+                         window_seconds: int) -> int:
+        """
+        Registra un deny (ya insertado en access_logs) y devuelve los denies
+        del dispositivo en [timestamp - window_seconds, timestamp].
+        """
+        return self.record_many_and_count(repository, device_id, [timestamp], window_seconds)
+
+    def record_many_and_count(self, repository, device_id, timestamps,
+                              window_seconds: int) -> int:
+        """
+        Registra un lote de denies del dispositivo y devuelve el conteo de la
+        ventana que termina en el más reciente.
+        """
+        count = self.count(repository, device_id, timestamps, window_seconds)
+        self.record(device_id, timestamps)
+        return count
+
+    def clear(self) -> None:
+        self._windows.clear()
+        self._synced_at.clear()
+        self._watermarks.clear()
@@ -0,0 +1,218 @@
+# shared/db.py
+"""
+Motor de conexiones Postgres único del proyecto.
+
+Tanto la base de datos Peewee de shared/models.py (EngineDatabase) como los
+repositorios de SQL crudo (p. ej. LogRepository de lambda_alert_check)
+obtienen sus conexiones de acá, con la misma configuración. Solo depende de
+psycopg2, para poder empaquetarlo en lambdas sin Peewee.
+
+Variables:
+- DB_HOST, DB_NAME, DB_USER, DB_PASSWORD (o DB_PASS), DB_PORT
+- DB_POOL_BACKEND: 'pool' (pool en proceso, por defecto) o 'external'
+  (RDS Proxy / PgBouncer: el pooling lo hace el proxy)
+- DB_POOL_MIN / DB_POOL_MAX: tamaño del pool en proceso (1 / 4)
+- DB_CONN_MAX_AGE: segundos de vida máxima de una conexión (900; 0 = sin límite)
+- DB_STATEMENT_TIMEOUT_MS: statement_timeout de la sesión (sin definir = el del servidor)
+- DB_CONNECT_TIMEOUT: segundos de timeout al conectar (5)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from psycopg2 import pool
+
+
+def db_settings() -> Dict[str, Any]:
+    """Parámetros de conexión de psycopg2 a partir de las variables de entorno."""
+    settings = {
+        "host": os.environ.get("DB_HOST", ""),
+        "dbname": os.environ.get("DB_NAME", ""),
+        "user": os.environ.get("DB_USER", ""),
+        # serverless.yml define DB_PASS; DB_PASSWORD se mantiene por compatibilidad
+        "password": os.environ.get("DB_PASSWORD") or os.environ.get("DB_PASS", ""),
+        "port": int(os.environ.get("DB_PORT") or 5432),
+        "connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", 5)),
+    }
+    statement_timeout = os.environ.get("DB_STATEMENT_TIMEOUT_MS")
+    if statement_timeout:
+        settings["options"] = f"-c statement_timeout={int(statement_timeout)}"
+    return settings
+
+
+class PoolBackend:
+    """
+    Pool en proceso (psycopg2 ThreadedConnectionPool), creado al primer uso.
+    Las conexiones que superan `max_age` segundos se cierran al devolverlas
+    o al volver a pedirlas.
+    """
+
+    def __init__(
+        self,
+        settings: Dict[str, Any],
+        minconn: int = 1,
+        maxconn: int = 4,
+        max_age: float = 900,
+        clock: Callable[[], float] = time.monotonic,
+        pool_factory: Callable[..., Any] = pool.ThreadedConnectionPool,
+    ):
+        self.settings = settings
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_age = max_age
+        self._clock = clock
+        self._pool_factory = pool_factory
+        self._pool = None
+        self._born: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._pool_factory(self.minconn, self.maxconn, **self.settings)
+            return self._pool
+
+    def expired(self, conn) -> bool:
+        if conn.closed:
+            return True
+        if not self.max_age:
+            return False
+        born = self._born.get(id(conn))
+        return born is not None and self._clock() - born >= self.max_age
+
+    def getconn(self):
+        db_pool = self._get_pool()
+        while True:
+            conn = db_pool.getconn()
+            self._born.setdefault(id(conn), self._clock())
+            if not self.expired(conn):
+                return conn
+            self._discard(db_pool, conn)
+
+    def putconn(self, conn, close: bool = False) -> None:
+        db_pool = self._get_pool()
+        if close or self.expired(conn):
+            self._discard(db_pool, conn)
+        else:
+            db_pool.putconn(conn)
+
+    def _discard(self, db_pool, conn) -> None:
+        self._born.pop(id(conn), None)
+        db_pool.putconn(conn, close=True)
+
+    def closeall(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._born.clear()
+
+
+class ExternalPoolerBackend:
+    """
+    Pooler externo (RDS Proxy, PgBouncer): cada `getconn` abre una conexión
+    al proxy y `putconn` la cierra; el proxy mantiene las conexiones reales
+    contra Postgres. La reutilización entre invocaciones la da
+    shared/connection.py manteniendo abierta la conexión de Peewee.
+    """
+
+    def __init__(self, settings: Dict[str, Any], connect: Callable[..., Any] = psycopg2.connect):
+        self.settings = settings
+        self._connect = connect
+
+    def expired(self, conn) -> bool:
+        return bool(conn.closed)
+
+    def getconn(self):
+        return self._connect(**self.settings)
+
+    def putconn(self, conn, close: bool = False) -> None:
+        if not conn.closed:
+            conn.close()
+
+    def closeall(self) -> None:
+        pass
+
+
+BACKENDS = {
+    "pool": PoolBackend,
+    "external": ExternalPoolerBackend,
+}
+
+
+class Engine:
+    """Punto único para pedir y devolver conexiones psycopg2."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def getconn(self, autocommit: bool = False):
+        conn = self.backend.getconn()
+        if conn.autocommit != autocommit:
+            conn.autocommit = autocommit
+        return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        self.backend.putconn(conn, close=close)
+
+    def expired(self, conn) -> bool:
+        return self.backend.expired(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Conexión para SQL crudo: commit al salir, rollback si hubo error.
+        La conexión vuelve al backend (se descarta si quedó rota).
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+
+def create_engine(backend: Optional[str] = None, settings: Optional[Dict[str, Any]] = None) -> Engine:
+    """Crea un Engine con el backend indicado o el de DB_POOL_BACKEND."""
+    name = backend or os.environ.get("DB_POOL_BACKEND", "pool")
+    if name not in BACKENDS:
+        raise ValueError(f"DB_POOL_BACKEND debe ser uno de: {', '.join(BACKENDS)}")
+    settings = settings if settings is not None else db_settings()
+
+    if name == "pool":
+        return Engine(PoolBackend(
+            settings,
+            minconn=int(os.environ.get("DB_POOL_MIN", 1)),
+            maxconn=int(os.environ.get("DB_POOL_MAX", 4)),
+            max_age=float(os.environ.get("DB_CONN_MAX_AGE", 900)),
+        ))
+    return Engine(BACKENDS[name](settings))
+
+
+_engine: Optional[Engine] = None
+
+
+def get_engine() -> Engine:
+    """Engine del proceso (uno por contenedor Lambda)."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+    return _engine
+
+
+def get_conn():
+    return get_engine().getconn()
+
+
+def put_conn(conn):
+    get_engine().putconn(conn)
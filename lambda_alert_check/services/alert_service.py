@@ -1,12 +1,117 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+ALERT = "alert"
+ESCALATION = "escalation"
+SUMMARY = "summary"
+
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+class _Incident:
+    __slots__ = ("level", "last_sent", "suppressed")
+
+    def __init__(self, level: int, last_sent: datetime):
+        self.level = level
+        self.last_sent = last_sent
+        self.suppressed = 0
+
+
+class AlertState:
+    """
+    Estado de alertas por dispositivo (vive en el contenedor Lambda).
+
+    - Primer cruce del umbral: se publica la alerta (nivel 1).
+    - Dentro del cooldown los denies siguientes no publican; se acumulan.
+    - Pasado el cooldown, si el umbral sigue superado, se publica un único
+      resumen "en curso, N denies más".
+    - Si el conteo llega a threshold * escalation_factor ** (nivel - 1) se
+      sube de nivel y se publica de inmediato (hasta max_level).
+    - El incidente termina cuando, pasado el cooldown, el conteo ya está
+      por debajo del umbral.
+
+    Los tiempos son los del evento, igual que la ventana de denies.
+    """
+
+    def __init__(self, cooldown_seconds: float = 300, escalation_factor: float = 2,
+                 max_level: int = 3):
+        self.cooldown = timedelta(seconds=cooldown_seconds)
+        self.escalation_factor = escalation_factor
+        self.max_level = max_level
+        self._incidents = {}
+
+    def _level(self, count: int, threshold: int) -> int:
+        level = 1
+        while (level < self.max_level
+               and count >= threshold * self.escalation_factor ** level):
+            level += 1
+        return level
+
+    def decide(self, device_id, count: int, threshold: int, timestamp: datetime,
+               denies: int = 1):
+        """
+        Devuelve (tipo, nivel, suprimidos) si hay que publicar, o None.
+        tipo es ALERT, ESCALATION o SUMMARY. `denies` es la cantidad de
+        denies que cubre esta decisión (un lote de SQS agrupa varios).
+        """
+        now = _as_utc(timestamp)
+        incident = self._incidents.get(device_id)
+        cooled = incident is not None and now - incident.last_sent >= self.cooldown
+
+        if count < threshold:
+            if cooled:
+                del self._incidents[device_id]
+            return None
+
+        level = self._level(count, threshold)
+        if incident is None:
+            self._incidents[device_id] = _Incident(level, now)
+            return ALERT, level, 0
+
+        if level > incident.level:
+            kind = ESCALATION
+        elif cooled:
+            kind = SUMMARY
+        else:
+            incident.suppressed += denies
+            return None
+
+        suppressed = incident.suppressed
+        incident.level = max(level, incident.level)
+        incident.last_sent = now
+        incident.suppressed = 0
+        return kind, incident.level, suppressed
+
+    def clear(self) -> None:
+        self._incidents.clear()
 
 
 class AlertService:
-    def __init__(self, repository, sns_client):
+    def __init__(self, repository, sns_client, deny_counter=None, alert_state=None):
         self._repo = repository
         self._sns = sns_client
+        # Opcional: DenyCounter en memoria; sin él se hace COUNT(*) por evento
+        self._deny_counter = deny_counter
+        # Opcional: AlertState con cooldown; sin él se publica en cada deny
+        # que supere el umbral
+        self._alert_state = alert_state
 
     def process_denied_event(self, device_name: str, timestamp: datetime) -> bool:
+        return self.process_denied_batch(device_name, [timestamp])
+
+    def process_denied_batch(self, device_name: str, timestamps: list) -> bool:
+        """
+        Evalúa el umbral una sola vez para un lote de denies del mismo
+        dispositivo (con el conteo de la ventana que termina en el más
+        reciente) y publica como máximo una alerta. Los denies se registran
+        en el DenyCounter recién cuando todo terminó bien: si algo falla,
+        SQS reintenta el lote y no se cuentan dos veces.
+        """
+        if not timestamps:
+            return False
+        timestamp = max(timestamps)
+
         # 1) Obtener device_id
         device_id = self._repo.get_device_id(device_name)
         if device_id is None:
@@ -19,22 +124,53 @@ class AlertService:
 
         # 3) Contar denies
         start = timestamp - timedelta(seconds=window_seconds)
-        count = self._repo.count_denies(device_id, start, timestamp)
-
-        # 4) Publicar alerta si supera umbral
-        if count >= threshold:
-            payload = {
-                "alert_type":     "ACCESS_DENIED_THRESHOLD_EXCEEDED",
-                "device_name":    device_name,
-                "denied_count":   count,
-                "threshold":      threshold,
-                "window_seconds": window_seconds,
-                "period_start":   start.isoformat() + 'Z',
-                "period_end":     timestamp.isoformat() + 'Z',
-                "timestamp":      datetime.utcnow().isoformat() + 'Z'
-            }
-            subject = f"[ALERTA] {count} denies en {device_name}"
-            self._sns.publish_alert(payload, subject)
-            return True
-
-        return False
+        if self._deny_counter is not None:
+            count = self._deny_counter.count(
+                self._repo, device_id, timestamps, window_seconds)
+        else:
+            count = self._repo.count_denies(device_id, start, timestamp)
+
+        alerted = self._alert(device_name, device_id, timestamps, count,
+                              threshold, window_seconds)
+        if self._deny_counter is not None:
+            self._deny_counter.record(device_id, timestamps)
+        return alerted
+
+    def _alert(self, device_name: str, device_id, timestamps: list, count: int,
+               threshold: int, window_seconds: int) -> bool:
+        timestamp = max(timestamps)
+        start = timestamp - timedelta(seconds=window_seconds)
+
+        # 4) Decidir si se publica (el estado también ve los conteos bajo el
+        #    umbral, para cerrar incidentes)
+        if self._alert_state is not None:
+            decision = self._alert_state.decide(device_id, count, threshold, timestamp,
+                                                denies=len(timestamps))
+        else:
+            decision = (ALERT, 1, 0) if count >= threshold else None
+        if decision is None:
+            return False
+
+        # 5) Publicar alerta
+        kind, level, suppressed = decision
+        payload = {
+            "alert_type":     "ACCESS_DENIED_THRESHOLD_EXCEEDED",
+            "device_name":    device_name,
+            "denied_count":   count,
+            "threshold":      threshold,
+            "window_seconds": window_seconds,
+            "period_start":   start.isoformat() + 'Z',
+            "period_end":     timestamp.isoformat() + 'Z',
+            "timestamp":      datetime.utcnow().isoformat() + 'Z'
+        }
+        subject = f"[ALERTA] {count} denies en {device_name}"
+        if self._alert_state is not None:
+            payload["alert_level"] = level
+            payload["suppressed_count"] = suppressed
+            if kind == SUMMARY:
+                payload["alert_type"] = "ACCESS_DENIED_THRESHOLD_ONGOING"
+                subject = f"[ALERTA] En curso en {device_name}: {suppressed} denies más"
+            elif kind == ESCALATION:
+                subject = f"[ALERTA nivel {level}] {count} denies en {device_name}"
+        self._sns.publish_alert(payload, subject)
+        return True
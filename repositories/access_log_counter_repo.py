@@ -0,0 +1,170 @@
+# repositories/access_log_counter_repo.py
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+from peewee import EXCLUDED, fn
+from shared.models import AccessLog, AccessLogCounter, db
+
+SCOPE_TOTAL = "total"
+SCOPE_DEVICE = "device"
+SCOPE_USER = "user"
+
+
+class AccessLogCounterRepository:
+    """
+    Repositorio de los conteos mantenidos de access_logs (por dispositivo y
+    por usuario). Permite responder conteos sin recorrer la tabla.
+
+    El total no se guarda: se calcula como la suma de los contadores por
+    dispositivo. Una fila total actualizada en cada ingesta serializaría
+    todas las transacciones concurrentes en su lock. La fila 'total' solo
+    marca que los contadores están inicializados (rebuild).
+    """
+
+    @staticmethod
+    def _deltas_for(logs: Iterable[Dict[str, Any]]) -> Counter:
+        """Agrupa logs (dicts con device_id y access_user_id) en deltas por clave."""
+        deltas: Counter = Counter()
+        for log in logs:
+            deltas[(SCOPE_DEVICE, str(log["device_id"]))] += 1
+            if log.get("access_user_id") is not None:
+                deltas[(SCOPE_USER, str(log["access_user_id"]))] += 1
+        return deltas
+
+    def apply(self, deltas: Dict[Tuple[str, str], int]) -> None:
+        """
+        Suma los deltas a los contadores con un único
+        INSERT ... ON CONFLICT (scope, key) DO UPDATE SET count = count + EXCLUDED.count.
+        Debe llamarse dentro de la transacción que modifica access_logs.
+
+        Las filas van ordenadas por (scope, key): todas las transacciones
+        toman los locks en el mismo orden y no pueden quedar en deadlock.
+
+        Args:
+            deltas: {(scope, key): delta}
+        """
+        rows = [
+            {"scope": scope, "key": key, "count": delta}
+            for (scope, key), delta in sorted(deltas.items()) if delta
+        ]
+        if not rows:
+            return
+
+        (AccessLogCounter
+         .insert_many(rows)
+         .on_conflict(
+             conflict_target=[AccessLogCounter.scope, AccessLogCounter.key],
+             update={AccessLogCounter.count: AccessLogCounter.count + EXCLUDED.count})
+         .execute())
+
+    def increment(self, logs: Iterable[Dict[str, Any]]) -> None:
+        """Cuenta los logs recién insertados."""
+        self.apply(self._deltas_for(logs))
+
+    def discount_user_logs(self, user_id: int) -> None:
+        """
+        Descuenta los logs de un usuario antes de eliminarlos: resta por
+        dispositivo y borra el contador del usuario (después, respetando el
+        orden de locks de `apply`).
+
+        Args:
+            user_id: ID del usuario cuyos logs se van a eliminar
+        """
+        per_device = (AccessLog
+                      .select(AccessLog.device_id, fn.COUNT(AccessLog.id))
+                      .where(AccessLog.access_user_id == user_id)
+                      .group_by(AccessLog.device_id)
+                      .tuples())
+
+        deltas: Counter = Counter()
+        for device_id, count in per_device:
+            deltas[(SCOPE_DEVICE, str(device_id))] -= count
+
+        self.apply(deltas)
+        AccessLogCounter.delete().where(
+            (AccessLogCounter.scope == SCOPE_USER) &
+            (AccessLogCounter.key == str(user_id))
+        ).execute()
+
+    def get(self, scope: str, key: str = "") -> Optional[int]:
+        """
+        Devuelve el valor de un contador, o None si no existe.
+
+        Args:
+            scope: 'total', 'device' o 'user'
+            key: ID del dispositivo/usuario ('' para el total)
+        """
+        row = (AccessLogCounter
+               .select(AccessLogCounter.count)
+               .where((AccessLogCounter.scope == scope) & (AccessLogCounter.key == key))
+               .tuples()
+               .first())
+        return row[0] if row else None
+
+    def count(
+        self,
+        user_id: Optional[int] = None,
+        device_id: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Conteo de logs a partir de los contadores.
+
+        Args:
+            user_id: Filtrar por ID de usuario (opcional)
+            device_id: Filtrar por ID de dispositivo (opcional)
+
+        Returns:
+            Número de logs, o None si los contadores no pueden responder
+            (filtro combinado usuario + dispositivo, o contadores nunca
+            inicializados: falta la fila 'total').
+        """
+        if user_id is not None and device_id is not None:
+            return None
+
+        if self.get(SCOPE_TOTAL) is None:
+            return None
+
+        if user_id is not None:
+            return self.get(SCOPE_USER, str(user_id)) or 0
+        if device_id is not None:
+            return self.get(SCOPE_DEVICE, str(device_id)) or 0
+        return self.total()
+
+    def total(self) -> int:
+        """Total de logs: suma de los contadores por dispositivo (pocas filas)."""
+        return int(AccessLogCounter
+                   .select(fn.COALESCE(fn.SUM(AccessLogCounter.count), 0))
+                   .where(AccessLogCounter.scope == SCOPE_DEVICE)
+                   .scalar())
+
+    def rebuild(self) -> int:
+        """
+        Recalcula todos los contadores desde access_logs (backfill inicial o
+        corrección de deriva).
+
+        Returns:
+            Total de logs contados
+        """
+        with db.atomic():
+            AccessLogCounter.delete().execute()
+
+            deltas: Counter = Counter()
+            per_device = (AccessLog
+                          .select(AccessLog.device_id, fn.COUNT(AccessLog.id))
+                          .group_by(AccessLog.device_id)
+                          .tuples())
+            for device_id, count in per_device:
+                deltas[(SCOPE_DEVICE, str(device_id))] = count
+
+            per_user = (AccessLog
+                        .select(AccessLog.access_user_id, fn.COUNT(AccessLog.id))
+                        .where(AccessLog.access_user_id.is_null(False))
+                        .group_by(AccessLog.access_user_id)
+                        .tuples())
+            for user_id, count in per_user:
+                deltas[(SCOPE_USER, str(user_id))] = count
+
+            # La fila total no lleva conteo: solo marca los contadores como inicializados
+            AccessLogCounter.insert(scope=SCOPE_TOTAL, key="", count=0).execute()
+            self.apply(deltas)
+
+        return self.total()
@@ -1,17 +1,30 @@
 # repositories/access_log_repo.py
-from typing import List, Optional, Dict
+from typing import Any, Iterable, Iterator, List, Optional, Dict, Set, Tuple
 from datetime import datetime
+import json
 import uuid
-from peewee import DoesNotExist, JOIN
+from peewee import DoesNotExist, JOIN, PostgresqlDatabase
 from shared.models import AccessLog, AccessUser, Device
 from typing import Optional
 from datetime import datetime
 from shared.models import AccessLog, db
+from repositories.access_log_counter_repo import AccessLogCounterRepository
+
+
+def _uuid_key(value) -> str:
+    """Normaliza un UUID (str o uuid.UUID) para poder comparar resultados de la BD."""
+    try:
+        return uuid.UUID(str(value)).hex
+    except ValueError:
+        return str(value)
 
 
 class AccessLogRepository:
     """Repositorio para operaciones con AccessLog usando Peewee ORM"""
 
+    def __init__(self, counter_repo: Optional[AccessLogCounterRepository] = None):
+        self.counter_repo = counter_repo or AccessLogCounterRepository()
+
     def create(self, access_user_id: int, device_id: str, event: str, timestamp: datetime) -> AccessLog:
         """
         Crea un nuevo log de acceso.
@@ -26,13 +39,19 @@ class AccessLogRepository:
             AccessLog creado
         """
         _id = uuid.uuid4()
-        return AccessLog.create(
-            id=_id,
-            access_user_id=access_user_id,
-            device_id=device_id,
-            event=event,
-            timestamp=timestamp
-        )
+        with db.atomic():
+            log = AccessLog.create(
+                id=_id,
+                access_user_id=access_user_id,
+                device_id=device_id,
+                event=event,
+                timestamp=timestamp
+            )
+            self.counter_repo.increment([{
+                "access_user_id": access_user_id,
+                "device_id": device_id,
+            }])
+        return log
 
     def ingest(
         self,
@@ -41,9 +60,10 @@ class AccessLogRepository:
         device_id: str,
         event: str,
         timestamp: str
-    ) -> None:
+    ) -> bool:
         """
-        Inserta un nuevo AccessLog a partir del payload validado.
+        Inserta un nuevo AccessLog a partir del payload validado, de forma
+        idempotente: INSERT ... ON CONFLICT (id) DO NOTHING RETURNING id.
 
         Args:
             uuid:             UUID del log (string).
@@ -51,18 +71,111 @@ class AccessLogRepository:
             device_id:        ID del dispositivo (string).
             event:            Tipo de evento ('accepted'|'denied').
             timestamp:        ISO8601 string, ej. "2025-05-20T21:00:00Z".
+
+        Returns:
+            True si se insertó, False si el UUID ya existía (reentrega duplicada)
+        """
+        inserted = self.bulk_ingest([{
+            "uuid": uuid,
+            "access_user_id": access_user_id,
+            "device_id": device_id,
+            "event": event,
+            "timestamp": timestamp,
+        }])
+        return bool(inserted)
+
+    def bulk_ingest(self, logs: List[Dict[str, Any]]) -> Set[str]:
         """
-        # 1) Convierte el timestamp a datetime
-        ts = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-        # 2) Guarda dentro de una transacción
+        Inserta varios AccessLog con un único INSERT multi-fila idempotente
+        (ON CONFLICT (id) DO NOTHING RETURNING id). Los contadores de
+        access_log_counters se actualizan en la misma transacción, solo con
+        las filas efectivamente insertadas.
+
+        Args:
+            logs: Lista de dicts con las mismas claves que `ingest`
+                  (uuid, access_user_id, device_id, event, timestamp ISO8601).
+
+        Returns:
+            Set con los UUIDs (tal como se recibieron) que efectivamente se
+            insertaron; el resto ya existía.
+        """
+        if not logs:
+            return set()
+
+        by_key = {_uuid_key(log["uuid"]): log for log in logs}
+
         with db.atomic():
-            AccessLog.create(
-                id=uuid,
-                access_user=access_user_id,
-                device=device_id,
-                event=event,
-                timestamp=ts
-            )
+            if db.returning_clause:
+                rows = by_key.values()
+            else:
+                # SQLite sin RETURNING (tests): se emula con una verificación
+                # previa dentro de la misma transacción.
+                existing = self.existing_ids(log["uuid"] for log in by_key.values())
+                rows = [log for log in by_key.values() if log["uuid"] not in existing]
+                if not rows:
+                    return set()
+
+            query = (AccessLog
+                     .insert_many([self._to_row(log) for log in rows])
+                     .on_conflict(conflict_target=[AccessLog.id], action="IGNORE"))
+
+            if db.returning_clause:
+                cursor = query.returning(AccessLog.id).tuples().execute()
+                inserted_keys = {_uuid_key(log_id) for (log_id,) in cursor}
+            else:
+                query.execute()
+                inserted_keys = {_uuid_key(log["uuid"]) for log in rows}
+
+            self.counter_repo.increment(by_key[key] for key in inserted_keys if key in by_key)
+
+        return {by_key[key]["uuid"] for key in inserted_keys if key in by_key}
+
+    @staticmethod
+    def _to_row(log: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte un log validado en la fila a insertar."""
+        return {
+            "id": log["uuid"],
+            "access_user": log.get("access_user_id"),
+            "device": log["device_id"],
+            "event": log["event"],
+            "timestamp": datetime.fromisoformat(
+                log["timestamp"].replace("Z", "+00:00")),
+        }
+
+    def _joined_query(self):
+        """Query base de logs con joins a usuario y dispositivo."""
+        return (AccessLog
+                .select(AccessLog, AccessUser, Device)
+                .join(AccessUser, JOIN.LEFT_OUTER, on=(AccessLog.access_user_id == AccessUser.id))
+                .switch(AccessLog)
+                .join(Device, JOIN.LEFT_OUTER, on=(AccessLog.device_id == Device.id_device)))
+
+    @staticmethod
+    def _apply_filters(
+        query,
+        user_id: Optional[int] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ):
+        """Aplica los filtros opcionales comunes a listados y conteos."""
+        if user_id is not None:
+            query = query.where(AccessLog.access_user_id == user_id)
+
+        if device_id is not None:
+            query = query.where(AccessLog.device_id == device_id)
+
+        if event is not None:
+            query = query.where(AccessLog.event == event)
+
+        if start is not None:
+            query = query.where(AccessLog.timestamp >= start)
+
+        if end is not None:
+            query = query.where(AccessLog.timestamp < end)
+
+        return query
 
     def get_logs_with_filters(
         self,
@@ -81,19 +194,8 @@ class AccessLogRepository:
         Returns:
             Lista de AccessLog con datos relacionados
         """
-        # Query base con joins
-        query = (AccessLog
-                 .select(AccessLog, AccessUser, Device)
-                 .join(AccessUser, JOIN.LEFT_OUTER, on=(AccessLog.access_user_id == AccessUser.id))
-                 .switch(AccessLog)
-                 .join(Device, JOIN.LEFT_OUTER, on=(AccessLog.device_id == Device.id_device)))
-
-        # Aplicar filtros si existen
-        if user_id is not None:
-            query = query.where(AccessLog.access_user_id == user_id)
-
-        if device_id is not None:
-            query = query.where(AccessLog.device_id == device_id)
+        # Query base con joins y filtros
+        query = self._apply_filters(self._joined_query(), user_id, device_id)
 
         # Ordenar por timestamp descendente y limitar
         query = query.order_by(AccessLog.timestamp.desc()).limit(limit)
@@ -101,31 +203,201 @@ class AccessLogRepository:
         # Ejecutar query y retornar resultados con datos precargados
         return list(query)
 
-    def count_by_filters(
+    def get_logs_page(
         self,
         user_id: Optional[int] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: int = 50
+    ) -> List[AccessLog]:
+        """
+        Obtiene una página de logs con paginación por keyset sobre
+        (timestamp, id), del más reciente al más antiguo. El costo no depende
+        de la profundidad de la página (no usa OFFSET).
+
+        Args:
+            user_id: Filtrar por ID de usuario (opcional)
+            device_id: Filtrar por ID de dispositivo (opcional)
+            event: Filtrar por tipo de evento (opcional)
+            start: Incluir logs con timestamp >= start (opcional)
+            end: Incluir logs con timestamp < end (opcional)
+            after: (timestamp, id) del último log de la página anterior
+            limit: Número máximo de resultados
+
+        Returns:
+            Lista de AccessLog con datos relacionados
+        """
+        query = self._apply_filters(
+            self._joined_query(), user_id, device_id, event, start, end)
+
+        if after is not None:
+            after_ts, after_id = after
+            query = query.where(
+                (AccessLog.timestamp < after_ts) |
+                ((AccessLog.timestamp == after_ts) & (AccessLog.id < after_id))
+            )
+
+        query = (query
+                 .order_by(AccessLog.timestamp.desc(), AccessLog.id.desc())
+                 .limit(limit))
+        return list(query)
+
+    def iter_logs(
+        self,
+        user_id: Optional[int] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[AccessLog]:
+        """
+        Recorre todos los logs que cumplen los filtros en bloques de
+        `chunk_size` usando la paginación keyset: cada bloque es una consulta
+        acotada, así la memoria no depende del total de filas.
+
+        Args:
+            (mismos filtros que `get_logs_page`)
+            chunk_size: Filas por consulta
+
+        Yields:
+            AccessLog con datos relacionados, del más reciente al más antiguo
+        """
+        after = None
+        while True:
+            chunk = self.get_logs_page(
+                user_id, device_id, event, start, end, after=after, limit=chunk_size)
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            after = (chunk[-1].timestamp, str(chunk[-1].id))
+
+    def iter_deny_times(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
         device_id: Optional[str] = None
+    ) -> Iterator[Tuple[str, datetime]]:
+        """
+        Recorre (device_id, timestamp) de los denies, ordenados por
+        dispositivo y timestamp, sin construir modelos (para análisis
+        offline sobre millones de filas).
+
+        Args:
+            start: Incluir denies con timestamp >= start (opcional)
+            end: Incluir denies con timestamp <= end (opcional)
+            device_id: Filtrar por ID de dispositivo (opcional)
+        """
+        query = (
+            AccessLog
+            .select(AccessLog.device, AccessLog.timestamp)
+            .where(AccessLog.event == "denied")
+        )
+        if device_id is not None:
+            query = query.where(AccessLog.device == device_id)
+        if start is not None:
+            query = query.where(AccessLog.timestamp >= start)
+        if end is not None:
+            query = query.where(AccessLog.timestamp <= end)
+        return query.order_by(AccessLog.device, AccessLog.timestamp).tuples().iterator()
+
+    def count_by_filters(
+        self,
+        user_id: Optional[int] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
     ) -> int:
         """
-        Cuenta logs según filtros.
+        Cuenta logs según filtros (SELECT COUNT(*) exacto).
 
         Args:
             user_id: Filtrar por ID de usuario (opcional)
             device_id: Filtrar por ID de dispositivo (opcional)
+            event: Filtrar por tipo de evento (opcional)
+            start: Incluir logs con timestamp >= start (opcional)
+            end: Incluir logs con timestamp < end (opcional)
 
         Returns:
             Número de logs que cumplen los filtros
         """
-        query = AccessLog.select()
+        query = self._apply_filters(
+            AccessLog.select(), user_id, device_id, event, start, end)
+        return query.count()
+
+    def count_cached(
+        self,
+        user_id: Optional[int] = None,
+        device_id: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Conteo a partir de los contadores mantenidos en la ingesta (O(1)).
 
-        if user_id is not None:
-            query = query.where(AccessLog.access_user_id == user_id)
+        Returns:
+            Número de logs, o None si los contadores no pueden responder
+        """
+        return self.counter_repo.count(user_id=user_id, device_id=device_id)
 
-        if device_id is not None:
-            query = query.where(AccessLog.device_id == device_id)
+    def estimate_count(
+        self,
+        user_id: Optional[int] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Optional[int]:
+        """
+        Conteo aproximado a partir de las estadísticas del planner de Postgres:
+        `pg_class.reltuples` sin filtros, o las filas estimadas por
+        EXPLAIN para la consulta filtrada. No recorre la tabla.
 
-        return query.count()
+        Returns:
+            Número estimado de logs, o None si el motor no ofrece estimaciones
+            (SQLite) o la tabla aún no fue analizada
+        """
+        if not isinstance(db, PostgresqlDatabase):
+            return None
+
+        if all(value is None for value in (user_id, device_id, event, start, end)):
+            cursor = db.execute_sql(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                (AccessLog._meta.table_name,))
+            row = cursor.fetchone()
+            # reltuples = -1 si la tabla nunca fue analizada (PG >= 14)
+            return int(row[0]) if row and row[0] >= 0 else None
+
+        query = self._apply_filters(
+            AccessLog.select(AccessLog.id), user_id, device_id, event, start, end)
+        sql, params = query.sql()
+        row = db.execute_sql("EXPLAIN (FORMAT JSON) " + sql, params).fetchone()
+        plan = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+        return int(plan[0]["Plan"]["Plan Rows"])
 
     def exists(self, log_id: str) -> bool:
         """Devuelve True si AccessLog con UUID existe."""
         return AccessLog.select().where(AccessLog.id == log_id).exists()
+
+    def existing_ids(self, log_ids: Iterable[str]) -> Set[str]:
+        """
+        Devuelve el subconjunto de UUIDs que ya existen, con una sola consulta IN.
+
+        Args:
+            log_ids: UUIDs a verificar (strings)
+
+        Returns:
+            Set con los UUIDs (tal como se recibieron) que ya están en la BD
+        """
+        by_key = {_uuid_key(log_id): log_id for log_id in log_ids if log_id}
+        if not by_key:
+            return set()
+
+        rows = (AccessLog
+                .select(AccessLog.id)
+                .where(AccessLog.id.in_(list(by_key.values())))
+                .tuples())
+        found = {_uuid_key(log_id) for (log_id,) in rows}
+        return {by_key[key] for key in found if key in by_key}
@@ -1,24 +1,132 @@
 # repositories/access_user_repo.py
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from peewee import prefetch, DoesNotExist
 from shared.models import AccessUser, Device, DeviceUserMapping
 import boto3
 import os
+import time
+from datetime import timedelta
 from urllib.parse import urlparse
 from peewee import fn
+from shared.cache import MISSING, BloomFilter, TTLCache, register
 from shared.models import db, AccessLog, DeviceUserMapping
+from repositories.access_log_counter_repo import AccessLogCounterRepository
+from repositories.device_user_mapping_repo import OP_DELETE, record_changes
+
+# Cache por contenedor: cédula -> id de usuario (solo positivos), para la
+# resolución de la ingesta. TTL corto: una baja desde otro contenedor se ve
+# recién al vencer; en este contenedor se invalida al borrar.
+_cedula_cache = TTLCache(
+    maxsize=int(os.environ.get("ACCESS_USER_CACHE_MAXSIZE", 10000)),
+    ttl=float(os.environ.get("ACCESS_USER_CACHE_TTL", 30)),
+)
+
+
+class _UserPrefilter:
+    """
+    Filtro de Bloom de las cédulas de access_users.
+
+    La primera consulta carga toda la tabla; luego se refresca de forma
+    incremental (como máximo cada `refresh_seconds`) leyendo solo las filas con
+    created_at posterior a la marca de agua. Un "no está" del filtro solo se
+    da por bueno si el último refresco tiene menos de `recheck_seconds`; si
+    no, se refresca antes (un usuario recién creado desde otro contenedor no
+    debe quedar afuera hasta el próximo refresco). Un "puede estar" siempre
+    se confirma en la BD o la cache de positivos.
+    """
+
+    # Margen hacia atrás en cada refresco, por relojes desfasados entre contenedores
+    OVERLAP = timedelta(minutes=5)
+
+    def __init__(self, refresh_seconds: float, recheck_seconds: float = 1,
+                 error_rate: float = 0.01, clock=time.monotonic):
+        self.refresh_seconds = refresh_seconds
+        self.recheck_seconds = recheck_seconds
+        self.error_rate = error_rate
+        self._clock = clock
+        self.clear()
+        register(self)
+
+    def clear(self) -> None:
+        self.cedulas: Optional[BloomFilter] = None
+        self.watermark = None
+        self._last_refresh = None
+
+    def ensure_fresh(self) -> None:
+        """Carga o refresca el filtro si corresponde."""
+        if self.cedulas is None or self.cedulas.saturated:
+            self._load_all()
+        elif self._clock() - self._last_refresh >= self.refresh_seconds:
+            self._load_since(self.watermark)
+
+    def _load_all(self) -> None:
+        capacity = max(2 * AccessUser.select().count(), 1024)
+        self.cedulas = BloomFilter(capacity, self.error_rate)
+        self.watermark = None
+        self._load_since(None)
+
+    def _load_since(self, watermark) -> None:
+        query = AccessUser.select(AccessUser.cedula, AccessUser.created_at)
+        if watermark is not None:
+            query = query.where(AccessUser.created_at > watermark - self.OVERLAP)
+
+        for cedula, created_at in query.tuples().iterator():
+            self.add(cedula)
+            if created_at is not None and (self.watermark is None
+                                           or created_at > self.watermark):
+                self.watermark = created_at
+        self._last_refresh = self._clock()
+
+    def add(self, cedula: Optional[str]) -> None:
+        """Agrega una cédula al filtro (si está cargado)."""
+        if self.cedulas is not None and cedula:
+            self.cedulas.add(cedula)
+
+    def may_have_cedula(self, cedula: str) -> bool:
+        self.ensure_fresh()
+        if cedula in self.cedulas:
+            return True
+        if self._clock() - self._last_refresh < self.recheck_seconds:
+            return False
+        self._load_since(self.watermark)
+        return cedula in self.cedulas
+
+
+_prefilter = _UserPrefilter(
+    refresh_seconds=float(os.environ.get("ACCESS_USER_BLOOM_REFRESH", 60)),
+    recheck_seconds=float(os.environ.get("ACCESS_USER_BLOOM_RECHECK", 1)))
+
+
+def _bloom_enabled_by_env() -> bool:
+    return os.environ.get("ACCESS_USER_BLOOM", "").lower() in ("1", "true", "yes")
 
 
 class AccessUserRepository:
     """Repositorio para operaciones con AccessUser usando Peewee ORM"""
 
+    def __init__(self, use_bloom: Optional[bool] = None):
+        """
+        Args:
+            use_bloom: Activa el prefiltro Bloom de cédulas en la resolución
+                       de la ingesta. Por defecto se toma de la variable
+                       ACCESS_USER_BLOOM.
+        """
+        self.use_bloom = _bloom_enabled_by_env() if use_bloom is None else use_bloom
+
     def exists(self, cedula: str) -> bool:
-        """Verifica si existe un usuario por cédula"""
+        """
+        Verifica si existe un usuario por cédula. Control de duplicados del
+        alta: siempre consulta la BD.
+        """
         return AccessUser.select().where(AccessUser.cedula == cedula).exists()
 
     def create(self, **kwargs) -> AccessUser:
         """Crea un nuevo usuario"""
-        return AccessUser.create(**kwargs)
+        user = AccessUser.create(**kwargs)
+        _prefilter.add(user.cedula)
+        if user.cedula:
+            _cedula_cache.set(user.cedula, user.id)
+        return user
 
     def get_by_cedula(self, cedula: str) -> AccessUser:
         """Obtiene un usuario por cédula"""
@@ -27,8 +135,14 @@ class AccessUserRepository:
     def get_id_by_cedula(self, cedula: str) -> Optional[int]:
         """
         Devuelve el ID del usuario con la cédula dada,
-        o None si no existe.
+        o None si no existe. Usa la cache por contenedor y, si está
+        activo, el prefiltro Bloom para rechazar cédulas desconocidas.
         """
+        if self.use_bloom and not _prefilter.may_have_cedula(cedula):
+            return None
+        return _cedula_cache.get_or_load(cedula, self._load_id_by_cedula)
+
+    def _load_id_by_cedula(self, cedula: str) -> Optional[int]:
         row = (
             AccessUser
             .select(AccessUser.id)
@@ -37,6 +151,38 @@ class AccessUserRepository:
         )
         return row.id if row else None
 
+    def get_ids_by_cedulas(self, cedulas: Iterable[str]) -> Dict[str, int]:
+        """
+        Resuelve varias cédulas a IDs de usuario en una sola consulta (IN).
+
+        Args:
+            cedulas: Cédulas a resolver
+
+        Returns:
+            Dict {cedula: id} solo con las cédulas existentes
+        """
+        result: Dict[str, int] = {}
+        missing = []
+        for cedula in {c for c in cedulas if c}:
+            if self.use_bloom and not _prefilter.may_have_cedula(cedula):
+                continue
+            cached = _cedula_cache.get(cedula)
+            if cached is MISSING:
+                missing.append(cedula)
+            else:
+                result[cedula] = cached
+
+        if missing:
+            rows = (AccessUser
+                    .select(AccessUser.cedula, AccessUser.id)
+                    .where(AccessUser.cedula.in_(missing))
+                    .tuples())
+            for cedula, user_id in rows:
+                _cedula_cache.set(cedula, user_id)
+                result[cedula] = user_id
+
+        return result
+
     def get_by_id(self, user_id: int) -> Optional[AccessUser]:
         """Obtiene un usuario por ID"""
         try:
@@ -44,8 +190,26 @@ class AccessUserRepository:
         except DoesNotExist:
             return None
 
+    def iter_face_embeddings(self) -> Iterable[tuple]:
+        """
+        Recorre (id, embedding) de los usuarios con embedding cargado: el
+        binario (face_embedding_bin) si existe, si no el JSON.
+        """
+        query = (
+            AccessUser
+            .select(AccessUser.id, AccessUser.face_embedding_bin, AccessUser.face_embedding)
+            .where(AccessUser.face_embedding_bin.is_null(False)
+                   | AccessUser.face_embedding.is_null(False))
+            .tuples()
+        )
+        for user_id, blob, json_text in query.iterator():
+            yield user_id, blob if blob is not None else json_text
+
     def exists_rfid(self, rfid: str) -> bool:
-        """Devuelve True si ya hay un usuario con ese RFID."""
+        """
+        Devuelve True si ya hay un usuario con ese RFID. Control de
+        duplicados del alta (rfid no tiene UNIQUE): siempre consulta la BD.
+        """
         return AccessUser.select().where(AccessUser.rfid == rfid).exists()
 
     def get_by_id_with_devices(self, user_id: int) -> Optional[AccessUser]:
@@ -167,16 +331,25 @@ class AccessUserRepository:
                 # Verificar que el usuario existe
                 user = AccessUser.get_by_id(user_id)
 
-                # Eliminar logs de acceso
+                # Eliminar logs de acceso (descontándolos de los contadores)
+                AccessLogCounterRepository().discount_user_logs(user_id)
                 AccessLog.delete().where(AccessLog.access_user_id == user_id).execute()
 
-                # Eliminar mappings de dispositivos
+                # Eliminar mappings de dispositivos (y registrar la baja
+                # para la sincronización delta de cada dispositivo)
+                device_ids = [m.device_id for m in DeviceUserMapping
+                              .select(DeviceUserMapping.device)
+                              .where(DeviceUserMapping.access_user_id == user_id)]
+                record_changes(user_id, device_ids, OP_DELETE, cedula=user.cedula)
                 DeviceUserMapping.delete().where(
                     DeviceUserMapping.access_user_id == user_id).execute()
 
                 # Eliminar el usuario
                 user.delete_instance()
+                _cedula_cache.invalidate(user.cedula)
 
+                # El Bloom no admite borrados: la cédula queda como falso
+                # positivo, que se descarta al confirmar en la BD
                 return True
 
             except DoesNotExist:
@@ -1,8 +1,13 @@
 # repositories/configuration_repo.py
+import time
 from typing import Dict, List, Optional
 from peewee import DoesNotExist
 from shared.models import Configuration
 
+# Fila global que marca la versión de las configuraciones; las cachés de
+# configuración (p. ej. la de lambda_alert_check) se invalidan al cambiar
+CONFIG_VERSION = "config_version"
+
 
 class ConfigurationRepository:
     """Repositorio para operaciones con Configuration usando Peewee ORM"""
@@ -67,7 +72,10 @@ class ConfigurationRepository:
         return list(
             Configuration
             .select()
-            .where(Configuration.device_id.is_null())
+            .where(
+                Configuration.device_id.is_null()
+                & (Configuration.name_config != CONFIG_VERSION)
+            )
             .order_by(Configuration.name_config)
         )
     
@@ -112,4 +120,22 @@ class ConfigurationRepository:
             query = query.where(Configuration.device_id.is_null())
         
         updated = query.execute()
-        return updated > 0
\ No newline at end of file
+        return updated > 0
+
+    def bump_version(self) -> str:
+        """
+        Actualiza la marca de versión de las configuraciones (la crea si no
+        existe). Se llama después de cada edición.
+
+        Returns:
+            Nueva versión (time.time_ns() como string)
+        """
+        version = str(time.time_ns())
+        if not self.update_value(CONFIG_VERSION, version):
+            Configuration.create(
+                name_config=CONFIG_VERSION,
+                value=version,
+                description="Versión de las configuraciones (uso interno)",
+                device_id=None
+            )
+        return version
@@ -1,7 +1,18 @@
-from typing import List, Optional, Union
+import os
+from typing import Dict, Iterable, List, Optional, Union
 from peewee import DoesNotExist
+from shared.cache import MISSING, TTLCache
 from shared.models import Device
 
+# Cache por contenedor: location -> id_device. La tabla devices casi no cambia,
+# y los negativos se guardan poco tiempo para que una Raspberry mal configurada
+# no genere una consulta por evento.
+_location_cache = TTLCache(
+    maxsize=int(os.environ.get("DEVICE_CACHE_MAXSIZE", 256)),
+    ttl=float(os.environ.get("DEVICE_CACHE_TTL", 300)),
+    negative_ttl=float(os.environ.get("DEVICE_CACHE_NEGATIVE_TTL", 30)),
+)
+
 
 class DeviceRepository:
     """Repositorio para operaciones con Device usando Peewee ORM"""
@@ -12,7 +23,10 @@ class DeviceRepository:
     
     def create(self, **kwargs) -> Device:
         """Crea un nuevo dispositivo"""
-        return Device.create(**kwargs)
+        device = Device.create(**kwargs)
+        # Puede haber un negativo cacheado para esta ubicación
+        self.invalidate_cache(device.location)
+        return device
     
     def get_by_location(self, location: str) -> Optional[Device]:
         """Obtiene un dispositivo por ubicación"""
@@ -26,9 +40,52 @@ class DeviceRepository:
         Obtiene el ID de un dispositivo por ubicación.
         Mantiene compatibilidad con código existente.
         Nota: Devuelve string porque id_device es VARCHAR en la BD.
+        Usa la cache por contenedor (incluye negativos de corta duración).
         """
+        return _location_cache.get_or_load(location, self._load_id_by_location)
+
+    def _load_id_by_location(self, location: str) -> Optional[str]:
         device = self.get_by_location(location)
         return device.id_device if device else None
+
+    def get_ids_by_locations(
+        self,
+        locations: Iterable[str],
+        recheck_missing: bool = False
+    ) -> Dict[str, str]:
+        """
+        Resuelve varias ubicaciones a sus IDs en una sola consulta (IN).
+        Las ubicaciones ya cacheadas (positivas o negativas) no se consultan.
+
+        Args:
+            locations: Ubicaciones/nombres de dispositivos
+            recheck_missing: Consultar también las ubicaciones con negativo
+                             cacheado (para escrituras: un dispositivo recién
+                             creado desde otro contenedor no debe rechazarse)
+
+        Returns:
+            Dict {location: id_device} solo con las ubicaciones existentes
+        """
+        result: Dict[str, str] = {}
+        missing = []
+        for location in {loc for loc in locations if loc}:
+            cached = _location_cache.get(location)
+            if cached is MISSING or (cached is None and recheck_missing):
+                missing.append(location)
+            elif cached is not None:
+                result[location] = cached
+
+        if missing:
+            rows = (Device
+                    .select(Device.id_device, Device.location)
+                    .where(Device.location.in_(missing))
+                    .tuples())
+            found = {location: id_device for id_device, location in rows}
+            for location in missing:
+                _location_cache.set(location, found.get(location))
+            result.update(found)
+
+        return result
     
     def get_by_id(self, device_id: Union[int, str]) -> Optional[Device]:
         """
@@ -55,6 +112,10 @@ class DeviceRepository:
             
         Returns:
             True si se actualizó, False si no existe
+
+        No toca la cache location -> id: el estado no cambia la resolución
+        de ubicaciones (ni get_id_by_location ni get_ids_by_locations
+        filtran por estado).
         """
         updated = (Device
                   .update(status=status)
@@ -77,4 +138,38 @@ class DeviceRepository:
                   .update(last_sync=timestamp)
                   .where(Device.id_device == str(device_id))
                   .execute())
-        return updated > 0
\ No newline at end of file
+        return updated > 0
+
+    def ack_sync_revision(self, device_id: Union[int, str], revision: int, timestamp) -> bool:
+        """
+        Registra la revisión de device_user_changes que el dispositivo
+        confirmó haber aplicado. Solo avanza: un ack viejo o repetido no
+        retrocede la revisión.
+
+        Args:
+            device_id: ID del dispositivo (int o string)
+            revision: Revisión confirmada
+            timestamp: Momento de la sincronización (last_sync)
+
+        Returns:
+            True si se actualizó
+        """
+        updated = (Device
+                  .update(sync_revision=revision, last_sync=timestamp)
+                  .where((Device.id_device == str(device_id)) &
+                         (Device.sync_revision < revision))
+                  .execute())
+        return updated > 0
+
+    def invalidate_cache(self, location: Optional[str] = None) -> None:
+        """
+        Invalida la cache location -> id de este contenedor.
+
+        Args:
+            location: Ubicación a invalidar; None invalida toda la cache
+        """
+        _location_cache.invalidate(location)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Aciertos, fallos y tamaño de la cache location -> id."""
+        return _location_cache.stats()
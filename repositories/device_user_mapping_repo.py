@@ -1,7 +1,36 @@
 # repositories/device_user_mapping_repo.py
-from typing import List, Tuple
-from peewee import IntegrityError
-from shared.models import DeviceUserMapping, Device, AccessUser, db
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from peewee import IntegrityError, fn
+from shared.models import DeviceUserMapping, DeviceUserChange, Device, AccessUser, db
+
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+
+
+def record_changes(user_id: int, device_ids: Iterable[str], op: str,
+                   cedula: Optional[str] = None) -> None:
+    """
+    Registra en device_user_changes que `user_id` se agregó (OP_UPSERT) o
+    quitó (OP_DELETE) de cada dispositivo. Debe llamarse en la transacción
+    del cambio de mappings para que las revisiones no queden huérfanas.
+    """
+    device_ids = list(device_ids)
+    if not device_ids:
+        return
+    if cedula is None:
+        cedula = (AccessUser
+                  .select(AccessUser.cedula)
+                  .where(AccessUser.id == user_id)
+                  .scalar())
+    now = datetime.utcnow()
+    DeviceUserChange.insert_many([{
+        "device": device_id,
+        "access_user_id": user_id,
+        "cedula": cedula or "",
+        "op": op,
+        "created_at": now,
+    } for device_id in device_ids]).execute()
 
 
 class DeviceUserMappingRepository:
@@ -19,10 +48,12 @@ class DeviceUserMappingRepository:
             True si se agregó, False si ya existía
         """
         try:
-            DeviceUserMapping.create(
-                access_user_id=user_id,
-                device_id=device_id
-            )
+            with db.atomic():
+                DeviceUserMapping.create(
+                    access_user_id=user_id,
+                    device_id=device_id
+                )
+                record_changes(user_id, [device_id], OP_UPSERT)
             return True
         except IntegrityError:
             # Ya existe el mapping (ON CONFLICT DO NOTHING)
@@ -39,13 +70,16 @@ class DeviceUserMappingRepository:
         Returns:
             Número de registros eliminados (0 o 1)
         """
-        deleted = (DeviceUserMapping
-                  .delete()
-                  .where(
-                      (DeviceUserMapping.access_user_id == user_id) &
-                      (DeviceUserMapping.device_id == device_id)
-                  )
-                  .execute())
+        with db.atomic():
+            deleted = (DeviceUserMapping
+                      .delete()
+                      .where(
+                          (DeviceUserMapping.access_user_id == user_id) &
+                          (DeviceUserMapping.device_id == device_id)
+                      )
+                      .execute())
+            if deleted:
+                record_changes(user_id, [device_id], OP_DELETE)
         return deleted
     
     def get_user_devices(self, user_id: int) -> List[Device]:
@@ -73,6 +107,13 @@ class DeviceUserMappingRepository:
     ) -> Tuple[List[str], List[str]]:
         """
         Actualiza múltiples accesos de dispositivos en una transacción.
+
+        El diff contra los mappings actuales se calcula en memoria y se
+        aplica con un DELETE ... IN y un INSERT multi-fila que ignora
+        duplicados. Con RETURNING (Postgres) lo informado como agregado o
+        eliminado es lo que efectivamente cambió aunque otra transacción
+        haya tocado los mismos mappings; sin RETURNING (SQLite en tests) se
+        toma el diff contra la lectura previa de la misma transacción.
         
         Args:
             user_id: ID del usuario
@@ -82,19 +123,152 @@ class DeviceUserMappingRepository:
         Returns:
             Tupla con (dispositivos agregados, dispositivos eliminados)
         """
-        added = []
-        removed = []
-        
+        names = dict(devices_to_remove)
+        names.update(devices_to_add)
+
         with db.atomic():
-            # Eliminar accesos
-            for device_id, device_name in devices_to_remove:
-                count = self.remove_device_access(user_id, device_id)
-                if count > 0:
-                    removed.append(device_name)
-            
+            current = {m.device_id for m in DeviceUserMapping
+                       .select(DeviceUserMapping.device)
+                       .where(DeviceUserMapping.access_user_id == user_id)}
+
+            # Eliminar accesos (primero, como antes: quitar y agregar el mismo
+            # dispositivo lo deja con acceso e informa ambos)
+            to_remove = [d for d in dict.fromkeys(d for d, _ in devices_to_remove) if d in current]
+            removed_ids = []
+            if to_remove:
+                query = (DeviceUserMapping
+                         .delete()
+                         .where((DeviceUserMapping.access_user_id == user_id) &
+                                (DeviceUserMapping.device_id.in_(to_remove))))
+                if db.returning_clause:
+                    cursor = query.returning(DeviceUserMapping.device).tuples().execute()
+                    removed_ids = [device_id for (device_id,) in cursor]
+                else:
+                    query.execute()
+                    removed_ids = to_remove
+                current.difference_update(removed_ids)
+
             # Agregar accesos
-            for device_id, device_name in devices_to_add:
-                if self.add_device_access(user_id, device_id):
-                    added.append(device_name)
-        
-        return added, removed
\ No newline at end of file
+            to_add = [d for d in dict.fromkeys(d for d, _ in devices_to_add) if d not in current]
+            added_ids = []
+            if to_add:
+                query = (DeviceUserMapping
+                         .insert_many([{"access_user": user_id, "device": d} for d in to_add])
+                         .on_conflict_ignore())
+                if db.returning_clause:
+                    cursor = query.returning(DeviceUserMapping.device).tuples().execute()
+                    inserted = {device_id for (device_id,) in cursor}
+                    added_ids = [d for d in to_add if d in inserted]
+                else:
+                    query.execute()
+                    added_ids = to_add
+
+            if removed_ids or added_ids:
+                cedula = (AccessUser
+                          .select(AccessUser.cedula)
+                          .where(AccessUser.id == user_id)
+                          .scalar())
+                record_changes(user_id, removed_ids, OP_DELETE, cedula=cedula)
+                record_changes(user_id, added_ids, OP_UPSERT, cedula=cedula)
+
+        removed_set = set(removed_ids)
+        removed = [names[d] for d in dict.fromkeys(d for d, _ in devices_to_remove)
+                   if d in removed_set]
+        return [names[d] for d in added_ids], removed
+
+    def get_device_users(
+        self,
+        device_id: str,
+        user_ids: Optional[List[int]] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[AccessUser]:
+        """
+        Obtiene los usuarios con acceso a un dispositivo.
+
+        Args:
+            device_id: ID del dispositivo (string)
+            user_ids: Limita a estos usuarios (opcional)
+            after_id: Solo usuarios con ID mayor (paginación, opcional)
+            limit: Máximo de usuarios a devolver (opcional)
+
+        Returns:
+            Lista de usuarios ordenados por ID
+        """
+        users = (AccessUser
+                 .select()
+                 .join(DeviceUserMapping, on=(AccessUser.id == DeviceUserMapping.access_user_id))
+                 .where(DeviceUserMapping.device_id == device_id)
+                 .order_by(AccessUser.id))
+        if user_ids is not None:
+            users = users.where(AccessUser.id.in_(user_ids))
+        if after_id is not None:
+            users = users.where(AccessUser.id > after_id)
+        if limit is not None:
+            users = users.limit(limit)
+        return list(users)
+
+    def current_revision(self) -> int:
+        """Última revisión registrada en device_user_changes (0 si no hay)."""
+        return DeviceUserChange.select(fn.MAX(DeviceUserChange.revision)).scalar() or 0
+
+    def oldest_revision(self) -> int:
+        """Primera revisión que sigue en device_user_changes (0 si no hay)."""
+        return DeviceUserChange.select(fn.MIN(DeviceUserChange.revision)).scalar() or 0
+
+    def prune_changes(self, before: datetime) -> int:
+        """
+        Borra los cambios registrados antes de `before`. Siempre queda el
+        último, así oldest_revision marca hasta dónde se purgó.
+
+        Returns:
+            Cantidad de cambios borrados
+        """
+        return (DeviceUserChange
+                .delete()
+                .where((DeviceUserChange.created_at < before) &
+                       (DeviceUserChange.revision < self.current_revision()))
+                .execute())
+
+    def settled_revision(self, before: datetime) -> int:
+        """
+        Mayor revisión R tal que todos los cambios hasta R se registraron
+        antes de `before`: corta en el primer cambio reciente aunque haya
+        revisiones mayores más antiguas (transacciones concurrentes).
+        """
+        first_recent = (DeviceUserChange
+                        .select(fn.MIN(DeviceUserChange.revision))
+                        .where(DeviceUserChange.created_at >= before)
+                        .scalar())
+        if first_recent is None:
+            return self.current_revision()
+        return first_recent - 1
+
+    def get_changes_since(
+        self,
+        device_id: str,
+        revision: int,
+        limit: int,
+        max_revision: Optional[int] = None
+    ) -> List[DeviceUserChange]:
+        """
+        Obtiene los cambios de un dispositivo posteriores a `revision`.
+
+        Args:
+            device_id: ID del dispositivo (string)
+            revision: Última revisión que el dispositivo ya tiene
+            limit: Máximo de cambios a devolver
+            max_revision: Revisión máxima a incluir (opcional)
+
+        Returns:
+            Cambios ordenados por revisión
+        """
+        changes = (DeviceUserChange
+                   .select()
+                   .where((DeviceUserChange.device == device_id) &
+                          (DeviceUserChange.revision > revision))
+                   .order_by(DeviceUserChange.revision)
+                   .limit(limit))
+        if max_revision is not None:
+            changes = changes.where(DeviceUserChange.revision <= max_revision)
+        return list(changes)
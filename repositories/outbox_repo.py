@@ -0,0 +1,193 @@
+# repositories/outbox_repo.py
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from peewee import PostgresqlDatabase, fn
+
+from shared.models import OutboxMessage, db
+
+STATUS_PENDING = "pending"
+STATUS_DEAD = "dead"
+
+
+def get_outbox() -> Optional["OutboxRepository"]:
+    """
+    Outbox para los servicios que notifican a las Raspberry Pi, o None con
+    IOT_OUTBOX=0 (publicación directa durante el request).
+    """
+    if os.environ.get("IOT_OUTBOX", "1") == "0":
+        return None
+    return OutboxRepository()
+
+
+class OutboxRepository:
+    """
+    Repositorio del outbox de notificaciones IoT (OutboxMessage).
+
+    Un mensaje tomado para publicar (claim o enqueue_claimed) suma un intento
+    y queda reservado `lease_seconds` (OUTBOX_LEASE_SECONDS, 30): si el
+    proceso que lo tomó muere antes de registrar el resultado, vuelve a
+    estar disponible al vencer la reserva.
+    """
+
+    def __init__(self, lease_seconds: Optional[float] = None):
+        self.lease_seconds = (float(os.environ.get("OUTBOX_LEASE_SECONDS", 30))
+                              if lease_seconds is None else lease_seconds)
+
+    @staticmethod
+    def _rows(prefix: str, payload: Dict[str, Any], locations: Iterable[str],
+              now: datetime, available_at: datetime, attempts: int) -> List[Dict]:
+        text = json.dumps(payload)  # una sola serialización para todas las ubicaciones
+        return [{
+            "topic": f"{prefix}/{location}",
+            "location": location,
+            "payload": text,
+            "status": STATUS_PENDING,
+            "attempts": attempts,
+            "available_at": available_at,
+            "created_at": now,
+        } for location in locations]
+
+    def enqueue(
+        self,
+        prefix: str,
+        payload: Dict[str, Any],
+        locations: Iterable[str],
+        now: Optional[datetime] = None
+    ) -> int:
+        """
+        Encola `payload` para `{prefix}/{location}` de cada ubicación; lo
+        publica el drainer. Debe llamarse dentro del db.atomic() del cambio
+        que notifica.
+
+        Returns:
+            Cantidad de mensajes encolados
+        """
+        now = now or datetime.utcnow()
+        rows = self._rows(prefix, payload, locations, now, now, 0)
+        if rows:
+            OutboxMessage.insert_many(rows).execute()
+        return len(rows)
+
+    def enqueue_claimed(
+        self,
+        prefix: str,
+        payload: Dict[str, Any],
+        locations: Iterable[str],
+        now: Optional[datetime] = None
+    ) -> List[OutboxMessage]:
+        """
+        Como `enqueue`, pero los mensajes quedan ya tomados por quien los
+        encola, para publicarlos apenas se confirme la transacción (ver
+        OutboxDrainer.deliver). El drainer no los ve hasta que vence la
+        reserva.
+
+        Returns:
+            Los mensajes encolados (con id)
+        """
+        now = now or datetime.utcnow()
+        rows = self._rows(prefix, payload, locations, now,
+                          now + timedelta(seconds=self.lease_seconds), 1)
+        if not rows:
+            return []
+        if db.returning_clause:
+            query = OutboxMessage.insert_many(rows).returning(OutboxMessage.id).tuples()
+            ids = [message_id for (message_id,) in query.execute()]
+        else:
+            ids = [OutboxMessage.insert(row).execute() for row in rows]
+        return [OutboxMessage(id=message_id, **row) for message_id, row in zip(ids, rows)]
+
+    def heads(self, locations: Iterable[str]) -> Dict[str, int]:
+        """Id del mensaje pendiente más antiguo de cada ubicación."""
+        return dict(
+            OutboxMessage
+            .select(OutboxMessage.location, fn.MIN(OutboxMessage.id))
+            .where((OutboxMessage.status == STATUS_PENDING) &
+                   (OutboxMessage.location.in_(set(locations))))
+            .group_by(OutboxMessage.location)
+            .tuples())
+
+    def claim(self, limit: int, now: Optional[datetime] = None) -> List[OutboxMessage]:
+        """
+        Toma hasta `limit` mensajes listos para publicar, como mucho uno por
+        ubicación: el más antiguo pendiente de cada una (los posteriores
+        esperan a que éste se entregue).
+
+        La toma (intento + reserva) se confirma en su propia transacción
+        corta, antes de publicar: los locks (FOR UPDATE SKIP LOCKED en
+        Postgres, así dos drainers no toman el mismo mensaje) no quedan
+        abiertos durante la publicación, y un timeout de la Lambda no
+        deshace el intento.
+        """
+        now = now or datetime.utcnow()
+        with db.atomic():
+            query = (OutboxMessage
+                     .select()
+                     .where((OutboxMessage.status == STATUS_PENDING) &
+                            (OutboxMessage.available_at <= now))
+                     .order_by(OutboxMessage.id)
+                     .limit(limit))
+            if isinstance(db, PostgresqlDatabase):
+                query = query.for_update("FOR UPDATE SKIP LOCKED")
+            candidates = list(query)
+            if not candidates:
+                return []
+
+            heads = self.heads(m.location for m in candidates)
+            claimed = [m for m in candidates if heads.get(m.location) == m.id]
+            lease_until = now + timedelta(seconds=self.lease_seconds)
+            (OutboxMessage
+             .update(attempts=OutboxMessage.attempts + 1, available_at=lease_until)
+             .where(OutboxMessage.id.in_([m.id for m in claimed]))
+             .execute())
+        for message in claimed:
+            message.attempts += 1
+            message.available_at = lease_until
+        return claimed
+
+    def release(self, ids: List[int], now: Optional[datetime] = None) -> None:
+        """Devuelve al drainer mensajes tomados que no se llegaron a publicar."""
+        if not ids:
+            return
+        (OutboxMessage
+         .update(attempts=OutboxMessage.attempts - 1,
+                 available_at=now or datetime.utcnow())
+         .where(OutboxMessage.id.in_(ids))
+         .execute())
+
+    def delete(self, ids: List[int]) -> int:
+        """Elimina los mensajes entregados."""
+        if not ids:
+            return 0
+        return OutboxMessage.delete().where(OutboxMessage.id.in_(ids)).execute()
+
+    def retry(self, message: OutboxMessage, error: str, available_at: datetime) -> None:
+        """
+        Registra el error de un intento fallido (el intento ya se contó al
+        tomarlo) y posterga el mensaje, junto con los pendientes posteriores
+        de la misma ubicación (mantienen el orden y no ocupan lugar en claim
+        mientras tanto).
+        """
+        (OutboxMessage
+         .update(last_error=error, available_at=available_at)
+         .where(OutboxMessage.id == message.id)
+         .execute())
+        (OutboxMessage
+         .update(available_at=available_at)
+         .where((OutboxMessage.location == message.location) &
+                (OutboxMessage.status == STATUS_PENDING) &
+                (OutboxMessage.id > message.id) &
+                (OutboxMessage.available_at < available_at))
+         .execute())
+
+    def mark_dead(self, message: OutboxMessage, error: str) -> None:
+        """Saca de la cola un mensaje que agotó sus reintentos (queda para inspección)."""
+        (OutboxMessage
+         .update(status=STATUS_DEAD, last_error=error)
+         .where(OutboxMessage.id == message.id)
+         .execute())
+
+    def count_pending(self) -> int:
+        return OutboxMessage.select().where(OutboxMessage.status == STATUS_PENDING).count()
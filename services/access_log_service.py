@@ -1,7 +1,15 @@
 # services/access_log_service.py
-from typing import List, Dict, Optional
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Dict, Optional, Tuple
 from repositories.access_log_repo import AccessLogRepository
 
+VALID_EVENTS = {"accepted", "denied"}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+COUNT_MODES = ("exact", "cached", "estimated")
+
 
 class AccessLogService:
     """Servicio para lógica de negocio de logs de acceso"""
@@ -88,11 +96,188 @@ class AccessLogService:
         
         # Formatear y retornar
         return [self._format_log(log) for log in logs]
+
+    @staticmethod
+    def _parse_user_id(user_id: Optional[str]) -> Optional[int]:
+        if not user_id:
+            return None
+        try:
+            return int(user_id)
+        except (ValueError, TypeError):
+            raise ValueError("user_id debe ser un número válido")
+
+    @staticmethod
+    def _parse_datetime(value: Optional[str], name: str) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except (ValueError, TypeError, AttributeError):
+            raise ValueError(f"{name} debe ser una fecha ISO8601 válida")
+
+    def _parse_filters(
+        self,
+        user_id: Optional[str],
+        event: Optional[str],
+        start: Optional[str],
+        end: Optional[str]
+    ) -> Tuple[Optional[int], Optional[str], Optional[datetime], Optional[datetime]]:
+        """Valida y convierte los filtros comunes (user_id, event, from, to)."""
+        user_id_int = self._parse_user_id(user_id)
+
+        if event is not None and event not in VALID_EVENTS:
+            raise ValueError(f"event debe ser uno de: {', '.join(sorted(VALID_EVENTS))}")
+
+        return (user_id_int, event,
+                self._parse_datetime(start, "from"),
+                self._parse_datetime(end, "to"))
+
+    @staticmethod
+    def encode_cursor(log) -> str:
+        """Token opaco con la posición (timestamp, id) del último log entregado."""
+        raw = json.dumps({"t": log.timestamp.isoformat(), "id": str(log.id)})
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        """Inverso de `encode_cursor`. Lanza ValueError si el token no es válido."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(data["t"]), str(data["id"])
+        except Exception:
+            raise ValueError("cursor inválido")
+
+    def get_logs_page(
+        self,
+        user_id: Optional[str] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Obtiene una página de logs con paginación por cursor (keyset).
+
+        Args:
+            user_id: ID del usuario para filtrar (string desde query params)
+            device_id: ID del dispositivo para filtrar
+            event: 'accepted' o 'denied' (opcional)
+            start: Fecha ISO8601 inicial, inclusiva (query param `from`)
+            end: Fecha ISO8601 final, exclusiva (query param `to`)
+            cursor: `next_cursor` devuelto por la página anterior
+            limit: Tamaño de página (1..MAX_PAGE_SIZE)
+
+        Returns:
+            Dict {"items": [...logs formateados], "next_cursor": str o None}
+
+        Raises:
+            ValueError: Si los parámetros no son válidos
+        """
+        user_id_int, event, start_dt, end_dt = self._parse_filters(user_id, event, start, end)
+
+        page_size = DEFAULT_PAGE_SIZE
+        if limit:
+            try:
+                page_size = int(limit)
+            except (ValueError, TypeError):
+                raise ValueError("limit debe ser un número válido")
+            if not 1 <= page_size <= MAX_PAGE_SIZE:
+                raise ValueError(f"limit debe estar entre 1 y {MAX_PAGE_SIZE}")
+
+        after = self.decode_cursor(cursor) if cursor else None
+
+        # Se pide un registro extra para saber si hay una página siguiente
+        logs = self.access_log_repo.get_logs_page(
+            user_id=user_id_int,
+            device_id=device_id,
+            event=event,
+            start=start_dt,
+            end=end_dt,
+            after=after,
+            limit=page_size + 1
+        )
+
+        has_more = len(logs) > page_size
+        logs = logs[:page_size]
+
+        return {
+            "items": [self._format_log(log) for log in logs],
+            "next_cursor": self.encode_cursor(logs[-1]) if has_more else None
+        }
     
+    def count_logs(
+        self,
+        user_id: Optional[str] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        mode: str = "exact"
+    ) -> Tuple[int, str]:
+        """
+        Cuenta logs según filtros con el modo pedido:
+        - exact: SELECT COUNT(*) (costo lineal en el tamaño de la tabla)
+        - cached: contadores por dispositivo/usuario mantenidos en la ingesta
+        - estimated: estadísticas del planner de Postgres
+
+        Si el modo pedido no puede responder (p. ej. `cached` con filtros de
+        evento o fechas, o `estimated` en SQLite) se cae al conteo exacto.
+
+        Args:
+            user_id: ID del usuario para filtrar
+            device_id: ID del dispositivo para filtrar
+            event: 'accepted' o 'denied' (opcional)
+            start: Fecha ISO8601 inicial, inclusiva
+            end: Fecha ISO8601 final, exclusiva
+            mode: 'exact', 'cached' o 'estimated'
+
+        Returns:
+            (conteo, modo efectivamente usado)
+
+        Raises:
+            ValueError: Si los parámetros no son válidos
+        """
+        if mode not in COUNT_MODES:
+            raise ValueError(f"count debe ser uno de: {', '.join(COUNT_MODES)}")
+
+        user_id_int, event, start_dt, end_dt = self._parse_filters(user_id, event, start, end)
+
+        if mode == "cached" and event is None and start_dt is None and end_dt is None:
+            total = self.access_log_repo.count_cached(
+                user_id=user_id_int,
+                device_id=device_id
+            )
+            if total is not None:
+                return total, "cached"
+
+        if mode == "estimated":
+            total = self.access_log_repo.estimate_count(
+                user_id=user_id_int,
+                device_id=device_id,
+                event=event,
+                start=start_dt,
+                end=end_dt
+            )
+            if total is not None:
+                return total, "estimated"
+
+        total = self.access_log_repo.count_by_filters(
+            user_id=user_id_int,
+            device_id=device_id,
+            event=event,
+            start=start_dt,
+            end=end_dt
+        )
+        return total, "exact"
+
     def get_logs_count(
         self,
         user_id: Optional[str] = None,
-        device_id: Optional[str] = None
+        device_id: Optional[str] = None,
+        mode: str = "exact"
     ) -> int:
         """
         Obtiene el conteo de logs según filtros.
@@ -100,18 +285,10 @@ class AccessLogService:
         Args:
             user_id: ID del usuario para filtrar
             device_id: ID del dispositivo para filtrar
+            mode: 'exact', 'cached' o 'estimated' (ver `count_logs`)
             
         Returns:
             Número de logs
         """
-        user_id_int = None
-        if user_id:
-            try:
-                user_id_int = int(user_id)
-            except (ValueError, TypeError):
-                raise ValueError("user_id debe ser un número válido")
-        
-        return self.access_log_repo.count_by_filters(
-            user_id=user_id_int,
-            device_id=device_id
-        )
\ No newline at end of file
+        total, _ = self.count_logs(user_id=user_id, device_id=device_id, mode=mode)
+        return total
@@ -2,7 +2,8 @@
 
 import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
 from repositories.access_log_repo import AccessLogRepository
 from repositories.device_repo import DeviceRepository
@@ -29,7 +30,16 @@ class AccessService:
         self._devices = device_repo
         self._users = user_repo
 
-    def ingest(self, payload: Dict[str, Any]) -> None:
+    def _validate(self, payload: Dict[str, Any]) -> Tuple[str, str, str]:
+        """
+        Valida los campos básicos del payload.
+
+        Returns:
+            Tupla (event_type, timestamp ISO8601, uuid)
+
+        Raises:
+            ValueError: Si el evento, el timestamp o el uuid no son válidos
+        """
         # 1) Validar el tipo de evento
         event_type = payload.get("event")
         if event_type not in VALID_EVENTS:
@@ -45,10 +55,38 @@ class AccessService:
         uuid = payload.get("uuid")
         if not uuid:
             raise ValueError("Falta campo 'uuid'")
+        # AccessLog.id es uuid en Postgres: un valor mal formado haría fallar
+        # el INSERT multi-fila de todo el lote
+        try:
+            UUID(str(uuid))
+        except ValueError:
+            raise ValueError(f"UUID inválido: {uuid}")
+
+        return event_type, ts_str, uuid
+
+    @staticmethod
+    def _cedula_to_resolve(payload: Dict[str, Any], event_type: str) -> Optional[str]:
+        """Cédula a resolver: solo en eventos 'accepted' y si no es UNKNOWN."""
+        raw = payload.get("access_user_id", "")
+        if event_type == "accepted" and raw and raw.upper() != "UNKNOWN":
+            return raw
+        return None
 
-        # 3) Revisar si ya existe
-        if self._logs.exists(uuid):
-            raise ValueError(f"Ya existe un log con UUID {uuid}")
+    def ingest(self, payload: Dict[str, Any]) -> str:
+        """
+        Ingresa un evento de acceso de forma idempotente.
+
+        Returns:
+            "inserted" si se guardó, o "duplicate" si el UUID ya existía
+            (p. ej. reentrega MQTT QoS 1); en ese caso no se hace nada.
+
+        Raises:
+            ValueError: Si el payload no es válido o el dispositivo/usuario no existe
+        """
+        # 1-2) Validar evento, timestamp y uuid
+        event_type, ts_str, uuid = self._validate(payload)
+
+        # 3) Ya no se verifica si existe: el insert es ON CONFLICT DO NOTHING
 
         # 4) Resolver device
         location = payload.get("device_name")
@@ -57,19 +95,108 @@ class AccessService:
             raise ValueError(f"No existe dispositivo '{location}'")
 
         # 5) Resolver user (solo si 'accepted' y no UNKNOWN)
-        raw = payload.get("access_user_id", "")
+        raw = self._cedula_to_resolve(payload, event_type)
         access_user_id: Optional[int] = None
-        if event_type == "accepted" and raw and raw.upper() != "UNKNOWN":
+        if raw:
             user_id = self._users.get_id_by_cedula(raw)
             if user_id is None:
                 raise ValueError(f"No existe usuario con cédula {raw}")
             access_user_id = user_id
 
-        # 6) Insertar el log
-        self._logs.ingest(
+        # 6) Insertar el log (idempotente)
+        inserted = self._logs.ingest(
             uuid=uuid,
             access_user_id=access_user_id,
             device_id=device_id,
             event=event_type,
             timestamp=ts_str,
         )
+        if not inserted:
+            logger.info("Log %s duplicado, se ignora", uuid)
+            return "duplicate"
+        return "inserted"
+
+    def ingest_batch(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ingresa un lote de eventos (SQS / IoT rule batch) con consultas agrupadas:
+        una para dispositivos, una para cédulas y un único INSERT multi-fila
+        idempotente que descarta los UUIDs ya existentes.
+
+        Args:
+            payloads: Lista de payloads con el mismo formato que `ingest`
+
+        Returns:
+            Lista (mismo orden que `payloads`) de dicts
+            {"uuid", "status": "inserted"|"duplicate"|"error", "error"}
+        """
+        results: List[Dict[str, Any]] = []
+        pending = []  # (índice, payload, event_type, ts_str, uuid)
+
+        # 1) Validación individual (no requiere BD)
+        for idx, payload in enumerate(payloads):
+            if not isinstance(payload, dict):
+                results.append({"uuid": None, "status": "error",
+                                "error": "Payload inválido"})
+                continue
+            results.append({"uuid": payload.get("uuid"), "status": None,
+                            "error": None})
+            try:
+                event_type, ts_str, uuid = self._validate(payload)
+            except ValueError as ve:
+                results[idx].update(status="error", error=str(ve))
+                continue
+            pending.append((idx, payload, event_type, ts_str, uuid))
+
+        if not pending:
+            return results
+
+        # 2) Resolver en bloque dispositivos y cédulas
+        device_ids = self._devices.get_ids_by_locations(
+            p[1].get("device_name") for p in pending)
+        cedulas = {self._cedula_to_resolve(p[1], p[2]) for p in pending}
+        user_ids = self._users.get_ids_by_cedulas(c for c in cedulas if c)
+
+        # 3) Armar filas válidas (deduplicando también dentro del lote)
+        rows = []
+        row_idx = []
+        seen = set()
+        for idx, payload, event_type, ts_str, uuid in pending:
+            location = payload.get("device_name")
+            raw = self._cedula_to_resolve(payload, event_type)
+
+            if uuid in seen:
+                results[idx]["status"] = "duplicate"
+                continue
+
+            if location not in device_ids:
+                error = f"No existe dispositivo '{location}'"
+            elif raw and raw not in user_ids:
+                error = f"No existe usuario con cédula {raw}"
+            else:
+                error = None
+
+            if error:
+                results[idx].update(status="error", error=error)
+                continue
+
+            seen.add(uuid)
+            row_idx.append(idx)
+            rows.append({
+                "uuid": uuid,
+                "access_user_id": user_ids.get(raw) if raw else None,
+                "device_id": device_ids[location],
+                "event": event_type,
+                "timestamp": ts_str,
+            })
+
+        # 4) Un único INSERT multi-fila idempotente
+        inserted = self._logs.bulk_ingest(rows)
+        for idx, row in zip(row_idx, rows):
+            results[idx]["status"] = (
+                "inserted" if row["uuid"] in inserted else "duplicate")
+
+        statuses = [r["status"] for r in results]
+        logger.info("Lote procesado: %d insertados, %d duplicados, %d con error",
+                    statuses.count("inserted"), statuses.count("duplicate"),
+                    statuses.count("error"))
+        return results
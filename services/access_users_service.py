@@ -1,10 +1,16 @@
 # services/access_user_service.py
 # sube imagen a S3
 # nuevo helper
+from contextlib import contextmanager
 from datetime import datetime as dt
 import base64
 from typing import List, Dict, Optional
 from repositories.access_user_repo import AccessUserRepository
+from shared.embeddings import iot_fields, to_bytes
+from shared.models import db
+from services.iot_publisher import IotPublisher, max_concurrency
+from services.outbox_service import OutboxDrainer
+from botocore.config import Config
 import boto3
 import os
 import json
@@ -14,11 +20,38 @@ import logging
 logger = logging.getLogger()
 
 
+class DuplicateFaceError(LookupError):
+    """El rostro a registrar ya pertenece a otro usuario."""
+
+    def __init__(self, user_id: int, distance: float):
+        super().__init__(f"Face already registered for user {user_id}")
+        self.user_id = user_id
+        self.distance = distance
+
+
 class AccessUserService:
     """Servicio para lógica de negocio de usuarios de acceso"""
 
-    def __init__(self, access_user_repo: AccessUserRepository):
+    def __init__(self, access_user_repo: AccessUserRepository, face_index=None,
+                 outbox=None):
+        """
+        Args:
+            access_user_repo: Repositorio de usuarios
+            face_index: FaceIndex (services/face_match_service.py) opcional;
+                        si se pasa, altas y bajas lo mantienen actualizado
+            outbox: OutboxRepository opcional; si se pasa, las notificaciones
+                    a las Raspberry Pi se encolan en la misma transacción que
+                    el cambio y se publican apenas confirma; el drainer
+                    reintenta las que no se entregaron
+        """
         self.access_user_repo = access_user_repo
+        self.face_index = face_index
+        self.outbox = outbox
+        self._queued = None  # mensajes encolados en la transacción en curso
+        # Distancia máxima para considerar que dos rostros son la misma
+        # persona al registrar (0 desactiva el control)
+        self.face_duplicate_tolerance = float(
+            os.environ.get("FACE_DUPLICATE_TOLERANCE", 0.5))
         # Inicializar clientes AWS
         self.s3 = boto3.client("s3")
         self.s3_bucket = os.environ.get("S3_BUCKET", "")
@@ -28,7 +61,9 @@ class AccessUserService:
                 "http") else f"https://{endpoint}"
         else:                                            # fallback para tests / integraciones locales
             endpoint_url = "https://localhost"
-        self.iot = boto3.client("iot-data", endpoint_url=endpoint_url)
+        # Un pool de conexiones HTTP por cada publish simultáneo del fan-out
+        self.iot = boto3.client("iot-data", endpoint_url=endpoint_url,
+                                config=Config(max_pool_connections=max_concurrency()))
 
     def _format_user_with_doors(self, user) -> Dict:
         """
@@ -123,33 +158,73 @@ class AccessUserService:
             # Log del error pero continuar con la eliminación del usuario
             logger.error(f"Error eliminando imagen de S3: {e}")
 
-    def _notify_user_deletion(self, cedula: str, device_locations: List[str]) -> None:
+    @contextmanager
+    def _transaction(self):
+        """
+        Transacción que agrupa el cambio y su notificación (solo con outbox).
+
+        Los mensajes encolados adentro se publican apenas confirma; las
+        ubicaciones que no se pudieron notificar (las reintenta el drainer)
+        se agregan a la lista que devuelve el `with`, al salir.
+        """
+        if self.outbox is None:
+            yield []
+            return
+        undelivered = []
+        self._queued = []
+        try:
+            with db.atomic():
+                yield undelivered
+            queued = self._queued
+        finally:
+            self._queued = None
+        try:
+            drainer = OutboxDrainer(self.outbox, IotPublisher(self.iot))
+            queued = drainer.deliver(queued)
+        except Exception:
+            logger.exception("Error publicando el outbox tras el commit")
+        undelivered += [message.location for message in queued]
+
+    def _fan_out(self, prefix: str, payload: Dict, device_locations: List[str]) -> List[str]:
+        """
+        Publica `payload` en `{prefix}/{location}` para todas las ubicaciones
+        en paralelo, o lo encola en el outbox si está configurado (se publica al
+        confirmar la transacción, ver _transaction).
+
+        Returns:
+            Ubicaciones que no se pudieron notificar (error o deadline)
+        """
+        if self.outbox is not None:
+            self._queued += self.outbox.enqueue_claimed(prefix, payload, device_locations)
+            return []
+
+        topics = {f"{prefix}/{location}": location for location in device_locations}
+        result = IotPublisher(self.iot).publish_many(list(topics), payload)
+        for topic, error in result["failed"].items():
+            logger.error(f"Error notificando a {topics[topic]}: {error}")
+        for topic in result["timed_out"]:
+            logger.error(f"Notificación a {topics[topic]} sin confirmar (deadline)")
+        return [topics[t] for t in list(result["failed"]) + result["timed_out"]]
+
+    def _notify_user_deletion(self, cedula: str, device_locations: List[str]) -> List[str]:
         """
         Notifica a las Raspberry Pi sobre la eliminación del usuario.
 
         Args:
             cedula: Cédula del usuario eliminado
             device_locations: Lista de ubicaciones/nombres de dispositivos
+
+        Returns:
+            Ubicaciones que no se pudieron notificar
         """
         if not cedula or not device_locations:
-            return
+            return []
 
-        for location in device_locations:
-            try:
-                topic = f"access/users/delete/{location}"
-                payload = json.dumps({"cedula": cedula})
-
-                self.iot.publish(
-                    topic=topic,
-                    qos=1,
-                    payload=payload
-                )
-                logger.info(
-                    f"Notificación enviada a {location} para eliminar usuario {cedula}")
-
-            except Exception as e:
-                # Log del error pero continuar con las otras notificaciones
-                logger.error(f"Error notificando a {location}: {e}")
+        failed = self._fan_out("access/users/delete", {"cedula": cedula}, device_locations)
+        logger.info(
+            f"Eliminación de usuario {cedula} notificada a "
+            f"{len(device_locations) - len(failed)}/{len(device_locations)} dispositivos")
+        return failed
 
     def delete_user(self, user_id: str) -> Dict:
         """
@@ -184,20 +259,25 @@ class AccessUserService:
         if user.image_ref:
             self._delete_user_image(user.image_ref)
 
-        # Eliminar usuario y datos relacionados
-        success = self.access_user_repo.delete_user_and_related_data(
-            user_id_int)
+        # Eliminar usuario y datos relacionados y notificar a las Raspberry Pi
+        with self._transaction() as undelivered:
+            success = self.access_user_repo.delete_user_and_related_data(
+                user_id_int)
+
+            if not success:
+                raise Exception("Error al eliminar el usuario de la base de datos")
 
-        if not success:
-            raise Exception("Error al eliminar el usuario de la base de datos")
+            failed = self._notify_user_deletion(user.cedula, device_locations)
+        failed += undelivered
 
-        # Notificar a las Raspberry Pi
-        self._notify_user_deletion(user.cedula, device_locations)
+        if self.face_index is not None:
+            self.face_index.remove(user_id_int)
 
         return {
             "message": "User and image deleted successfully",
             "user_id": user_id,
-            "raspis_notified": device_locations
+            "raspis_notified": device_locations,
+            "notification_failures": failed
         }
 
         # ------------------------------------------------------------------
@@ -205,25 +285,41 @@ class AccessUserService:
     # ------------------------------------------------------------------
         # ------------------ NOTIFICACIÓN DE ALTA ------------------
 
-    def _notify_new_user(self, user: Dict, device_locations: List[str]) -> None:
+    def _find_duplicate_face(self, face_emb: List[float]) -> Optional[tuple]:
+        """
+        Busca en el índice de rostros un usuario a menos de
+        face_duplicate_tolerance.
+
+        Returns:
+            (user_id, distancia) o None
+        """
+        if self.face_index is None or self.face_duplicate_tolerance <= 0:
+            return None
+        while True:
+            match = self.face_index.identify(face_emb, self.face_duplicate_tolerance)
+            if match is None:
+                return None
+            if self.access_user_repo.get_by_id(match[0]) is not None:
+                return match
+            # Usuario eliminado desde otro contenedor: el índice estaba desactualizado
+            self.face_index.remove(match[0])
+
+    def _notify_new_user(self, user: Dict, device_locations: List[str]) -> List[str]:
         """
         Publica en MQTT el JSON del nuevo usuario para que cada Raspberry Pi
         lo agregue localmente.
+
+        Returns:
+            Ubicaciones que no se pudieron notificar
         """
         if not device_locations:
-            return
+            return []
 
-        for location in device_locations:
-            try:
-                self.iot.publish(
-                    topic=f"access/users/new/{location}",
-                    qos=1,
-                    payload=json.dumps(user)
-                )
-                logger.info("Notificación NEW enviada a %s (usuario %s)",
-                            location, user.get('cedula'))
-            except Exception as e:
-                logger.error("Error notificando NEW a %s: %s", location, e)
+        failed = self._fan_out("access/users/new", user, device_locations)
+        logger.info("Notificación NEW del usuario %s enviada a %d/%d dispositivos",
+                    user.get('cedula'), len(device_locations) - len(failed),
+                    len(device_locations))
+        return failed
 
         # ------------------- CREAR USUARIO ------------------------
 
@@ -233,7 +329,7 @@ class AccessUserService:
         Alta completa de usuario:
         - valida campos requeridos y formatos
         - decodifica imagen, valida tamaño, obtiene embedding
-        - comprueba unicidad de cédula y RFID
+        - comprueba unicidad de cédula, RFID y rostro (DuplicateFaceError)
         - sube imagen a S3
         - inserta en BD (AccessUserRepository.create)
         - notifica a las Raspberry Pi
@@ -282,30 +378,41 @@ class AccessUserService:
         if self.access_user_repo.exists_rfid(rfid):
             raise LookupError("RFID already exists")
 
+        # 4.1) Unicidad del rostro
+        duplicate = self._find_duplicate_face(face_emb)
+        if duplicate is not None:
+            raise DuplicateFaceError(*duplicate)
+
         # 5) Subir imagen a S3
         from services.storage_service import upload_jpeg
         img_url = upload_jpeg(img_bytes)
 
-        # 6) Insertar en BD
-        user = self.access_user_repo.create(
-            first_name=body["firstName"],
-            last_name=body["lastName"],
-            cedula=ced,
-            rfid=rfid,
-            image_ref=img_url,
-            face_embedding=json.dumps(face_emb),
-            created_at=dt.utcnow()
-        )
-
-        # 7) Notificar a las Raspberry Pi
-        self._notify_new_user({
-            "id": user.id,
-            "first_name": user.first_name,
-            "last_name":  user.last_name,
-            "cedula":     user.cedula,
-            "rfid":       user.rfid,
-            "image_ref":  img_url,
-            "face_embedding": face_emb,
-        }, raspis)
-
-        return {"user_id": user.id, "image_ref": img_url}
+        # 6) Insertar en BD y 7) notificar a las Raspberry Pi
+        with self._transaction() as undelivered:
+            user = self.access_user_repo.create(
+                first_name=body["firstName"],
+                last_name=body["lastName"],
+                cedula=ced,
+                rfid=rfid,
+                image_ref=img_url,
+                face_embedding=json.dumps(face_emb),
+                face_embedding_bin=to_bytes(face_emb),
+                created_at=dt.utcnow()
+            )
+
+            failed = self._notify_new_user({
+                "id": user.id,
+                "first_name": user.first_name,
+                "last_name":  user.last_name,
+                "cedula":     user.cedula,
+                "rfid":       user.rfid,
+                "image_ref":  img_url,
+                **iot_fields(embedding=face_emb),
+            }, raspis)
+        failed += undelivered
+
+        if self.face_index is not None:
+            self.face_index.add(user.id, face_emb)
+
+        return {"user_id": user.id, "image_ref": img_url,
+                "notification_failures": failed}
@@ -0,0 +1,223 @@
+# services/alert_backtest_service.py
+"""
+Backtesting offline de los parámetros de alerta (max_denied_attempts,
+window_seconds) contra los denies históricos de access_logs.
+
+Uso (con DB_NAME, DB_USER, DB_PASSWORD o DB_PASS, DB_HOST definidos):
+
+    python -m services.alert_backtest_service --start 2025-06-01 --end 2025-07-01 \\
+        --thresholds 3,5,10,20 --windows 30,60,300
+"""
+import argparse
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from repositories.access_log_repo import AccessLogRepository
+
+
+def _epoch(ts: datetime) -> float:
+    # Los timestamps naive se interpretan como UTC (igual que lambda_alert_check)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def simulate(
+    times: np.ndarray,
+    starts: np.ndarray,
+    thresholds: Sequence[int],
+    windows: Sequence[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simula la regla de AlertService sobre denies ya cargados.
+
+    Para cada deny i el conteo es el número de denies del mismo dispositivo
+    en [t_i - window, t_i], ambos extremos incluidos como el BETWEEN de
+    LogRepository.count_denies (los denies con el mismo timestamp que t_i
+    cuentan todos); con umbral T el deny dispara si conteo >= T.
+
+    Args:
+        times: Epoch (segundos) de todos los denies, ordenados por
+            dispositivo y luego por tiempo
+        starts: Índice del primer deny de cada dispositivo en `times`
+        thresholds: Umbrales a evaluar
+        windows: Ventanas (segundos) a evaluar
+
+    Returns:
+        (alerts, incidents), arrays de forma (dispositivos, ventanas, umbrales):
+        - alerts: denies que habrían publicado (una alerta por deny, sin cooldown)
+        - incidents: cruces del umbral (deny que lo supera cuando el anterior
+          del mismo dispositivo no lo superaba); aproxima las alertas con
+          de-duplicación
+    """
+    thresholds = np.asarray(thresholds, dtype=np.int64)
+    windows = np.asarray(windows, dtype=np.float64)
+    n_devices = len(starts)
+    shape = (n_devices, len(windows), len(thresholds))
+    if len(times) == 0 or n_devices == 0:
+        return np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+
+    # Se separan los dispositivos en el eje de tiempo para que una sola
+    # búsqueda no mezcle ventanas de dispositivos distintos
+    device_index = np.zeros(len(times), dtype=np.int64)
+    device_index[starts[1:]] = 1
+    device_index = np.cumsum(device_index)
+    base = times - times.min()
+    stride = base.max() + windows.max() + 1
+    shifted = base + device_index * stride
+
+    first_of_device = np.zeros(len(times), dtype=bool)
+    first_of_device[starts] = True
+
+    alerts = np.empty(shape, dtype=np.int64)
+    incidents = np.empty(shape, dtype=np.int64)
+    for w, window in enumerate(windows):
+        # Conteo en ventana: denies con t_i - window <= t <= t_i
+        left = np.searchsorted(shifted, shifted - window, side="left")
+        right = np.searchsorted(shifted, shifted, side="right")
+        counts = right - left
+        previous = np.concatenate(([0], counts[:-1]))
+        previous[first_of_device] = 0
+
+        fired = counts[:, None] >= thresholds[None, :]
+        crossed = fired & (previous[:, None] < thresholds[None, :])
+        alerts[:, w, :] = np.add.reduceat(fired, starts, axis=0)
+        incidents[:, w, :] = np.add.reduceat(crossed, starts, axis=0)
+    return alerts, incidents
+
+
+class AlertBacktestService:
+    """Servicio para evaluar combinaciones de umbral y ventana sobre el histórico"""
+
+    def __init__(self, access_log_repo: AccessLogRepository):
+        self.access_log_repo = access_log_repo
+
+    def load_denies(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        device_id: Optional[str] = None
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Carga los denies del rango en arrays.
+
+        Returns:
+            (device_ids, starts, times): IDs de dispositivo, índice del primer
+            deny de cada uno en `times` y epoch de cada deny
+        """
+        rows = self.access_log_repo.iter_deny_times(start, end, device_id)
+        devices = []
+        times = []
+        for device, timestamp in rows:
+            devices.append(device)
+            times.append(_epoch(timestamp))
+
+        times = np.asarray(times, dtype=np.float64)
+        if not devices:
+            return [], np.zeros(0, dtype=np.int64), times
+
+        device_array = np.asarray(devices, dtype=object)
+        change = np.flatnonzero(device_array[1:] != device_array[:-1]) + 1
+        starts = np.concatenate(([0], change)).astype(np.int64)
+        return [str(d) for d in device_array[starts]], starts, times
+
+    def backtest(
+        self,
+        thresholds: Sequence[int],
+        windows: Sequence[int],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        device_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Cuántas alertas habría disparado cada combinación (umbral, ventana).
+
+        Args:
+            thresholds: Valores de max_denied_attempts a evaluar
+            windows: Valores de window_seconds a evaluar
+            start: Inicio del rango (opcional)
+            end: Fin del rango (opcional)
+            device_id: Limitar a un dispositivo (opcional)
+
+        Returns:
+            Dict con el total de denies, el resultado agregado por combinación
+            y el detalle por dispositivo
+
+        Raises:
+            ValueError: Si los parámetros no son válidos
+        """
+        if not thresholds or not windows:
+            raise ValueError("At least one threshold and one window are required")
+        if min(thresholds) < 1:
+            raise ValueError("Thresholds must be at least 1")
+        if min(windows) < 1:
+            raise ValueError("Windows must be at least 1 second")
+
+        device_ids, starts, times = self.load_denies(start, end, device_id)
+        alerts, incidents = simulate(times, starts, thresholds, windows)
+
+        def grid(alert_matrix, incident_matrix):
+            return [
+                {
+                    "threshold": int(threshold),
+                    "window_seconds": int(window),
+                    "alerts": int(alert_matrix[w, t]),
+                    "incidents": int(incident_matrix[w, t]),
+                }
+                for w, window in enumerate(windows)
+                for t, threshold in enumerate(thresholds)
+            ]
+
+        ends = np.append(starts[1:], len(times))
+        return {
+            "denies": int(len(times)),
+            "grid": grid(alerts.sum(axis=0), incidents.sum(axis=0)),
+            "devices": [
+                {
+                    "device_id": device,
+                    "denies": int(ends[d] - starts[d]),
+                    "grid": grid(alerts[d], incidents[d]),
+                }
+                for d, device in enumerate(device_ids)
+            ],
+        }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--device-id", default=None)
+    parser.add_argument("--thresholds", type=_int_list, default=[3, 5, 10, 20])
+    parser.add_argument("--windows", type=_int_list, default=[30, 60, 300, 600])
+    parser.add_argument("--json", action="store_true", help="Salida completa en JSON")
+    args = parser.parse_args(argv)
+
+    from shared.models import db
+
+    db.connect(reuse_if_open=True)
+    try:
+        result = AlertBacktestService(AccessLogRepository()).backtest(
+            args.thresholds, args.windows, args.start, args.end, args.device_id)
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['denies']} denies en {len(result['devices'])} dispositivos")
+    print(f"{'umbral':>8} {'ventana':>8} {'alertas':>10} {'incidentes':>11}")
+    for row in result["grid"]:
+        print(f"{row['threshold']:>8} {row['window_seconds']:>8} "
+              f"{row['alerts']:>10} {row['incidents']:>11}")
+
+
+if __name__ == "__main__":
+    main()
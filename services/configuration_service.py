@@ -143,6 +143,10 @@ class ConfigurationService:
         if updated_count == 0:
             raise LookupError("No configurations were found to update")
         
+        # Invalidar las cachés de configuración de las lambdas (también si
+        # la actualización fue parcial: algún valor cambió)
+        self.config_repo.bump_version()
+        
         if updated_count < 2:
             # Solo se actualizó uno, puede ser un problema
             raise Exception("Only partial update was successful")
@@ -187,6 +191,9 @@ class ConfigurationService:
         if errors and not updated:
             raise ValueError(f"Failed to update configurations: {errors}")
         
+        if updated:
+            self.config_repo.bump_version()
+        
         return {
             "message": "Configurations updated",
             "updated": updated,
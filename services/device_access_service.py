@@ -1,5 +1,6 @@
 # services/device_access_service.py
 import json
+from contextlib import contextmanager
 import boto3
 import os
 import logging
@@ -7,7 +8,11 @@ from typing import List, Dict, Tuple
 from repositories.access_user_repo import AccessUserRepository
 from repositories.device_repo import DeviceRepository
 from repositories.device_user_mapping_repo import DeviceUserMappingRepository
-from shared.models import AccessUser
+from shared.models import AccessUser, db
+from shared.embeddings import iot_fields
+from services.iot_publisher import IotPublisher, max_concurrency
+from services.outbox_service import OutboxDrainer
+from botocore.config import Config
 logger = logging.getLogger()
 
 
@@ -18,16 +23,27 @@ class DeviceAccessService:
         self,
         user_repo: AccessUserRepository,
         device_repo: DeviceRepository,
-        mapping_repo: DeviceUserMappingRepository
+        mapping_repo: DeviceUserMappingRepository,
+        outbox=None
     ):
+        """
+        Args:
+            outbox: OutboxRepository opcional; si se pasa, las notificaciones
+                    se encolan en la transacción de los mappings y se
+                    publican apenas confirma; el drainer reintenta las que
+                    no se entregaron
+        """
         self.user_repo = user_repo
         self.device_repo = device_repo
         self.mapping_repo = mapping_repo
+        self.outbox = outbox
+        self._queued = None  # mensajes encolados en la transacción en curso
 
         # Cliente IoT
         self.iot = boto3.client(
             "iot-data",
-            endpoint_url=f"https://{os.environ.get('IOT_ENDPOINT', '')}"
+            endpoint_url=f"https://{os.environ.get('IOT_ENDPOINT', '')}",
+            config=Config(max_pool_connections=max_concurrency())
         )
 
     def _get_user_info_for_iot(self, user: AccessUser) -> Dict:
@@ -47,54 +63,89 @@ class DeviceAccessService:
             "cedula": user.cedula,
             "rfid": user.rfid,
             "image_ref": user.image_ref,
-            "face_embedding": user.face_embedding
+            **iot_fields(json_text=user.face_embedding,
+                         blob=getattr(user, "face_embedding_bin", None))
         }
 
-    def _notify_add_user(self, user_info: Dict, device_locations: List[str]) -> None:
+    @contextmanager
+    def _transaction(self):
+        """
+        Transacción que agrupa el cambio y su notificación (solo con outbox).
+
+        Los mensajes encolados adentro se publican apenas confirma; las
+        ubicaciones que no se pudieron notificar (las reintenta el drainer)
+        se agregan a la lista que devuelve el `with`, al salir.
+        """
+        if self.outbox is None:
+            yield []
+            return
+        undelivered = []
+        self._queued = []
+        try:
+            with db.atomic():
+                yield undelivered
+            queued = self._queued
+        finally:
+            self._queued = None
+        try:
+            drainer = OutboxDrainer(self.outbox, IotPublisher(self.iot))
+            queued = drainer.deliver(queued)
+        except Exception:
+            logger.exception("Error publicando el outbox tras el commit")
+        undelivered += [message.location for message in queued]
+
+    def _fan_out(self, prefix: str, payload: Dict, device_locations: List[str]) -> List[str]:
+        """
+        Publica `payload` en `{prefix}/{location}` para todas las ubicaciones
+        en paralelo (serializado una sola vez), o lo encola en el outbox (se
+        publica al confirmar la transacción, ver _transaction).
+
+        Returns:
+            Ubicaciones que no se pudieron notificar (error o deadline)
+        """
+        if self.outbox is not None:
+            self._queued += self.outbox.enqueue_claimed(prefix, payload, device_locations)
+            return []
+
+        topics = {f"{prefix}/{location}": location for location in device_locations}
+        result = IotPublisher(self.iot).publish_many(list(topics), payload)
+        for topic, error in result["failed"].items():
+            logger.error(f"Error notificando a {topics[topic]}: {error}")
+        for topic in result["timed_out"]:
+            logger.error(f"Notificación a {topics[topic]} sin confirmar (deadline)")
+        return [topics[t] for t in list(result["failed"]) + result["timed_out"]]
+
+    def _notify_add_user(self, user_info: Dict, device_locations: List[str]) -> List[str]:
         """
         Notifica a las Raspberry Pi que agreguen un usuario.
 
         Args:
             user_info: Información del usuario
             device_locations: Lista de ubicaciones de dispositivos
+
+        Returns:
+            Ubicaciones que no se pudieron notificar
         """
-        for location in device_locations:
-            try:
-                topic = f"access/users/new/{location}"
-                payload = json.dumps(user_info)
-
-                self.iot.publish(
-                    topic=topic,
-                    qos=1,
-                    payload=payload
-                )
-                logger.info(f"Notificación de agregar enviada a {location}")
-
-            except Exception as e:
-                logger.error(f"Error notificando agregar a {location}: {e}")
-
-    def _notify_remove_user(self, cedula: str, device_locations: List[str]) -> None:
+        failed = self._fan_out("access/users/new", user_info, device_locations)
+        logger.info(f"Notificación de agregar enviada a "
+                    f"{len(device_locations) - len(failed)}/{len(device_locations)} dispositivos")
+        return failed
+
+    def _notify_remove_user(self, cedula: str, device_locations: List[str]) -> List[str]:
         """
         Notifica a las Raspberry Pi que eliminen un usuario.
 
         Args:
             cedula: Cédula del usuario a eliminar
             device_locations: Lista de ubicaciones de dispositivos
-        """
-        for location in device_locations:
-            try:
-                topic = f"access/users/delete/{location}"
-                payload = json.dumps({"cedula": cedula})
-
-                self.iot.publish(
-                    topic=topic,
-                    qos=1,
-                    payload=payload
-                )
-                logger.info(f"Notificación de eliminar enviada a {location}")
 
-            except Exception as e:
-                logger.error(f"Error notificando eliminar a {location}: {e}")
+        Returns:
+            Ubicaciones que no se pudieron notificar
+        """
+        failed = self._fan_out("access/users/delete", {"cedula": cedula}, device_locations)
+        logger.info(f"Notificación de eliminar enviada a "
+                    f"{len(device_locations) - len(failed)}/{len(device_locations)} dispositivos")
+        return failed
 
     def update_user_device_access(
         self,
@@ -132,41 +183,41 @@ class DeviceAccessService:
         if not user:
             raise LookupError(f"Usuario con ID {user_id} no encontrado")
 
-        # Preparar dispositivos para agregar
-        devices_to_add = []
-        for device_name in add_devices:
-            device = self.device_repo.get_by_location(device_name)
-            if device:
-                devices_to_add.append((device.id_device, device_name))
-            else:
-                logger.warning(f"Dispositivo '{device_name}' no encontrado")
-
-        # Preparar dispositivos para eliminar
-        devices_to_remove = []
-        for device_name in remove_devices:
-            device = self.device_repo.get_by_location(device_name)
-            if device:
-                devices_to_remove.append((device.id_device, device_name))
-            else:
+        # Resolver todos los nombres de dispositivos en una sola consulta (IN);
+        # los negativos cacheados se vuelven a consultar antes de rechazar
+        device_ids = self.device_repo.get_ids_by_locations(
+            add_devices + remove_devices, recheck_missing=True)
+        for device_name in dict.fromkeys(add_devices + remove_devices):
+            if device_name not in device_ids:
                 logger.warning(f"Dispositivo '{device_name}' no encontrado")
 
-        # Actualizar mappings
-        added, removed = self.mapping_repo.bulk_update_user_devices(
-            user_id_int,
-            devices_to_add,
-            devices_to_remove
-        )
-
-        # Notificar a las Raspberry Pi
-        if removed:
-            self._notify_remove_user(user.cedula, removed)
-
-        if added:
-            user_info = self._get_user_info_for_iot(user)
-            self._notify_add_user(user_info, added)
+        # Preparar dispositivos para agregar y para eliminar
+        devices_to_add = [(device_ids[name], name) for name in add_devices if name in device_ids]
+        devices_to_remove = [(device_ids[name], name) for name in remove_devices
+                             if name in device_ids]
+
+        # Actualizar mappings y notificar a las Raspberry Pi: primero las
+        # bajas y después las altas (cada fan-out termina antes de empezar el
+        # siguiente; en el outbox quedan en ese orden)
+        with self._transaction() as undelivered:
+            added, removed = self.mapping_repo.bulk_update_user_devices(
+                user_id_int,
+                devices_to_add,
+                devices_to_remove
+            )
+
+            failed = []
+            if removed:
+                failed += self._notify_remove_user(user.cedula, removed)
+
+            if added:
+                user_info = self._get_user_info_for_iot(user)
+                failed += self._notify_add_user(user_info, added)
+        failed += undelivered
 
         return {
             "message": "User device access updated",
             "added": added,
-            "removed": removed
+            "removed": removed,
+            "notification_failures": failed
         }
@@ -0,0 +1,177 @@
+# services/device_snapshot_service.py
+"""
+Snapshot de la galería completa de un dispositivo en S3.
+
+Para dar de alta una Raspberry con miles de usuarios, en lugar de un
+mensaje access/users/new por usuario (~3 KB cada uno) se genera un único
+NDJSON comprimido con gzip y se envía un solo mensaje MQTT con su key y
+revisión:
+
+    snapshots/devices/{id_device}/{revision}.ndjson.gz
+      {"device": "FCEE", "revision": 42}                      <- encabezado
+      {"id": 1, "cedula": "...", "rfid": "...", "face_embedding_b64": "..."}
+      ...
+
+El snapshot se arma a partir del anterior (apuntado por latest.json) más
+los cambios de device_user_changes desde su revisión; sin anterior, desde
+los mappings actuales. Luego la Raspberry sigue con la sincronización
+delta (services/device_sync_service.py) desde esa revisión.
+"""
+import gzip
+import json
+import logging
+import zlib
+from typing import Dict, Iterable, Optional
+
+from repositories.device_repo import DeviceRepository
+from repositories.device_user_mapping_repo import DeviceUserMappingRepository
+from services.device_sync_service import DeviceSyncService
+from services.iot_publisher import IotPublisher
+
+logger = logging.getLogger()
+
+SNAPSHOT_TOPIC = "access/users/snapshot"
+SNAPSHOT_CONTENT_TYPE = "application/x-ndjson"
+# Campos del usuario que necesita la Raspberry para reconocer
+RECORD_FIELDS = ("id", "cedula", "rfid")
+
+
+def _prefix(device_id: str) -> str:
+    return f"snapshots/devices/{device_id}"
+
+
+class DeviceSnapshotService:
+    """Genera y publica snapshots de la galería de usuarios por dispositivo"""
+
+    def __init__(
+        self,
+        device_repo: DeviceRepository,
+        mapping_repo: DeviceUserMappingRepository,
+        storage=None,
+        outbox=None,
+        iot=None
+    ):
+        """
+        Args:
+            storage: Módulo/objeto con put_object, open_object y
+                     MultipartUpload (por defecto services.storage_service)
+            outbox: OutboxRepository para encolar el aviso (opcional)
+            iot: Cliente 'iot-data' para publicar el aviso si no hay outbox
+        """
+        self.device_repo = device_repo
+        self.sync = DeviceSyncService(device_repo, mapping_repo, embedding_format="base64")
+        self._storage = storage
+        self.outbox = outbox
+        self.iot = iot
+
+    @property
+    def storage(self):
+        # Import diferido: boto3 solo se carga si efectivamente se genera un snapshot
+        if self._storage is None:
+            from services import storage_service
+            self._storage = storage_service
+        return self._storage
+
+    @staticmethod
+    def _record(user_info: Dict) -> Dict:
+        record = {field: user_info.get(field) for field in RECORD_FIELDS}
+        for field in ("face_embedding_b64", "face_embedding"):
+            if field in user_info:
+                record[field] = user_info[field]
+        return record
+
+    def _latest(self, device_id: str) -> Optional[Dict]:
+        body = self.storage.open_object(f"{_prefix(device_id)}/latest.json")
+        return json.loads(body.read()) if body is not None else None
+
+    def _read_snapshot(self, key: str) -> Optional[Dict[str, Dict]]:
+        """Registros del snapshot `key` por cédula, o None si ya no existe."""
+        body = self.storage.open_object(key)
+        if body is None:
+            return None
+        records = {}
+        with gzip.GzipFile(fileobj=body, mode="rb") as lines:
+            next(lines, None)  # encabezado
+            for line in lines:
+                record = json.loads(line)
+                records[record["cedula"]] = record
+        return records
+
+    def _write_snapshot(self, key: str, header: Dict, records: Iterable[Dict]) -> int:
+        """Escribe el NDJSON gzip en streaming (multipart). Devuelve la cantidad de registros."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: contenedor gzip
+        count = 0
+        with self.storage.MultipartUpload(key, content_type=SNAPSHOT_CONTENT_TYPE) as upload:
+            upload.write(compressor.compress(json.dumps(header).encode("utf-8") + b"\n"))
+            for record in records:
+                upload.write(compressor.compress(json.dumps(record).encode("utf-8") + b"\n"))
+                count += 1
+            upload.write(compressor.flush())
+        return count
+
+    def _notify(self, location: str, message: Dict) -> None:
+        if self.outbox is not None:
+            self.outbox.enqueue(SNAPSHOT_TOPIC, message, [location])
+        elif self.iot is not None:
+            IotPublisher(self.iot).publish_many([f"{SNAPSHOT_TOPIC}/{location}"], message)
+
+    def build(self, location: str, notify: bool = True) -> Dict:
+        """
+        Genera (o reutiliza, si no hubo cambios) el snapshot de un dispositivo.
+
+        Args:
+            location: Ubicación del dispositivo
+            notify: Publicar el aviso access/users/snapshot/{location}
+
+        Returns:
+            Dict con device, key, revision, count, incremental y reused
+
+        Raises:
+            LookupError: Si el dispositivo no existe
+        """
+        device = self.device_repo.get_by_location(location)
+        if not device:
+            raise LookupError(f"Dispositivo '{location}' no encontrado")
+
+        latest = self._latest(device.id_device)
+        records = None
+        if latest is not None:
+            records = self._read_snapshot(latest["key"])
+
+        if records is None:
+            records, revision, incremental = {}, 0, False
+        else:
+            revision, incremental = latest["revision"], True
+        after = None
+        while True:
+            delta = self.sync.get_changes(location, revision, after)
+            if delta["reset"]:  # sin snapshot anterior, o de una revisión ya purgada
+                records, incremental = {}, False
+            for cedula in delta["deletes"]:
+                records.pop(cedula, None)
+            for user in delta["upserts"]:
+                records[user["cedula"]] = self._record(user)
+            revision, after = delta["revision"], delta["after"]
+            if not delta["has_more"]:
+                break
+
+        if latest is not None and incremental and revision == latest["revision"]:
+            result = {"key": latest["key"], "revision": revision,
+                      "count": latest["count"], "reused": True}
+        else:
+            key = f"{_prefix(device.id_device)}/{revision}.ndjson.gz"
+            count = self._write_snapshot(
+                key, {"device": location, "revision": revision},
+                sorted(records.values(), key=lambda r: r["id"]))
+            result = {"key": key, "revision": revision, "count": count, "reused": False}
+            self.storage.put_object(
+                f"{_prefix(device.id_device)}/latest.json",
+                json.dumps({k: result[k] for k in ("key", "revision", "count")}).encode("utf-8"),
+                content_type="application/json")
+            logger.info(f"Snapshot de {location}: {count} usuarios, revisión {revision} "
+                        f"({'incremental' if incremental else 'completo'})")
+
+        if notify:
+            self._notify(location, {"key": result["key"], "revision": revision})
+
+        return {"device": location, "incremental": incremental, **result}
@@ -0,0 +1,207 @@
+# services/device_sync_service.py
+"""
+Sincronización delta de la galería de usuarios de cada Raspberry Pi.
+
+Cada alta o baja de acceso queda en device_user_changes con una revisión
+creciente. Una Raspberry que estuvo offline (o recién instalada) pide los
+cambios desde la última revisión que aplicó y luego confirma la nueva:
+
+- since=0: snapshot completo (reset) con la revisión actual, paginado de a
+  DEVICE_SYNC_PAGE_SIZE usuarios: mientras has_more, la página siguiente se
+  pide con since=<revision>&after=<after> (todas las páginas conservan la
+  revisión de la primera)
+- since=N: por cada usuario solo su último cambio (upsert o delete),
+  paginado de a DEVICE_SYNC_PAGE_SIZE cambios (has_more)
+
+El log se purga pasados DEVICE_SYNC_RETENTION_DAYS (30, ver prune_changes);
+un dispositivo que pide desde una revisión ya purgada recibe un reset.
+
+Las revisiones salen de una secuencia, así que una transacción puede
+confirmar la revisión 10 después de que otra confirmó la 11. Para no
+saltearla, se entrega hasta la revisión anterior al primer cambio con menos
+de DEVICE_SYNC_SETTLE_SECONDS de antigüedad. Aplicar un cambio dos veces no tiene efecto, por eso el
+snapshot puede incluir cambios posteriores a su revisión.
+"""
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from repositories.device_repo import DeviceRepository
+from repositories.device_user_mapping_repo import OP_DELETE, DeviceUserMappingRepository
+from shared.embeddings import iot_fields
+
+
+class DeviceSyncService:
+    """Servicio de sincronización delta de usuarios por dispositivo"""
+
+    def __init__(
+        self,
+        device_repo: DeviceRepository,
+        mapping_repo: DeviceUserMappingRepository,
+        page_size: Optional[int] = None,
+        settle_seconds: Optional[float] = None,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        embedding_format: Optional[str] = None,
+        retention_days: Optional[float] = None
+    ):
+        """
+        Args:
+            embedding_format: 'json' o 'base64' para el embedding de los
+                              usuarios (por defecto IOT_EMBEDDING_FORMAT)
+        """
+        self.device_repo = device_repo
+        self.mapping_repo = mapping_repo
+        self.page_size = page_size or int(os.environ.get("DEVICE_SYNC_PAGE_SIZE", 500))
+        self.settle_seconds = (float(os.environ.get("DEVICE_SYNC_SETTLE_SECONDS", 5))
+                               if settle_seconds is None else settle_seconds)
+        self.clock = clock
+        self.embedding_format = embedding_format
+        self.retention_days = (float(os.environ.get("DEVICE_SYNC_RETENTION_DAYS", 30))
+                               if retention_days is None else retention_days)
+
+    def _user_info(self, user) -> Dict:
+        """Mismo formato que el mensaje access/users/new."""
+        return {
+            "id": user.id,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "cedula": user.cedula,
+            "rfid": user.rfid,
+            "image_ref": user.image_ref,
+            **iot_fields(json_text=user.face_embedding,
+                         blob=getattr(user, "face_embedding_bin", None),
+                         fmt=self.embedding_format)
+        }
+
+    def _get_device(self, location: str):
+        if not location:
+            raise ValueError("Ubicación de dispositivo requerida")
+        device = self.device_repo.get_by_location(location)
+        if not device:
+            raise LookupError(f"Dispositivo '{location}' no encontrado")
+        return device
+
+    @staticmethod
+    def _parse_revision(value, name: str) -> int:
+        try:
+            revision = int(value)
+        except (ValueError, TypeError):
+            raise ValueError(f"{name} debe ser un entero")
+        if revision < 0:
+            raise ValueError(f"{name} debe ser >= 0")
+        return revision
+
+    def get_changes(self, location: str, since=0, after=None) -> Dict:
+        """
+        Cambios de la galería de un dispositivo desde la revisión `since`.
+
+        Args:
+            location: Ubicación del dispositivo
+            since: Última revisión aplicada por el dispositivo (0 = ninguna)
+            after: Cursor de la página siguiente del snapshot tomado en la
+                   revisión `since` (el `after` de la página anterior)
+
+        Returns:
+            Dict con device, revision, reset, upserts (usuarios), deletes
+            (cédulas), has_more y after (cursor del snapshot o None)
+
+        Raises:
+            ValueError: Si los parámetros son inválidos
+            LookupError: Si el dispositivo no existe
+        """
+        since = self._parse_revision(since, "since")
+        device = self._get_device(location)
+        if after is not None:
+            return self._snapshot_page(location, device, since,
+                                       self._parse_revision(after, "after"), reset=False)
+
+        settled = self.mapping_repo.settled_revision(
+            self.clock() - timedelta(seconds=self.settle_seconds))
+
+        # Los cambios posteriores a `since` ya se purgaron: hace falta un reset
+        if since and since < self.mapping_repo.oldest_revision() - 1:
+            since = 0
+
+        if since == 0:
+            # La revisión se lee antes que los usuarios: lo que cambie entre
+            # medio se vuelve a entregar en el próximo delta
+            return self._snapshot_page(location, device, settled, 0, reset=True)
+
+        changes = self.mapping_repo.get_changes_since(
+            device.id_device, since, self.page_size, max_revision=settled)
+
+        # Último cambio de cada usuario dentro de la página
+        latest = OrderedDict()
+        for change in changes:
+            latest.pop(change.access_user_id, None)
+            latest[change.access_user_id] = change
+
+        deletes: List[str] = [c.cedula for c in latest.values() if c.op == OP_DELETE]
+        upsert_ids = [user_id for user_id, c in latest.items() if c.op != OP_DELETE]
+        upserts = []
+        if upsert_ids:
+            # Si el usuario ya no tiene acceso, su baja viene en una página posterior
+            users = self.mapping_repo.get_device_users(device.id_device, user_ids=upsert_ids)
+            upserts = [self._user_info(u) for u in users]
+
+        has_more = len(changes) == self.page_size
+        return {
+            "device": location,
+            # Sin más páginas el dispositivo queda al día hasta la revisión asentada
+            "revision": changes[-1].revision if has_more else max(since, settled),
+            "reset": False,
+            "upserts": upserts,
+            "deletes": deletes,
+            "has_more": has_more,
+            "after": None,
+        }
+
+    def _snapshot_page(self, location: str, device, revision: int, after: int,
+                       reset: bool) -> Dict:
+        """Página del snapshot tomado en `revision`: usuarios con ID mayor a `after`."""
+        users = self.mapping_repo.get_device_users(
+            device.id_device, after_id=after, limit=self.page_size)
+        has_more = len(users) == self.page_size
+        return {
+            "device": location,
+            "revision": revision,
+            "reset": reset,
+            "upserts": [self._user_info(u) for u in users],
+            "deletes": [],
+            "has_more": has_more,
+            "after": users[-1].id if has_more else None,
+        }
+
+    def prune_changes(self) -> int:
+        """
+        Purga el log de cambios más antiguo que retention_days (0 no purga).
+
+        Returns:
+            Cantidad de cambios borrados
+        """
+        if self.retention_days <= 0:
+            return 0
+        return self.mapping_repo.prune_changes(
+            self.clock() - timedelta(days=self.retention_days))
+
+    def acknowledge(self, location: str, revision) -> Dict:
+        """
+        Registra que el dispositivo aplicó los cambios hasta `revision`
+        (Device.sync_revision y Device.last_sync).
+
+        Raises:
+            ValueError: Si la revisión es inválida o todavía no existe
+            LookupError: Si el dispositivo no existe
+        """
+        revision = self._parse_revision(revision, "revision")
+        device = self._get_device(location)
+        if revision > self.mapping_repo.current_revision():
+            raise ValueError(f"La revisión {revision} no existe")
+
+        updated = self.device_repo.ack_sync_revision(device.id_device, revision, self.clock())
+        return {
+            "device": location,
+            "revision": max(revision, device.sync_revision or 0),
+            "updated": updated,
+        }
@@ -0,0 +1,198 @@
+# services/face_match_service.py
+"""
+Búsqueda 1:N de rostros sobre los embeddings de access_users.
+
+Los embeddings (128 floats de face_recognition) se cargan una vez por
+contenedor en una matriz float32 contigua; cada consulta es un único cálculo
+de distancias euclídeas contra toda la matriz (la misma métrica que
+face_recognition.face_distance, con tolerancia 0.6 por defecto).
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from shared.cache import register
+from shared.embeddings import EMBEDDING_BYTES, EMBEDDING_SIZE, from_bytes
+
+DEFAULT_TOLERANCE = 0.6
+
+
+def _as_vector(embedding) -> np.ndarray:
+    """
+    Acepta el binario de AccessUser.face_embedding_bin, el JSON de
+    AccessUser.face_embedding, una lista de floats o un array.
+    """
+    if isinstance(embedding, (bytes, bytearray, memoryview)) and len(embedding) == EMBEDDING_BYTES:
+        return from_bytes(embedding)
+    if isinstance(embedding, (str, bytes)):
+        embedding = json.loads(embedding)
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector.shape != (EMBEDDING_SIZE,):
+        raise ValueError(f"Invalid face embedding (expected {EMBEDDING_SIZE} floats)")
+    return vector
+
+
+class FaceIndex:
+    """
+    Índice en memoria de embeddings por usuario.
+
+    La primera consulta carga todos los embeddings con `loader`; altas y
+    bajas se aplican de forma incremental (la baja mueve la última fila al
+    hueco, así la matriz sigue contigua). Como otros contenedores también
+    registran y eliminan usuarios, el índice se recarga completo cada
+    `refresh_seconds`.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[tuple]],
+        refresh_seconds: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.clear()
+        register(self)
+
+    def clear(self) -> None:
+        self._matrix = np.empty((0, EMBEDDING_SIZE), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)  # |e|² por fila
+        self._ids = np.empty(0, dtype=np.int64)
+        self._rows = {}
+        self._size = 0
+        self._loaded_at = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self._matrix):
+            return
+        capacity = max(capacity, 2 * len(self._matrix), 64)
+        for name in ("_matrix", "_norms", "_ids"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _load(self) -> None:
+        self.clear()
+        for user_id, embedding in self._loader():
+            try:
+                self._add(user_id, _as_vector(embedding))
+            except ValueError:
+                continue  # embedding corrupto: se ignora
+        self._loaded_at = self._clock()
+
+    def ensure_loaded(self) -> None:
+        """Carga o recarga el índice si corresponde."""
+        with self._lock:
+            if (self._loaded_at is None
+                    or self._clock() - self._loaded_at >= self.refresh_seconds):
+                self._load()
+
+    def _add(self, user_id: int, vector: np.ndarray) -> None:
+        row = self._rows.get(user_id)
+        if row is None:
+            row = self._size
+            self._reserve(row + 1)
+            self._rows[user_id] = row
+            self._size += 1
+        self._matrix[row] = vector
+        self._norms[row] = vector @ vector
+        self._ids[row] = user_id
+
+    def add(self, user_id: int, embedding) -> None:
+        """Agrega o reemplaza el embedding de un usuario (si el índice está cargado)."""
+        vector = _as_vector(embedding)
+        with self._lock:
+            if self.loaded:
+                self._add(user_id, vector)
+
+    def remove(self, user_id: int) -> bool:
+        """Quita un usuario del índice. Devuelve True si estaba."""
+        with self._lock:
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return False
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._norms[row] = self._norms[last]
+                self._ids[row] = self._ids[last]
+                self._rows[int(self._ids[row])] = row
+            self._size = last
+            return True
+
+    def distances(self, embeddings) -> np.ndarray:
+        """
+        Distancias euclídeas de una o varias consultas contra todo el índice.
+
+        Args:
+            embeddings: Matriz (m, 128) o un solo embedding
+
+        Returns:
+            Array (m, n) con n = usuarios indexados
+        """
+        self.ensure_loaded()
+        queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        if queries.shape[1] != EMBEDDING_SIZE:
+            raise ValueError(f"Invalid face embedding (expected {EMBEDDING_SIZE} floats)")
+        matrix = self._matrix[:self._size]
+        # |q - e|² = |q|² - 2 q·e + |e|²
+        squared = (np.einsum("ij,ij->i", queries, queries)[:, None]
+                   - 2.0 * queries @ matrix.T
+                   + self._norms[:self._size][None, :])
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def nearest(self, embedding, k: int = 5) -> List[Tuple[int, float]]:
+        """Los k usuarios más cercanos como [(user_id, distancia)], de menor a mayor."""
+        distances = self.distances(_as_vector(embedding))[0]
+        k = min(k, len(distances))
+        if k <= 0:
+            return []
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(int(self._ids[i]), float(distances[i])) for i in top]
+
+    def identify(self, embedding, tolerance: float = DEFAULT_TOLERANCE) -> Optional[Tuple[int, float]]:
+        """Usuario más cercano si está dentro de `tolerance`, o None."""
+        match = self.nearest(embedding, k=1)
+        if match and match[0][1] <= tolerance:
+            return match[0]
+        return None
+
+    def identify_batch(self, embeddings, tolerance: float = DEFAULT_TOLERANCE) -> List[Optional[int]]:
+        """Para cada embedding, el user_id más cercano dentro de `tolerance` o None."""
+        distances = self.distances(embeddings)
+        if distances.shape[1] == 0:
+            return [None] * distances.shape[0]
+        best = distances.argmin(axis=1)
+        best_distances = distances[np.arange(len(best)), best]
+        return [int(self._ids[i]) if d <= tolerance else None
+                for i, d in zip(best, best_distances)]
+
+
+_face_index: Optional[FaceIndex] = None
+
+
+def get_face_index() -> FaceIndex:
+    """Índice del contenedor, cargado desde access_users en el primer uso."""
+    global _face_index
+    if _face_index is None:
+        from repositories.access_user_repo import AccessUserRepository
+        _face_index = FaceIndex(
+            AccessUserRepository().iter_face_embeddings,
+            refresh_seconds=float(os.environ.get("FACE_INDEX_REFRESH", 300)),
+        )
+    return _face_index
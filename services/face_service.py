@@ -1,15 +1,77 @@
+import os
+
 import cv2
 import numpy as np
 import face_recognition
 
+from shared.images import downscale_ratio, jpeg_dimensions, reduction_factor, scale_box
+
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Lado mayor de la imagen en la que se calcula el embedding; el JPEG se
+# decodifica reducido (en el DCT) mientras quede por encima. 0 = resolución completa
+ENCODE_MAX_SIDE = int(os.environ.get("FACE_ENCODE_MAX_SIDE", 1600))
+# Lado mayor de la imagen en la que corre el detector HOG. 0 = sin reducir
+DETECT_MAX_SIDE = int(os.environ.get("FACE_DETECT_MAX_SIDE", 640))
 
-def extract_embedding(image_bytes: bytes) -> list[float]:
+
+def _decode(image_bytes: bytes, encode_max_side: int) -> np.ndarray:
     arr = np.frombuffer(image_bytes, dtype=np.uint8)
-    bgr = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    flag = cv2.IMREAD_COLOR
+    dims = jpeg_dimensions(image_bytes)
+    if dims is not None:
+        factor = reduction_factor(*dims, encode_max_side)
+        flag = _REDUCED_FLAGS.get(factor, cv2.IMREAD_COLOR)
+    bgr = cv2.imdecode(arr, flag)
     if bgr is None:
         raise ValueError("Invalid JPEG")
+    return bgr
+
+
+def _locate_faces(rgb: np.ndarray, detect_max_side: int) -> list:
+    """
+    Detecta en una copia reducida a `detect_max_side` y devuelve las cajas
+    en coordenadas de `rgb`. Si en la reducida no hay rostros se reintenta
+    en `rgb` (caras chicas en fotos grandes).
+    """
+    height, width = rgb.shape[:2]
+    ratio = downscale_ratio(width, height, detect_max_side)
+    if ratio < 1.0:
+        small = cv2.resize(rgb, (max(1, int(width * ratio)), max(1, int(height * ratio))),
+                           interpolation=cv2.INTER_AREA)
+        faces = face_recognition.face_locations(small)
+        if faces:
+            return [scale_box(box, ratio, width, height) for box in faces]
+    return face_recognition.face_locations(rgb)
+
+
+def extract_embedding(image_bytes: bytes,
+                      encode_max_side: int = None,
+                      detect_max_side: int = None) -> list[float]:
+    encode_max_side = ENCODE_MAX_SIDE if encode_max_side is None else encode_max_side
+    detect_max_side = DETECT_MAX_SIDE if detect_max_side is None else detect_max_side
+
+    bgr = _decode(image_bytes, encode_max_side)
     rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-    faces = face_recognition.face_locations(rgb)
+    faces = _locate_faces(rgb, detect_max_side)
     if not faces:
         raise ValueError("No face found")
-    return face_recognition.face_encodings(rgb, faces)[0].tolist()
+    return face_recognition.face_encodings(rgb, faces[:1])[0].tolist()
+
+
+def warm_up() -> None:
+    """
+    Ejecuta una vez decodificación, detector y encoder sobre una imagen
+    sintética, para que las primeras asignaciones de libjpeg y dlib ocurran
+    en la fase de init del contenedor y no en el primer registro.
+    """
+    blank = np.zeros((160, 160, 3), dtype=np.uint8)
+    ok, jpeg = cv2.imencode(".jpg", blank)
+    if ok:
+        cv2.imdecode(jpeg, cv2.IMREAD_REDUCED_COLOR_2)
+    face_recognition.face_locations(blank)
+    face_recognition.face_encodings(blank, [(10, 150, 150, 10)])
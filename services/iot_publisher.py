@@ -0,0 +1,114 @@
+# services/iot_publisher.py
+"""
+Publicación de un mismo mensaje MQTT en varios topics (uno por Raspberry Pi).
+
+El payload se serializa una sola vez y los publish corren en paralelo en un
+pool de hilos acotado que vive en el contenedor (se reutiliza entre
+invocaciones warm).
+
+Variables:
+- IOT_PUBLISH_CONCURRENCY: publish simultáneos como máximo (10)
+- IOT_PUBLISH_DEADLINE: segundos máximos para todo el fan-out (10)
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def max_concurrency() -> int:
+    return max(1, int(os.environ.get("IOT_PUBLISH_CONCURRENCY", 10)))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max_concurrency(), thread_name_prefix="iot-publish")
+        return _executor
+
+
+class IotPublisher:
+    """Fan-out de un payload a varios topics con un cliente boto3 'iot-data'."""
+
+    def __init__(
+        self,
+        client,
+        deadline_seconds: Optional[float] = None,
+        qos: int = 1
+    ):
+        self.client = client
+        self.deadline_seconds = (
+            float(os.environ.get("IOT_PUBLISH_DEADLINE", 10))
+            if deadline_seconds is None else deadline_seconds
+        )
+        self.qos = qos
+
+    def _publish(self, topic: str, payload: bytes) -> None:
+        self.client.publish(topic=topic, qos=self.qos, payload=payload)
+
+    def publish_many(
+        self,
+        topics: List[str],
+        payload: Union[Dict[str, Any], str, bytes]
+    ) -> Dict[str, Any]:
+        """
+        Publica `payload` en todos los `topics`.
+
+        Args:
+            topics: Topics destino
+            payload: Dict (se serializa a JSON una vez), str o bytes
+
+        Returns:
+            Dict con:
+            - published: topics publicados
+            - failed: {topic: error} de los publish que fallaron
+            - timed_out: topics sin confirmar al vencer el deadline
+        """
+        if isinstance(payload, dict):
+            payload = json.dumps(payload)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+
+        result = {"published": [], "failed": {}, "timed_out": []}
+        if not topics:
+            return result
+
+        # Un solo topic: sin pasar por el pool
+        if len(topics) == 1:
+            try:
+                self._publish(topics[0], payload)
+                result["published"].append(topics[0])
+            except Exception as e:
+                result["failed"][topics[0]] = str(e)
+            return result
+
+        executor = _get_executor()
+        started = time.monotonic()
+        futures = {executor.submit(self._publish, topic, payload): topic for topic in topics}
+        done, pending = wait(futures, timeout=self.deadline_seconds)
+
+        for future, topic in futures.items():
+            if future in pending:
+                future.cancel()  # los que no arrancaron no se publican
+                result["timed_out"].append(topic)
+            elif future.exception() is not None:
+                result["failed"][topic] = str(future.exception())
+            else:
+                result["published"].append(topic)
+
+        if result["failed"] or result["timed_out"]:
+            logger.warning(
+                "Fan-out IoT: %d publicados, %d fallidos, %d sin confirmar en %.2fs",
+                len(result["published"]), len(result["failed"]),
+                len(result["timed_out"]), time.monotonic() - started)
+        return result
@@ -0,0 +1,131 @@
+# services/log_export_service.py
+import csv
+import io
+import json
+import os
+import uuid
+from typing import Any, Dict, Iterable, Iterator, Optional
+from repositories.access_log_repo import AccessLogRepository
+from services.access_log_service import AccessLogService
+
+EXPORT_FORMATS = {
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "csv": ("csv", "text/csv"),
+}
+CSV_COLUMNS = [
+    "id", "access_user_id", "first_name", "last_name",
+    "device_id", "device_location", "event", "timestamp",
+]
+
+
+class LogExportService(AccessLogService):
+    """
+    Exportación de logs de acceso a S3 (NDJSON o CSV).
+
+    Las filas se leen en bloques (keyset) y se escriben en un multipart upload,
+    así la memoria queda acotada por el tamaño de bloque y de parte sin
+    importar cuántas filas tenga la exportación.
+    """
+
+    def __init__(
+        self,
+        access_log_repo: AccessLogRepository,
+        storage=None,
+        chunk_size: Optional[int] = None,
+        url_expires_in: Optional[int] = None
+    ):
+        super().__init__(access_log_repo)
+        self._storage = storage
+        self.chunk_size = chunk_size or int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+        self.url_expires_in = url_expires_in or int(os.environ.get("EXPORT_URL_EXPIRES", 3600))
+
+    @property
+    def storage(self):
+        # Import diferido: boto3 solo se carga si efectivamente se exporta
+        if self._storage is None:
+            from services import storage_service
+            self._storage = storage_service
+        return self._storage
+
+    def _ndjson_lines(self, rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    def _csv_lines(self, rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for row in rows:
+            user = row["user"]
+            writer.writerow([
+                row["id"], row["access_user_id"], user["first_name"], user["last_name"],
+                row["device_id"], row["device_location"], row["event"], row["timestamp"],
+            ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def export_logs(
+        self,
+        user_id: Optional[str] = None,
+        device_id: Optional[str] = None,
+        event: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        fmt: str = "ndjson"
+    ) -> Dict[str, Any]:
+        """
+        Exporta los logs filtrados a S3 y devuelve una URL firmada de descarga.
+
+        Args:
+            user_id: ID del usuario para filtrar (string desde query params)
+            device_id: ID del dispositivo para filtrar
+            event: 'accepted' o 'denied' (opcional)
+            start: Fecha ISO8601 inicial, inclusiva
+            end: Fecha ISO8601 final, exclusiva
+            fmt: 'ndjson' o 'csv'
+
+        Returns:
+            Dict con key, url, expires_in, format y rows
+
+        Raises:
+            ValueError: Si los parámetros no son válidos
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format debe ser uno de: {', '.join(EXPORT_FORMATS)}")
+        extension, content_type = EXPORT_FORMATS[fmt]
+
+        user_id_int, event, start_dt, end_dt = self._parse_filters(user_id, event, start, end)
+
+        logs = self.access_log_repo.iter_logs(
+            user_id=user_id_int,
+            device_id=device_id,
+            event=event,
+            start=start_dt,
+            end=end_dt,
+            chunk_size=self.chunk_size
+        )
+
+        counted = {"rows": 0}
+
+        def formatted():
+            for log in logs:
+                counted["rows"] += 1
+                yield self._format_log(log)
+
+        lines = self._csv_lines(formatted()) if fmt == "csv" else self._ndjson_lines(formatted())
+
+        key = f"exports/access_logs/{uuid.uuid4()}.{extension}"
+        with self.storage.MultipartUpload(key, content_type=content_type) as upload:
+            for line in lines:
+                upload.write(line.encode("utf-8"))
+
+        return {
+            "key": key,
+            "url": self.storage.presigned_get_url(key, expires_in=self.url_expires_in),
+            "expires_in": self.url_expires_in,
+            "format": fmt,
+            "rows": counted["rows"],
+        }
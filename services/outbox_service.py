@@ -0,0 +1,172 @@
+# services/outbox_service.py
+"""
+Publicación del outbox de notificaciones IoT.
+
+Las APIs (alta/baja de usuarios, accesos por dispositivo) insertan en
+outbox_messages dentro de su transacción y publican apenas confirman
+(OutboxDrainer.deliver), así un acceso revocado llega a las puertas sin
+esperar al drainer. El drainer programado solo reintenta lo que no se
+pudo entregar, en lotes y con backoff exponencial. La entrega es
+at-least-once y en orden por ubicación (ver OutboxRepository.claim).
+
+Variables:
+- OUTBOX_BATCH_SIZE: mensajes por lote (100)
+- OUTBOX_MAX_ATTEMPTS: intentos antes de marcar el mensaje 'dead' (10)
+- OUTBOX_BACKOFF_BASE / OUTBOX_BACKOFF_MAX: segundos de espera tras el
+  primer fallo y tope (2 / 300)
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from repositories.outbox_repo import OutboxRepository
+from services.iot_publisher import IotPublisher
+from shared.models import OutboxMessage, db
+
+logger = logging.getLogger()
+
+
+class OutboxDrainer:
+    """Publica los mensajes del outbox (inmediatos y pendientes)"""
+
+    def __init__(
+        self,
+        outbox_repo: OutboxRepository,
+        publisher: IotPublisher,
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        clock: Callable[[], datetime] = datetime.utcnow
+    ):
+        self.outbox_repo = outbox_repo
+        self.publisher = publisher
+        self.batch_size = batch_size or int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+        self.max_attempts = max_attempts or int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 10))
+        self.backoff_base = (float(os.environ.get("OUTBOX_BACKOFF_BASE", 2))
+                             if backoff_base is None else backoff_base)
+        self.backoff_max = (float(os.environ.get("OUTBOX_BACKOFF_MAX", 300))
+                            if backoff_max is None else backoff_max)
+        self.clock = clock
+
+    def backoff(self, attempts: int) -> float:
+        """Segundos de espera después del intento número `attempts` (1, 2, ...)."""
+        return min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+
+    def publish(self, messages: List[OutboxMessage]) -> Tuple[Dict[str, int], List[OutboxMessage]]:
+        """
+        Publica mensajes ya tomados (claim o enqueue_claimed) y registra el
+        resultado. La publicación corre fuera de toda transacción; solo el
+        registro (borrar los enviados, postergar o descartar los fallidos)
+        abre una, corta, al final.
+
+        Returns:
+            (stats, fallidos): stats con published, retried y dead, y los
+            mensajes que no se pudieron publicar
+        """
+        stats = {"published": 0, "retried": 0, "dead": 0}
+        if not messages:
+            return stats, []
+
+        # Mensajes con el mismo payload (un alta a varias puertas) van en un solo fan-out
+        by_payload = defaultdict(list)
+        for message in messages:
+            by_payload[message.payload].append(message)
+
+        sent, failed = [], []
+        for payload, group in by_payload.items():
+            by_topic = {m.topic: m for m in group}
+            result = self.publisher.publish_many(list(by_topic), payload)
+            sent += [by_topic[t].id for t in result["published"]]
+            errors = dict(result["failed"])
+            errors.update({t: "deadline exceeded" for t in result["timed_out"]})
+            failed += [(by_topic[t], error) for t, error in errors.items()]
+
+        now = self.clock()
+        with db.atomic():
+            for message, error in failed:
+                if message.attempts >= self.max_attempts:
+                    logger.error(f"Outbox {message.id} ({message.topic}) descartado "
+                                 f"tras {message.attempts} intentos: {error}")
+                    self.outbox_repo.mark_dead(message, error)
+                    stats["dead"] += 1
+                else:
+                    retry_at = now + timedelta(seconds=self.backoff(message.attempts))
+                    self.outbox_repo.retry(message, error, retry_at)
+                    stats["retried"] += 1
+            self.outbox_repo.delete(sent)
+        stats["published"] = len(sent)
+        return stats, [message for message, _ in failed]
+
+    def drain_batch(self) -> Dict[str, int]:
+        """
+        Publica un lote. La toma se confirma antes de publicar (ver
+        OutboxRepository.claim), así ni los locks ni la transacción duran lo
+        que tarda IoT.
+
+        Returns:
+            Dict con claimed, published, retried y dead
+        """
+        messages = self.outbox_repo.claim(self.batch_size, self.clock())
+        # Intentos que vencieron sin registrar resultado (p. ej. timeout de la
+        # Lambda) también cuentan: pasado el máximo no se vuelven a publicar
+        expired = [m for m in messages if m.attempts > self.max_attempts]
+        for message in expired:
+            logger.error(f"Outbox {message.id} ({message.topic}) descartado "
+                         f"tras {message.attempts - 1} intentos sin resultado")
+            self.outbox_repo.mark_dead(message, "lease expired")
+        stats, _ = self.publish([m for m in messages if m not in expired])
+        stats["dead"] += len(expired)
+        return {"claimed": len(messages), **stats}
+
+    def deliver(self, messages: List[OutboxMessage]) -> List[OutboxMessage]:
+        """
+        Publicación inmediata, después del commit, de los mensajes que un
+        request encoló con enqueue_claimed. Sale por rondas lo que ya es el
+        más antiguo pendiente de su ubicación (una baja antes que el alta
+        siguiente, y nunca antes que un reintento anterior); lo que queda
+        detrás de un mensaje no entregado se devuelve al drainer.
+
+        Returns:
+            Mensajes no entregados (los reintenta el drainer)
+        """
+        undelivered = []
+        pending = list(messages)
+        while pending:
+            heads = self.outbox_repo.heads(m.location for m in pending)
+            ready = [m for m in pending if heads.get(m.location) == m.id]
+            if not ready:
+                break
+            pending = [m for m in pending if heads.get(m.location) != m.id]
+            _, failed = self.publish(ready)
+            undelivered += failed
+        self.outbox_repo.release([m.id for m in pending], self.clock())
+        for message in undelivered + pending:
+            logger.warning(f"Notificación a {message.location} pendiente de reintento "
+                           f"(outbox {message.id})")
+        return undelivered + pending
+
+    def drain(self, time_left: Optional[Callable[[], float]] = None,
+              min_seconds_left: float = 15) -> Dict[str, int]:
+        """
+        Publica lotes hasta vaciar lo disponible o hasta que queden menos de
+        `min_seconds_left` segundos según `time_left`.
+
+        Returns:
+            Totales acumulados de drain_batch
+        """
+        totals = {"claimed": 0, "published": 0, "retried": 0, "dead": 0}
+        while True:
+            stats = self.drain_batch()
+            for key, value in stats.items():
+                totals[key] += value
+            # Lote sin entregas (nada disponible o IoT fallando): queda para la próxima corrida
+            if not stats["published"]:
+                break
+            if time_left is not None and time_left() < min_seconds_left:
+                break
+        if totals["claimed"]:
+            logger.info(f"Outbox drenado: {totals}")
+        return totals
@@ -2,7 +2,11 @@ import boto3
 import uuid
 import os
 _s3 = boto3.client("s3")
-_BUCKET = os.environ["S3_BUCKET"]
+_BUCKET = os.environ.get("S3_BUCKET", "")
+
+# S3 exige partes de al menos 5 MiB (salvo la última)
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
 
 
 def upload_jpeg(image_bytes: bytes) -> str:
@@ -10,3 +14,89 @@ def upload_jpeg(image_bytes: bytes) -> str:
     _s3.put_object(Bucket=_BUCKET, Key=key, Body=image_bytes,
                    ContentType="image/jpeg")
     return f"https://{_BUCKET}.s3.amazonaws.com/{key}"
+
+
+def presigned_get_url(key: str, expires_in: int = 3600) -> str:
+    """URL firmada de descarga para un objeto del bucket."""
+    return _s3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": _BUCKET, "Key": key},
+        ExpiresIn=expires_in,
+    )
+
+
+def put_object(key: str, body: bytes, content_type: str = "application/octet-stream") -> None:
+    _s3.put_object(Bucket=_BUCKET, Key=key, Body=body, ContentType=content_type)
+
+
+def open_object(key: str):
+    """
+    Cuerpo en streaming de un objeto del bucket (se lee con .read()),
+    o None si no existe.
+    """
+    try:
+        return _s3.get_object(Bucket=_BUCKET, Key=key)["Body"]
+    except _s3.exceptions.NoSuchKey:
+        return None
+
+
+class MultipartUpload:
+    """
+    Escritura incremental de un objeto S3 con multipart upload.
+
+    Acumula como máximo `part_size` bytes en memoria: cada vez que se llena
+    el buffer se sube una parte. Usado como context manager completa el
+    upload al salir, o lo aborta si hubo una excepción.
+    """
+
+    def __init__(self, key: str, content_type: str = "application/octet-stream",
+                 part_size: int = DEFAULT_PART_SIZE, client=None, bucket: str = None):
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.bytes_written = 0
+        self._s3 = client or _s3
+        self._bucket = bucket or _BUCKET
+        self._buffer = bytearray()
+        self._parts = []
+        self._upload_id = self._s3.create_multipart_upload(
+            Bucket=self._bucket, Key=key, ContentType=content_type
+        )["UploadId"]
+
+    def write(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+
+    def _upload_part(self, body: bytes) -> None:
+        number = len(self._parts) + 1
+        response = self._s3.upload_part(
+            Bucket=self._bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=number, Body=body,
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+    def complete(self) -> None:
+        """Sube lo que quede en el buffer (o una parte vacía) y cierra el upload."""
+        if self._buffer or not self._parts:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+        self._s3.complete_multipart_upload(
+            Bucket=self._bucket, Key=self.key, UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self) -> None:
+        self._s3.abort_multipart_upload(
+            Bucket=self._bucket, Key=self.key, UploadId=self._upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.complete()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,154 @@
+# shared/cache.py
+"""
+Caches en memoria por contenedor Lambda.
+
+Las instancias viven a nivel de módulo, por lo que sobreviven entre
+invocaciones "warm" del mismo contenedor y se pierden en cada cold start.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Centinela para distinguir "no está en cache" de un valor cacheado None
+MISSING = object()
+
+# Registro de caches creadas, para poder limpiarlas todas (tests / invalidación global).
+# Cualquier objeto con un método clear() puede registrarse.
+_registry: List[Any] = []
+
+
+def register(cache: Any) -> Any:
+    """Registra un objeto con `clear()` para que `clear_all()` lo vacíe."""
+    _registry.append(cache)
+    return cache
+
+
+class TTLCache:
+    """
+    Cache LRU acotada con expiración por TTL.
+
+    - `maxsize`: número máximo de claves; al superarlo se expulsa la menos usada.
+    - `ttl`: segundos de vida de un valor encontrado.
+    - `negative_ttl`: segundos de vida de un resultado negativo (None).
+      Con 0 los negativos no se cachean.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: float = 300,
+        negative_ttl: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        register(self)
+
+    def get(self, key: Hashable) -> Any:
+        """Devuelve el valor cacheado o MISSING si no está o expiró."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return MISSING
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Guarda un valor; los None usan `negative_ttl`."""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, self._clock() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """Devuelve el valor cacheado o lo carga con `loader(key)` y lo guarda."""
+        value = self.get(key)
+        if value is MISSING:
+            value = loader(key)
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Elimina una clave, o toda la cache si `key` es None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Vacía la cache y reinicia los contadores."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos/fallos y tamaño actual."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom para pertenencia aproximada de strings.
+
+    Un resultado negativo es definitivo ("seguro no está"); uno positivo puede
+    ser un falso positivo con probabilidad ~`error_rate` mientras no se supere
+    `capacity`. No admite borrados.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7))
+                   for pos in self._positions(item))
+
+    @property
+    def saturated(self) -> bool:
+        """True si se agregaron más elementos que la capacidad prevista."""
+        return self.count > self.capacity
+
+
+def clear_all() -> None:
+    """Vacía todas las caches registradas en este proceso."""
+    for cache in _registry:
+        cache.clear()
@@ -0,0 +1,145 @@
+# shared/connection.py
+"""
+Ciclo de vida de la conexión Peewee en Lambda.
+
+La conexión queda abierta entre invocaciones "warm" del mismo contenedor en
+lugar de abrir/cerrar en cada request (handshake TCP + TLS + auth de
+Postgres). Antes de usarla se verifica de forma barata:
+
+- si está cerrada se conecta;
+- si superó su vida máxima (DB_CONN_MAX_AGE, ver shared/db.py) se recicla;
+- si el driver la marcó como caída, o estuvo inactiva más de
+  DB_HEALTHCHECK_INTERVAL segundos, se hace un `SELECT 1` y ante
+  OperationalError/InterfaceError se reconecta.
+
+Con DB_KEEP_ALIVE=0 se vuelve al comportamiento anterior (cerrar al final
+de cada invocación).
+"""
+import functools
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict
+
+from peewee import Database, InterfaceError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """Mantiene y verifica la conexión de una base de datos Peewee entre invocaciones."""
+
+    def __init__(
+        self,
+        database: Database,
+        healthcheck_interval: float = None,
+        keep_alive: bool = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.database = database
+        self.healthcheck_interval = (
+            healthcheck_interval if healthcheck_interval is not None
+            else float(os.environ.get("DB_HEALTHCHECK_INTERVAL", 30))
+        )
+        self.keep_alive = (
+            keep_alive if keep_alive is not None
+            else os.environ.get("DB_KEEP_ALIVE", "1") != "0"
+        )
+        self._clock = clock
+        self._last_used = None
+        self.connects = 0
+        self.reconnects = 0
+
+    def _needs_check(self) -> bool:
+        conn = getattr(self.database._state, "conn", None)
+        # psycopg2 deja `closed` != 0 cuando detecta que la conexión se cayó
+        if getattr(conn, "closed", 0):
+            return True
+        return (self._last_used is not None and
+                self._clock() - self._last_used >= self.healthcheck_interval)
+
+    def acquire(self) -> None:
+        """Deja la conexión lista para usar: conecta, o verifica y reconecta."""
+        if self.database.is_closed():
+            self.database.connect()
+            self.connects += 1
+            return
+
+        # Conexión que superó DB_CONN_MAX_AGE (EngineDatabase): se recicla
+        expired = getattr(self.database, "connection_expired", None)
+        if expired is not None and expired():
+            self.reconnect()
+            return
+
+        if self._needs_check():
+            try:
+                self.database.execute_sql("SELECT 1")
+            except (OperationalError, InterfaceError) as exc:
+                logger.warning("Conexión a la BD inválida, reconectando: %s", exc)
+                self.reconnect()
+
+    def reconnect(self) -> None:
+        """Descarta la conexión actual (aunque esté rota) y abre una nueva."""
+        try:
+            self.database.close()
+        except (OperationalError, InterfaceError):
+            # Conexión rota o transacción colgada: se descarta el estado local
+            self.database._state.reset()
+        self.database.connect()
+        self.reconnects += 1
+
+    def release(self) -> None:
+        """Fin de la invocación: conserva la conexión salvo DB_KEEP_ALIVE=0."""
+        self._last_used = self._clock()
+        if not self.keep_alive and not self.database.is_closed():
+            self.database.close()
+
+
+_managers: Dict[int, ConnectionManager] = {}
+
+
+def get_manager(database: Database) -> ConnectionManager:
+    """Manager único por base de datos (vive a nivel de módulo, por contenedor)."""
+    key = id(database)
+    if key not in _managers:
+        _managers[key] = ConnectionManager(database)
+    return _managers[key]
+
+
+def reset_managers() -> None:
+    """Descarta los managers (equivale a un cold start; usado en tests)."""
+    _managers.clear()
+
+
+def db_connection(database: Database):
+    """
+    Decorador para handlers Lambda: adquiere la conexión antes de ejecutar
+    el handler y la libera (sin cerrarla) al terminar.
+
+    Si no se puede obtener la conexión responde 500, igual que hacían los
+    handlers cuando `db.connect()` fallaba dentro de su try.
+
+    Uso:
+        @db_connection(db)
+        def lambda_handler(event, context): ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            manager = get_manager(database)
+            try:
+                manager.acquire()
+            except (OperationalError, InterfaceError) as exc:
+                logger.error("No se pudo conectar a la BD: %s", exc)
+                return {
+                    "statusCode": 500,
+                    "headers": {"Content-Type": "application/json"},
+                    "body": json.dumps({"error": str(exc)})
+                }
+            try:
+                return func(*args, **kwargs)
+            finally:
+                manager.release()
+        return wrapper
+    return decorator
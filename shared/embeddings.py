@@ -0,0 +1,96 @@
+# shared/embeddings.py
+"""
+Formato binario de los embeddings faciales.
+
+Un embedding de face_recognition (128 floats) se guarda en
+AccessUser.face_embedding_bin como 512 bytes float32 little-endian, en vez
+de ~2.5 KB de JSON en AccessUser.face_embedding. No depende de numpy (las
+lambdas de la capa común no lo tienen); `from_bytes` lo usa para
+decodificar sin copiar.
+
+IOT_EMBEDDING_FORMAT elige cómo viaja el embedding en los mensajes MQTT:
+- 'json' (por defecto): "face_embedding" como hasta ahora
+- 'base64': "face_embedding_b64" con los 512 bytes en base64 (684 caracteres)
+"""
+import base64
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional
+
+EMBEDDING_SIZE = 128
+EMBEDDING_BYTES = EMBEDDING_SIZE * 4
+_STRUCT = struct.Struct(f"<{EMBEDDING_SIZE}f")
+
+IOT_FORMATS = ("json", "base64")
+
+
+def to_bytes(embedding) -> bytes:
+    """
+    Codifica un embedding (lista, array o JSON) en 512 bytes float32 LE.
+
+    Raises:
+        ValueError: Si no tiene 128 valores
+    """
+    if isinstance(embedding, str):
+        embedding = json.loads(embedding)
+    values = list(embedding)
+    if len(values) != EMBEDDING_SIZE:
+        raise ValueError(f"Invalid face embedding (expected {EMBEDDING_SIZE} floats)")
+    return _STRUCT.pack(*values)
+
+
+def _check_blob(blob) -> None:
+    if len(blob) != EMBEDDING_BYTES:
+        raise ValueError(f"Invalid face embedding blob (expected {EMBEDDING_BYTES} bytes)")
+
+
+def from_bytes(blob):
+    """Array numpy float32 de solo lectura sobre el mismo buffer (sin copia)."""
+    import numpy as np
+
+    _check_blob(blob)
+    return np.frombuffer(blob, dtype="<f4")
+
+
+def to_list(blob) -> List[float]:
+    """Decodifica a lista de floats sin numpy."""
+    _check_blob(blob)
+    return list(_STRUCT.unpack(bytes(blob)))
+
+
+def iot_format() -> str:
+    fmt = os.environ.get("IOT_EMBEDDING_FORMAT", "json").lower()
+    return fmt if fmt in IOT_FORMATS else "json"
+
+
+def iot_fields(json_text: Optional[str] = None, blob=None,
+               embedding: Optional[List[float]] = None,
+               fmt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Campos del embedding para un payload MQTT según el formato.
+
+    Args:
+        json_text: Embedding como JSON (columna face_embedding)
+        blob: Embedding binario (columna face_embedding_bin)
+        embedding: Embedding como lista (recién calculado)
+        fmt: 'json' o 'base64' (por defecto IOT_EMBEDDING_FORMAT)
+    """
+    fmt = fmt or iot_format()
+    if fmt == "base64":
+        source = embedding if embedding is not None else json_text
+        try:
+            if blob is None and source is not None:
+                blob = to_bytes(source)
+            if blob is not None:
+                return {"face_embedding_b64": base64.b64encode(bytes(blob)).decode("ascii")}
+        except ValueError:
+            pass  # embedding que no es de 128 floats: se envía tal cual en JSON
+        if source is None:
+            return {"face_embedding_b64": None}
+
+    if embedding is not None:
+        return {"face_embedding": embedding}
+    if json_text is None and blob is not None:
+        return {"face_embedding": to_list(blob)}
+    return {"face_embedding": json_text}
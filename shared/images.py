@@ -0,0 +1,82 @@
+# shared/images.py
+"""
+Utilidades de imágenes sin dependencias nativas: leer el tamaño de un JPEG
+sin decodificarlo y elegir escalas de decodificación/detección.
+"""
+import struct
+from typing import Optional, Tuple
+
+# Marcadores SOF (Start Of Frame) con el tamaño de la imagen; C4 (DHT),
+# C8 (JPG) y CC (DAC) comparten rango pero no son frames
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Factores que libjpeg puede aplicar al decodificar (cv2.IMREAD_REDUCED_*)
+REDUCTION_FACTORS = (8, 4, 2)
+
+
+def jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (ancho, alto) leídos del encabezado SOF del JPEG, o None si los bytes no
+    son un JPEG válido. Solo recorre los segmentos, no decodifica píxeles.
+    """
+    if len(data) < 4 or data[0:2] != b"\xff\xd8":
+        return None
+    i = 2
+    size = len(data)
+    while i + 4 <= size:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # relleno entre segmentos
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2  # marcadores sin longitud
+            continue
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        if marker in _SOF_MARKERS:
+            if i + 9 > size:
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return (width, height) if width and height else None
+        if marker == 0xDA:  # inicio de los datos comprimidos sin SOF antes
+            return None
+        i += 2 + length
+    return None
+
+
+def reduction_factor(width: int, height: int, min_side: int) -> int:
+    """
+    Mayor factor de REDUCTION_FACTORS que deja el lado mayor en al menos
+    `min_side` píxeles (1 si ninguno; 0 o menos = sin reducir).
+    """
+    if min_side <= 0:
+        return 1
+    longest = max(width, height)
+    for factor in REDUCTION_FACTORS:
+        if longest // factor >= min_side:
+            return factor
+    return 1
+
+
+def downscale_ratio(width: int, height: int, max_side: int) -> float:
+    """Escala (<= 1) para que el lado mayor no supere `max_side` (0 = sin límite)."""
+    longest = max(width, height)
+    if max_side <= 0 or longest <= max_side:
+        return 1.0
+    return max_side / longest
+
+
+def scale_box(box: Tuple[int, int, int, int], ratio: float,
+              width: int, height: int) -> Tuple[int, int, int, int]:
+    """
+    Lleva una caja (top, right, bottom, left) de face_recognition detectada
+    en una imagen escalada por `ratio` a la imagen de `width` x `height`.
+    """
+    top, right, bottom, left = box
+    return (
+        max(0, int(round(top / ratio))),
+        min(width, int(round(right / ratio))),
+        min(height, int(round(bottom / ratio))),
+        max(0, int(round(left / ratio))),
+    )
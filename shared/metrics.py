@@ -0,0 +1,52 @@
+# shared/metrics.py
+"""
+Métricas de CloudWatch con Embedded Metric Format (EMF): se escribe una
+línea JSON en stdout y CloudWatch Logs la convierte en métricas, sin
+llamadas a la API ni dependencias.
+"""
+import json
+import os
+import time
+from typing import Dict, Optional
+
+DEFAULT_NAMESPACE = "BiometricAccess"
+
+
+def emit_metrics(
+    metrics: Dict[str, float],
+    dimensions: Optional[Dict[str, str]] = None,
+    namespace: Optional[str] = None,
+    unit: str = "Milliseconds",
+    properties: Optional[Dict] = None,
+) -> str:
+    """
+    Publica `metrics` (nombre -> valor) en formato EMF.
+
+    Args:
+        metrics: Valores a publicar, todos con la misma unidad
+        dimensions: Dimensiones (por defecto, el nombre de la función)
+        namespace: Namespace de CloudWatch (METRICS_NAMESPACE o BiometricAccess)
+        unit: Unidad de CloudWatch
+        properties: Campos extra que quedan en el log pero no son métricas
+
+    Returns:
+        La línea emitida
+    """
+    if dimensions is None:
+        dimensions = {"FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")}
+    record = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": namespace or os.environ.get("METRICS_NAMESPACE", DEFAULT_NAMESPACE),
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": unit} for name in metrics],
+            }],
+        },
+        **dimensions,
+        **(properties or {}),
+        **metrics,
+    }
+    line = json.dumps(record)
+    print(line, flush=True)
+    return line
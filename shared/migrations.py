@@ -0,0 +1,153 @@
+# shared/migrations.py
+"""
+Migraciones de esquema idempotentes (se pueden correr en cada deploy).
+
+Uso (con DB_NAME, DB_USER, DB_PASSWORD o DB_PASS, DB_HOST definidos):
+
+    python -m shared.migrations
+"""
+import logging
+from typing import Callable, List, Tuple
+
+from peewee import PostgresqlDatabase
+
+from shared.models import (db, AccessLog, AccessLogCounter, AccessUser, Device,
+                           DeviceUserChange, OutboxMessage)
+
+logger = logging.getLogger(__name__)
+
+
+def create_access_log_counters() -> None:
+    """Crea access_log_counters y hace el backfill inicial si está vacía."""
+    from repositories.access_log_counter_repo import SCOPE_TOTAL, AccessLogCounterRepository
+
+    db.create_tables([AccessLogCounter], safe=True)
+    if not AccessLogCounter.select().where(AccessLogCounter.scope == SCOPE_TOTAL).exists():
+        total = AccessLogCounterRepository().rebuild()
+        logger.info(f"Contadores de access_logs inicializados: {total} logs")
+
+
+def _create_indexes(model) -> None:
+    """
+    Crea los índices declarados en `model` que aún no existan. En Postgres
+    se usa CREATE INDEX CONCURRENTLY para no bloquear las escrituras.
+    """
+    for index in model._meta.fields_to_index():
+        sql, params = model._schema._create_index(index, safe=True).query()
+        if isinstance(db, PostgresqlDatabase):
+            # CONCURRENTLY no admite transacción: la conexión debe estar en autocommit
+            sql = sql.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+        db.execute_sql(sql, params)
+
+
+def create_access_log_indexes() -> None:
+    """Crea los índices declarados en AccessLog sin bloquear la ingesta."""
+    _create_indexes(AccessLog)
+
+
+def create_config_version() -> None:
+    """Crea la marca de versión de configuraciones si no existe."""
+    from repositories.configuration_repo import CONFIG_VERSION, ConfigurationRepository
+
+    repo = ConfigurationRepository()
+    if repo.get_by_name(CONFIG_VERSION) is None:
+        repo.bump_version()
+
+
+def backfill_face_embedding_bin(batch_size: int = 500) -> None:
+    """
+    Agrega access_users.face_embedding_bin si falta y la completa desde el
+    JSON de face_embedding, en lotes recorridos por id.
+    """
+    from playhouse.migrate import SchemaMigrator, migrate
+    from shared.embeddings import to_bytes
+
+    table = AccessUser._meta.table_name
+    column = AccessUser.face_embedding_bin
+    if column.column_name not in {c.name for c in db.get_columns(table)}:
+        migrate(SchemaMigrator.from_database(db).add_column(table, column.column_name, column))
+
+    last_id = None
+    filled = 0
+    while True:
+        query = (AccessUser
+                 .select(AccessUser.id, AccessUser.face_embedding)
+                 .where(column.is_null() & AccessUser.face_embedding.is_null(False))
+                 .order_by(AccessUser.id)
+                 .limit(batch_size))
+        if last_id is not None:
+            query = query.where(AccessUser.id > last_id)
+        users = list(query)
+        if not users:
+            break
+        last_id = users[-1].id
+
+        batch = []
+        for user in users:
+            try:
+                user.face_embedding_bin = to_bytes(user.face_embedding)
+            except ValueError:
+                logger.warning(f"Embedding inválido en access_users.id={user.id}")
+                continue
+            batch.append(user)
+        if batch:
+            with db.atomic():
+                AccessUser.bulk_update(batch, fields=[column])
+            filled += len(batch)
+    logger.info(f"face_embedding_bin completado para {filled} usuarios")
+
+
+def create_outbox_messages() -> None:
+    """Crea outbox_messages (notificaciones IoT pendientes) y sus índices."""
+    db.create_tables([OutboxMessage], safe=True)
+
+
+def create_device_sync() -> None:
+    """
+    Agrega devices.sync_revision si falta y crea device_user_changes
+    (log de cambios para la sincronización delta de las Raspberry Pi) con
+    sus índices, también los agregados después de crear la tabla.
+    """
+    from playhouse.migrate import SchemaMigrator, migrate
+
+    table = Device._meta.table_name
+    column = Device.sync_revision
+    if column.column_name not in {c.name for c in db.get_columns(table)}:
+        migrate(SchemaMigrator.from_database(db).add_column(table, column.column_name, column))
+    db.create_tables([DeviceUserChange], safe=True)
+    _create_indexes(DeviceUserChange)
+
+
+# Pasos en orden de aplicación; cada uno debe ser idempotente
+MIGRATIONS: List[Tuple[str, Callable[[], None]]] = [
+    ("access_log_counters", create_access_log_counters),
+    ("access_log_indexes", create_access_log_indexes),
+    ("config_version", create_config_version),
+    ("face_embedding_bin", backfill_face_embedding_bin),
+    ("outbox_messages", create_outbox_messages),
+    ("device_sync", create_device_sync),
+]
+
+
+def apply_migrations() -> List[str]:
+    """
+    Aplica todas las migraciones en orden.
+
+    Returns:
+        Nombres de los pasos aplicados
+    """
+    applied = []
+    for name, step in MIGRATIONS:
+        logger.info(f"Aplicando migración: {name}")
+        step()
+        applied.append(name)
+    return applied
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    db.connect(reuse_if_open=True)
+    try:
+        apply_migrations()
+    finally:
+        db.close()
@@ -3,34 +3,73 @@
 import os
 from peewee import (
     Model,
-    PostgresqlDatabase,
+    AutoField,
+    BigAutoField,
     SqliteDatabase,
     CharField,
     IntegerField,
+    BigIntegerField,
+    BlobField,
+    CompositeKey,
     DateTimeField,
     UUIDField,
     ForeignKeyField,
-    TextField
+    TextField,
+    PostgresqlDatabase,
+    InterfaceError,
+    OperationalError,
 )
+from playhouse.shortcuts import ReconnectMixin
+from shared.db import Engine, get_engine
+
+
+class EngineDatabase(ReconnectMixin, PostgresqlDatabase):
+    """
+    Base de datos Peewee que toma y devuelve sus conexiones del Engine.
+
+    Como la conexión se reutiliza entre invocaciones (shared/connection.py),
+    Postgres o un proxy pueden cortarla mientras el contenedor está congelado.
+    Fuera de una transacción, la sentencia se reintenta una vez con una
+    conexión nueva; dentro de una transacción el error se propaga.
+    """
+    reconnect_errors = (
+        (OperationalError, "server closed the connection"),
+        (OperationalError, "terminating connection"),
+        (OperationalError, "could not receive data from server"),
+        (OperationalError, "ssl connection has been closed"),
+        (InterfaceError, "connection already closed"),
+    )
+
+    def __init__(self, database, engine: Engine = None, **kwargs):
+        self._engine = engine
+        super().__init__(database, **kwargs)
+
+    @property
+    def engine(self) -> Engine:
+        return self._engine or get_engine()
+
+    def _connect(self):
+        # Peewee maneja las transacciones con BEGIN explícito: autocommit como en PostgresqlDatabase
+        return self.engine.getconn(autocommit=True)
+
+    def _close(self, conn):
+        self.engine.putconn(conn)
+
+    def connection_expired(self) -> bool:
+        """True si la conexión abierta superó DB_CONN_MAX_AGE o quedó cerrada."""
+        return not self.is_closed() and self.engine.expired(self._state.conn)
+
 
 # 1) Si no hay DB_NAME definido o está vacío, usar ":memory:" por defecto.
 #    Esto hace que en tests, donde no definimos vars, use SQLite en memoria.
+# 2) En Postgres las conexiones salen del motor único de shared/db.py
+#    (pool en proceso o pooler externo, según DB_POOL_BACKEND).
 DB_NAME = os.environ.get("DB_NAME") or ":memory:"
-DB_USER = os.environ.get("DB_USER", "")
-DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
-DB_HOST = os.environ.get("DB_HOST", "")
-DB_PORT = int(os.environ.get("DB_PORT", 5432))
 
 if DB_NAME == ":memory:":
     db = SqliteDatabase(":memory:")
 else:
-    db = PostgresqlDatabase(
-        DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-    )
+    db = EngineDatabase(DB_NAME)
 
 
 class BaseModel(Model):
@@ -46,6 +85,8 @@ class AccessUser(BaseModel):
     rfid = CharField(null=True)
     image_ref = CharField(null=True)
     face_embedding = TextField(null=True)
+    # 128 float32 little-endian (512 bytes), ver shared/embeddings.py
+    face_embedding_bin = BlobField(null=True)
     created_at = DateTimeField(null=True)
 
     class Meta:
@@ -57,6 +98,8 @@ class Device(BaseModel):
     location = CharField(unique=True)
     status = CharField(null=True)
     last_sync = DateTimeField(null=True)
+    # Última revisión de device_user_changes confirmada por el dispositivo
+    sync_revision = BigIntegerField(default=0)
 
     class Meta:
         table_name = "devices"
@@ -83,6 +126,41 @@ class AccessLog(BaseModel):
 
     class Meta:
         table_name = "access_logs"
+        indexes = (
+            # Listados filtrados por dispositivo/usuario ordenados por fecha
+            (("device", "timestamp"), False),
+            (("access_user", "timestamp"), False),
+            # Paginación keyset sin filtros: ORDER BY timestamp DESC, id DESC
+            (("timestamp", "id"), False),
+        )
+
+
+# Índice parcial para el conteo de denegados por dispositivo en una ventana
+# (LogRepository.count_denies en lambda_alert_check)
+AccessLog.add_index(AccessLog.index(
+    AccessLog.device,
+    AccessLog.timestamp,
+    name="access_logs_denied_device_timestamp",
+    where=(AccessLog.event == "denied"),
+))
+
+
+class AccessLogCounter(BaseModel):
+    """
+    Conteos mantenidos de `access_logs`, actualizados en la misma transacción
+    que la ingesta:
+    - scope: 'device' o 'user' ('total' solo marca la inicialización; el
+      total es la suma de los contadores por dispositivo)
+    - key: id del dispositivo o del usuario ('' para el total)
+    - count: número de logs
+    """
+    scope = CharField(max_length=16)
+    key = CharField()
+    count = BigIntegerField(default=0)
+
+    class Meta:
+        table_name = "access_log_counters"
+        primary_key = CompositeKey("scope", "key")
 
 
 class WebUser(BaseModel):
@@ -132,6 +210,35 @@ class DeviceUserMapping(BaseModel):
             (("access_user", "device"), True),
         )
 
+class DeviceUserChange(BaseModel):
+    """
+    Log de cambios de acceso por dispositivo para la sincronización delta
+    de las Raspberry Pi:
+    - revision: creciente y global (las Raspberry piden "desde la revisión N")
+    - op: 'upsert' (el usuario debe estar en la galería) o 'delete'
+    - access_user_id / cedula: sin FK, el usuario puede haberse eliminado
+    """
+    revision = BigAutoField()
+    device = ForeignKeyField(
+        Device,
+        field="id_device",
+        backref="user_changes",
+        column_name="device_id"
+    )
+    access_user_id = IntegerField()
+    cedula = CharField()
+    op = CharField(max_length=8)
+    created_at = DateTimeField()
+
+    class Meta:
+        table_name = "device_user_changes"
+        indexes = (
+            (("device", "revision"), False),
+            # settled_revision (MIN(revision) de los cambios recientes) y la purga
+            (("created_at", "revision"), False),
+        )
+
+
 class Configuration(BaseModel):
     """Tabla de configuraciones del sistema"""
     id_config = IntegerField(primary_key=True)
@@ -142,3 +249,35 @@ class Configuration(BaseModel):
     
     class Meta:
         table_name = "configurations"
+
+
+class OutboxMessage(BaseModel):
+    """
+    Mensajes MQTT pendientes hacia las Raspberry Pi (outbox transaccional).
+
+    Se insertan en la misma transacción que el cambio en la BD; los publica
+    el propio request apenas confirma y el drainer reintenta los que no se
+    entregaron (services/outbox_service.py):
+    - topic: topic MQTT completo
+    - location: ubicación del dispositivo; se entrega en orden por ubicación
+    - payload: JSON ya serializado
+    - status: 'pending' o 'dead' (agotó los reintentos)
+    - attempts / available_at: intentos (se cuentan al tomar el mensaje) y
+      reserva o próximo reintento con backoff
+    """
+    id = AutoField()
+    topic = CharField()
+    location = CharField()
+    payload = TextField()
+    status = CharField(max_length=16, default="pending")
+    attempts = IntegerField(default=0)
+    available_at = DateTimeField()
+    created_at = DateTimeField()
+    last_error = TextField(null=True)
+
+    class Meta:
+        table_name = "outbox_messages"
+        indexes = (
+            (("status", "available_at", "id"), False),
+            (("location", "status", "id"), False),
+        )
@@ -0,0 +1,37 @@
+# tests/alert_check/conftest.py
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALERT_CHECK_DIR = os.path.join(ROOT, "lambda_alert_check")
+
+# Paquetes de lambda_alert_check que colisionan con los de la raíz
+PACKAGES = ("handlers", "infra", "repositories", "services")
+
+
+@pytest.fixture
+def alert_check():
+    """
+    Devuelve un `import_module` que resuelve handlers/, infra/, repositories/
+    y services/ dentro de lambda_alert_check (como en su zip de despliegue).
+    Los paquetes de la raíz se restauran al terminar el test.
+    """
+    saved = {name: module for name, module in sys.modules.items()
+             if name.split(".")[0] in PACKAGES}
+    for name in saved:
+        del sys.modules[name]
+    for package in PACKAGES:
+        module = types.ModuleType(package)
+        module.__path__ = [os.path.join(ALERT_CHECK_DIR, package)]
+        sys.modules[package] = module
+
+    try:
+        yield importlib.import_module
+    finally:
+        for name in [n for n in sys.modules if n.split(".")[0] in PACKAGES]:
+            del sys.modules[name]
+        sys.modules.update(saved)
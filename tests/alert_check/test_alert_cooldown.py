@@ -0,0 +1,135 @@
+# tests/alert_check/test_alert_cooldown.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+T0 = datetime(2025, 6, 3, 18, 0, 0, tzinfo=timezone.utc)
+
+
+class BurstRepository:
+    """Devuelve como conteo el número de denies registrados hasta el momento"""
+
+    def __init__(self, threshold=5, window_seconds=60):
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.denies = []
+
+    def get_device_id(self, device_name):
+        return 1
+
+    def get_config(self, device_id):
+        return self.threshold, self.window_seconds
+
+    def count_denies(self, device_id, start, end):
+        return sum(1 for ts in self.denies if start <= ts <= end)
+
+
+class FakeSns:
+    def __init__(self):
+        self.published = []
+
+    def publish_alert(self, payload, subject):
+        self.published.append((payload, subject))
+
+
+@pytest.fixture
+def alert_service(alert_check):
+    return alert_check("services.alert_service")
+
+
+def run_burst(service, repo, offsets):
+    for offset in offsets:
+        ts = T0 + timedelta(seconds=offset)
+        repo.denies.append(ts)
+        service.process_denied_event("Puerta A", ts)
+
+
+def test_without_state_publishes_every_deny(alert_service):
+    """Test sin AlertState se mantiene una publicación por deny sobre el umbral"""
+    repo, sns = BurstRepository(), FakeSns()
+    service = alert_service.AlertService(repo, sns)
+
+    run_burst(service, repo, [i * 0.1 for i in range(20)])
+
+    assert len(sns.published) == 16
+
+
+def test_burst_inside_cooldown_publishes_once(alert_service):
+    """Test una ráfaga de 200 denies dentro del cooldown genera una sola alerta"""
+    repo, sns = BurstRepository(threshold=5, window_seconds=600), FakeSns()
+    state = alert_service.AlertState(cooldown_seconds=300, escalation_factor=1000)
+    service = alert_service.AlertService(repo, sns, alert_state=state)
+
+    run_burst(service, repo, [i * 0.5 for i in range(200)])
+
+    assert len(sns.published) == 1
+    payload, _ = sns.published[0]
+    assert payload["alert_type"] == "ACCESS_DENIED_THRESHOLD_EXCEEDED"
+    assert payload["alert_level"] == 1
+
+
+def test_summary_after_cooldown(alert_service):
+    """Test pasado el cooldown se envía un resumen con los denies suprimidos"""
+    repo, sns = BurstRepository(threshold=5, window_seconds=600), FakeSns()
+    state = alert_service.AlertState(cooldown_seconds=60, escalation_factor=1000)
+    service = alert_service.AlertService(repo, sns, alert_state=state)
+
+    run_burst(service, repo, range(0, 70))
+
+    assert len(sns.published) == 2
+    payload, subject = sns.published[1]
+    assert payload["alert_type"] == "ACCESS_DENIED_THRESHOLD_ONGOING"
+    assert payload["suppressed_count"] == 59  # denies 6..64 (t=5..63)
+    assert "59 denies más" in subject
+
+
+def test_escalation_publishes_immediately(alert_service):
+    """Test al doblar el umbral se sube de nivel sin esperar el cooldown"""
+    repo, sns = BurstRepository(threshold=5, window_seconds=600), FakeSns()
+    state = alert_service.AlertState(cooldown_seconds=300, escalation_factor=2, max_level=3)
+    service = alert_service.AlertService(repo, sns, alert_state=state)
+
+    run_burst(service, repo, range(40))
+
+    levels = [payload["alert_level"] for payload, _ in sns.published]
+    counts = [payload["denied_count"] for payload, _ in sns.published]
+    assert levels == [1, 2, 3]
+    assert counts == [5, 10, 20]
+
+
+def test_incident_closes_when_below_threshold(alert_service):
+    """Test un nuevo cruce tras cerrar el incidente vuelve a alertar"""
+    state = alert_service.AlertState(cooldown_seconds=60)
+
+    assert state.decide(1, 5, 5, T0)[0] == alert_service.ALERT
+    assert state.decide(1, 2, 5, T0 + timedelta(seconds=10)) is None
+    assert state.decide(1, 6, 5, T0 + timedelta(seconds=20)) is None  # mismo incidente
+    assert state.decide(1, 1, 5, T0 + timedelta(seconds=90)) is None  # cierra
+    assert state.decide(1, 5, 5, T0 + timedelta(seconds=100)) == (alert_service.ALERT, 1, 0)
+
+
+def test_devices_are_independent(alert_service):
+    """Test el cooldown es por dispositivo"""
+    state = alert_service.AlertState(cooldown_seconds=60)
+
+    assert state.decide(1, 5, 5, T0) is not None
+    assert state.decide(2, 5, 5, T0) is not None
+    assert state.decide(1, 6, 5, T0) is None
+
+
+def test_batch_suppresses_every_grouped_deny(alert_service):
+    """Test un lote suprimido suma todos sus denies, no una decisión"""
+    repo, sns = BurstRepository(threshold=5, window_seconds=600), FakeSns()
+    state = alert_service.AlertState(cooldown_seconds=60, escalation_factor=1000)
+    service = alert_service.AlertService(repo, sns, alert_state=state)
+
+    run_burst(service, repo, range(0, 5))  # alerta inicial
+    batch = [T0 + timedelta(seconds=10 + i * 0.1) for i in range(10)]
+    repo.denies.extend(batch)
+    service.process_denied_batch("Puerta A", batch)
+    run_burst(service, repo, [70])  # resumen
+
+    assert len(sns.published) == 2
+    payload, subject = sns.published[1]
+    assert payload["suppressed_count"] == 10
+    assert "10 denies más" in subject
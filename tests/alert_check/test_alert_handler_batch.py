@@ -0,0 +1,163 @@
+# tests/alert_check/test_alert_handler_batch.py
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+T0 = datetime(2025, 6, 3, 18, 0, 0, tzinfo=timezone.utc)
+DEVICES = {"Puerta A": 1, "Puerta B": 2, "Puerta rota": 3}
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeEngine:
+    def __init__(self):
+        self.connections = 0
+        self.conn = FakeConnection()
+
+    @contextmanager
+    def connection(self):
+        self.connections += 1
+        yield self.conn
+
+
+class FakeLogRepository:
+    """Todos los denies del lote ya están en access_logs"""
+
+    denies = {}
+    queries = 0
+
+    def __init__(self, conn, config_cache=None):
+        pass
+
+    def get_device_id(self, device_name):
+        FakeLogRepository.queries += 1
+        if device_name == "Puerta rota":
+            raise RuntimeError("fallo de la consulta")
+        return DEVICES.get(device_name)
+
+    def get_config(self, device_id):
+        FakeLogRepository.queries += 1
+        return 5, 60
+
+    def count_denies(self, device_id, start, end):
+        FakeLogRepository.queries += 1
+        return sum(1 for ts in self.denies.get(device_id, []) if start <= ts <= end)
+
+
+class FakeSns:
+    def __init__(self):
+        self.published = []
+
+    def publish_alert(self, payload, subject):
+        self.published.append(payload)
+
+
+def record(message_id, device_name, offset, event="denied"):
+    body = {"detail": {"event": event, "device_name": device_name,
+                       "timestamp": (T0 + timedelta(seconds=offset)).isoformat()}}
+    return {"messageId": message_id, "body": json.dumps(body)}
+
+
+@pytest.fixture
+def handler(alert_check, monkeypatch):
+    module = alert_check("handlers.alert_handler")
+    engine, sns = FakeEngine(), FakeSns()
+    FakeLogRepository.denies = {}
+    FakeLogRepository.queries = 0
+    monkeypatch.setattr(module, "get_engine", lambda: engine)
+    monkeypatch.setattr(module, "_get_sns_client", lambda: sns)
+    monkeypatch.setattr(module, "LogRepository", FakeLogRepository)
+    # Sin estado entre tests: conteo por COUNT(*) y sin cooldown
+    monkeypatch.setattr(module, "_deny_counter", None)
+    monkeypatch.setattr(module, "_alert_state", None)
+    module.engine, module.sns = engine, sns
+    return module
+
+
+def test_storm_batch_one_alert_per_device(handler):
+    """Test una tormenta de denies en un lote genera una alerta por dispositivo"""
+    records = []
+    for i in range(100):
+        device = "Puerta A" if i % 2 else "Puerta B"
+        records.append(record(f"m{i}", device, i * 0.1))
+        FakeLogRepository.denies.setdefault(DEVICES[device], []).append(
+            T0 + timedelta(seconds=i * 0.1))
+
+    result = handler.lambda_handler({"Records": records}, None)
+
+    assert sorted(result["alerted"]) == ["Puerta A", "Puerta B"]
+    assert result["batchItemFailures"] == []
+    assert len(handler.sns.published) == 2
+    assert sorted(p["denied_count"] for p in handler.sns.published) == [50, 50]
+    # Una conexión y tres consultas por dispositivo para 100 eventos
+    assert handler.engine.connections == 1
+    assert FakeLogRepository.queries == 6
+
+
+def test_batch_ignores_non_denied_and_malformed(handler):
+    """Test los eventos aceptados o ilegibles no se evalúan"""
+    records = [
+        record("m1", "Puerta A", 0, event="accepted"),
+        {"messageId": "m2", "body": "no es json"},
+        {"messageId": "m3", "body": "[1, 2]"},
+        {"messageId": "m4", "body": json.dumps({"detail": "denied"})},
+    ]
+
+    result = handler.lambda_handler({"Records": records}, None)
+
+    assert result == {"alerted": [], "batchItemFailures": []}
+    assert handler.engine.connections == 0
+
+
+def test_batch_reports_failed_device(handler):
+    """Test si falla un dispositivo solo sus mensajes se reintentan"""
+    FakeLogRepository.denies[1] = [T0 + timedelta(seconds=i) for i in range(5)]
+    records = [record(f"a{i}", "Puerta A", i) for i in range(5)]
+    records += [record("r1", "Puerta rota", 1), record("r2", "Puerta rota", 2)]
+
+    result = handler.lambda_handler({"Records": records}, None)
+
+    assert result["alerted"] == ["Puerta A"]
+    assert result["batchItemFailures"] == [{"itemIdentifier": "r1"},
+                                           {"itemIdentifier": "r2"}]
+    assert handler.engine.conn.rollbacks == 1
+
+
+def test_single_event_still_supported(handler):
+    """Test el evento directo de EventBridge sigue funcionando"""
+    FakeLogRepository.denies[1] = [T0]
+    event = json.loads(record("m1", "Puerta A", 0)["body"])
+
+    assert handler.lambda_handler(event, None) == {"alerted": False}
+
+
+def test_failed_device_is_not_counted_twice_on_retry(handler, alert_check, monkeypatch):
+    """Test si la publicación falla, el reintento de SQS no duplica los denies"""
+    DenyCounter = alert_check("services.deny_window").DenyCounter
+    counter = DenyCounter(resync_seconds=3600)
+    monkeypatch.setattr(handler, "_deny_counter", counter)
+    monkeypatch.setattr(FakeLogRepository, "get_deny_buckets", lambda self, *args: [],
+                        raising=False)
+    records = [record(f"a{i}", "Puerta A", 10 + i) for i in range(3)]
+
+    def failing_publish(payload, subject):
+        raise RuntimeError("SNS caído")
+
+    counter.record_and_count(FakeLogRepository(None), 1, T0, window_seconds=60)  # hidratado
+    monkeypatch.setattr(handler.sns, "publish_alert", failing_publish)
+    monkeypatch.setattr(FakeLogRepository, "get_config", lambda self, device_id: (3, 60))
+    first = handler.lambda_handler({"Records": records}, None)
+    assert len(first["batchItemFailures"]) == 3
+
+    monkeypatch.setattr(handler.sns, "publish_alert",
+                        lambda payload, subject: handler.sns.published.append(payload))
+    handler.lambda_handler({"Records": records}, None)
+    assert handler.sns.published[0]["denied_count"] == 3
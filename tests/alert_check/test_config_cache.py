@@ -0,0 +1,133 @@
+# tests/alert_check/test_config_cache.py
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self._conn.queries.append(sql)
+        if "config_version" in sql:
+            version = self._conn.version
+            self._row = (version,) if version is not None else None
+        else:
+            self._row = self._conn.configs.get(params[0])
+
+    def fetchone(self):
+        return self._row
+
+
+class FakeConnection:
+    """Conexión psycopg2 mínima: configuración resuelta y versión"""
+
+    def __init__(self, configs, version="1"):
+        self.configs = configs
+        self.version = version
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def config_queries(self):
+        return [q for q in self.queries if "WITH cfg" in q]
+
+
+@pytest.fixture
+def log_repository(alert_check):
+    return alert_check("repositories.log_repository")
+
+
+def test_without_cache_queries_every_time(log_repository):
+    """Test sin caché se resuelve la configuración en cada evento"""
+    conn = FakeConnection({1: (5, 60)})
+    repo = log_repository.LogRepository(conn)
+
+    for _ in range(3):
+        assert repo.get_config(1) == (5, 60)
+
+    assert len(conn.config_queries()) == 3
+
+
+def test_cache_serves_within_ttl(log_repository):
+    """Test dentro del TTL no se consulta la BD"""
+    conn = FakeConnection({1: (5, 60), 2: (10, 120)})
+    cache = log_repository.ConfigCache(ttl_seconds=60, clock=FakeClock())
+    repo = log_repository.LogRepository(conn, cache)
+
+    for _ in range(5):
+        assert repo.get_config(1) == (5, 60)
+        assert repo.get_config(2) == (10, 120)
+
+    assert len(conn.config_queries()) == 2
+    assert len(conn.queries) == 3  # + una lectura de versión
+
+
+def test_cache_survives_across_connections(log_repository):
+    """Test la caché vive entre invocaciones warm (un repositorio por invocación)"""
+    cache = log_repository.ConfigCache(clock=FakeClock())
+
+    first = FakeConnection({1: (5, 60)})
+    log_repository.LogRepository(first, cache).get_config(1)
+    second = FakeConnection({1: (5, 60)})
+    log_repository.LogRepository(second, cache).get_config(1)
+
+    assert second.queries == []
+
+
+def test_unchanged_version_keeps_entries(log_repository):
+    """Test al vencer el TTL con la misma versión solo se lee la versión"""
+    clock = FakeClock()
+    conn = FakeConnection({1: (5, 60)})
+    repo = log_repository.LogRepository(conn, log_repository.ConfigCache(60, clock=clock))
+    repo.get_config(1)
+
+    clock.now = 61
+    assert repo.get_config(1) == (5, 60)
+
+    assert len(conn.config_queries()) == 1
+    assert len(conn.queries) == 3
+
+
+def test_bumped_version_refreshes(log_repository):
+    """Test una edición (nueva versión) se ve al vencer el TTL"""
+    clock = FakeClock()
+    conn = FakeConnection({1: (5, 60)})
+    repo = log_repository.LogRepository(conn, log_repository.ConfigCache(60, clock=clock))
+    repo.get_config(1)
+
+    conn.configs[1] = (3, 30)
+    conn.version = "2"
+    clock.now = 30
+    assert repo.get_config(1) == (5, 60)  # todavía dentro del TTL
+
+    clock.now = 61
+    assert repo.get_config(1) == (3, 30)
+
+
+def test_missing_version_behaves_as_plain_ttl(log_repository):
+    """Test sin fila de versión las entradas se descartan en cada vencimiento"""
+    clock = FakeClock()
+    conn = FakeConnection({1: (5, 60)}, version=None)
+    repo = log_repository.LogRepository(conn, log_repository.ConfigCache(60, clock=clock))
+    repo.get_config(1)
+
+    clock.now = 61
+    repo.get_config(1)
+
+    assert len(conn.config_queries()) == 2
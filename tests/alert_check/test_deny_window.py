@@ -0,0 +1,181 @@
+# tests/alert_check/test_deny_window.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+T0 = datetime(2025, 6, 3, 18, 0, 0, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLogRepository:
+    """LogRepository en memoria: denies ya insertados por dispositivo"""
+
+    def __init__(self, denies=None):
+        self.denies = denies or {}
+        self.bucket_calls = 0
+        self.count_calls = 0
+
+    def insert(self, device_id, ts):
+        self.denies.setdefault(device_id, []).append(ts)
+
+    def get_device_id(self, device_name):
+        return 1
+
+    def get_config(self, device_id):
+        return 5, 60
+
+    def count_denies(self, device_id, start, end):
+        self.count_calls += 1
+        return sum(1 for ts in self.denies.get(device_id, []) if start <= ts <= end)
+
+    def get_deny_buckets(self, device_id, start, end, bucket_seconds):
+        self.bucket_calls += 1
+        buckets = {}
+        for ts in self.denies.get(device_id, []):
+            if start <= ts <= end:
+                bucket = int(ts.timestamp() // bucket_seconds)
+                buckets[bucket] = buckets.get(bucket, 0) + 1
+        return sorted(buckets.items())
+
+
+class FakeSns:
+    def __init__(self):
+        self.published = []
+
+    def publish_alert(self, payload, subject):
+        self.published.append((payload, subject))
+
+
+@pytest.fixture
+def deny_window(alert_check):
+    return alert_check("services.deny_window")
+
+
+def test_window_evicts_old_buckets(deny_window):
+    """Test la ventana solo cuenta denies dentro de window_seconds"""
+    window = deny_window.DenyWindow(window_seconds=10)
+
+    for offset in (0, 1, 1, 5):
+        window.add(T0 + timedelta(seconds=offset))
+
+    assert window.count(T0 + timedelta(seconds=5)) == 4
+    assert window.count(T0 + timedelta(seconds=10)) == 3
+    assert window.count(T0 + timedelta(seconds=11)) == 1
+    assert window.count(T0 + timedelta(seconds=30)) == 0
+
+
+def test_window_out_of_order_event(deny_window):
+    """Test un evento atrasado se suma a su bucket"""
+    window = deny_window.DenyWindow(window_seconds=10)
+    window.add(T0 + timedelta(seconds=5))
+    window.add(T0 + timedelta(seconds=2))
+    window.add(T0)
+
+    assert window.count(T0 + timedelta(seconds=11)) == 2
+
+
+def test_counter_hydrates_once_then_counts_in_memory(deny_window):
+    """Test cold start rehidrata desde access_logs y luego no consulta la BD"""
+    repo = FakeLogRepository()
+    counter = deny_window.DenyCounter(resync_seconds=60, clock=FakeClock())
+
+    # Denies previos al cold start
+    for offset in (0, 10, 20):
+        repo.insert(1, T0 + timedelta(seconds=offset))
+
+    counts = []
+    for offset in (30, 31, 32):
+        ts = T0 + timedelta(seconds=offset)
+        repo.insert(1, ts)  # la ingesta ya lo insertó
+        counts.append(counter.record_and_count(repo, 1, ts, window_seconds=60))
+
+    assert counts == [4, 5, 6]
+    assert repo.bucket_calls == 1
+
+
+def test_counter_resyncs_and_matches_count_denies(deny_window):
+    """Test tras resync_seconds vuelve a cargar y coincide con COUNT(*)"""
+    repo = FakeLogRepository()
+    clock = FakeClock()
+    counter = deny_window.DenyCounter(resync_seconds=60, clock=clock)
+
+    for offset in range(0, 200, 7):
+        ts = T0 + timedelta(seconds=offset)
+        repo.insert(1, ts)
+        clock.now = offset
+        count = counter.record_and_count(repo, 1, ts, window_seconds=30)
+        assert count == repo.count_denies(1, ts - timedelta(seconds=30), ts)
+
+    assert repo.bucket_calls == 4  # cold start + un resync por minuto
+
+
+def test_counter_rehydrates_when_window_changes(deny_window):
+    """Test si cambia window_seconds la ventana se reconstruye"""
+    repo = FakeLogRepository({1: [T0]})
+    counter = deny_window.DenyCounter(clock=FakeClock())
+
+    counter.record_and_count(repo, 1, T0, window_seconds=60)
+    counter.record_and_count(repo, 1, T0, window_seconds=120)
+
+    assert repo.bucket_calls == 2
+
+
+def test_alert_service_uses_counter(alert_check, deny_window):
+    """Test AlertService con DenyCounter no ejecuta COUNT(*) por evento"""
+    AlertService = alert_check("services.alert_service").AlertService
+    repo = FakeLogRepository()
+    sns = FakeSns()
+    service = AlertService(repo, sns, deny_window.DenyCounter(clock=FakeClock()))
+
+    results = []
+    for offset in range(6):
+        ts = T0 + timedelta(seconds=offset)
+        repo.insert(1, ts)
+        results.append(service.process_denied_event("Puerta A", ts))
+
+    assert results == [False, False, False, False, True, True]
+    assert repo.count_calls == 0
+    assert sns.published[0][0]["denied_count"] == 5
+
+
+def test_counter_records_batch(deny_window):
+    """Test un lote suma todos sus denies y cuenta hasta el más reciente"""
+    repo = FakeLogRepository()
+    counter = deny_window.DenyCounter(clock=FakeClock())
+    repo.insert(1, T0)
+    counter.record_and_count(repo, 1, T0, window_seconds=60)
+
+    batch = [T0 + timedelta(seconds=s) for s in (3, 1, 2)]
+    assert counter.record_many_and_count(repo, 1, batch, window_seconds=60) == 4
+    assert repo.bucket_calls == 1
+
+
+def test_window_covers_exactly_window_seconds(deny_window):
+    """Test una ventana de 60 s cuenta 60 buckets de 1 s, no 61"""
+    window = deny_window.DenyWindow(window_seconds=60)
+    for offset in range(61):
+        window.add(T0 + timedelta(seconds=offset))
+
+    assert window.count(T0 + timedelta(seconds=60)) == 60
+
+
+def test_counter_skips_events_already_hydrated(deny_window):
+    """Test un deny cargado desde la BD no se vuelve a sumar cuando llega su evento"""
+    repo = FakeLogRepository()
+    counter = deny_window.DenyCounter(clock=FakeClock())
+    early, late = T0, T0 + timedelta(seconds=5)
+    repo.insert(1, early)
+    repo.insert(1, late)
+
+    # El evento de `late` llega primero y la carga ya incluye ambos denies
+    assert counter.record_and_count(repo, 1, late, window_seconds=60) == 2
+    # El evento de `early` llega después (EventBridge no garantiza orden)
+    assert counter.record_and_count(repo, 1, early, window_seconds=60) == 2
+    assert counter.record_and_count(repo, 1, late, window_seconds=60) == 2
@@ -0,0 +1,43 @@
+# tests/alert_check/test_packaging.py
+import ast
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALERT_CHECK_DIR = os.path.join(ROOT, "lambda_alert_check")
+
+
+def _imported_modules(path):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.add(node.module)
+    return modules
+
+
+def test_shared_db_only_needs_psycopg2():
+    # build.sh copia solo shared/db.py al zip: no puede depender del resto de shared/
+    for module in _imported_modules(os.path.join(ROOT, "shared", "db.py")):
+        top = module.split(".")[0]
+        assert top in sys.stdlib_module_names or top == "psycopg2", module
+
+
+def test_alert_check_only_imports_shared_db():
+    for package in ("handlers", "infra", "repositories", "services"):
+        package_dir = os.path.join(ALERT_CHECK_DIR, package)
+        for name in os.listdir(package_dir):
+            if not name.endswith(".py"):
+                continue
+            for module in _imported_modules(os.path.join(package_dir, name)):
+                if module.split(".")[0] == "shared":
+                    assert module == "shared.db", f"{package}/{name}: {module}"
+
+
+def test_build_script_packages_shared_db():
+    with open(os.path.join(ALERT_CHECK_DIR, "build.sh"), encoding="utf-8") as f:
+        script = f.read()
+    assert '"$ROOT/shared/db.py"' in script
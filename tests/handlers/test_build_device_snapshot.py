@@ -0,0 +1,47 @@
+# tests/handlers/test_build_device_snapshot.py
+import handlers.build_device_snapshot as handler_module
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.fixture
+def mock_db():
+    """Mock para la conexión de base de datos"""
+    with patch.object(handler_module.db, 'is_closed', return_value=False):
+        with patch.object(handler_module.db, 'connect'):
+            with patch.object(handler_module.db, 'close'):
+                yield
+
+
+@pytest.fixture
+def mock_service(monkeypatch):
+    service = MagicMock()
+    service.build.side_effect = lambda location, notify: {"device": location}
+    monkeypatch.setattr(handler_module, '_service', service)
+    return service
+
+
+def test_single_location(mock_db, mock_service):
+    """Test snapshot de una ubicación con aviso"""
+    result = handler_module.lambda_handler({"location": "FCEE"}, None)
+
+    assert result == {"snapshots": [{"device": "FCEE"}], "failed": {}}
+    mock_service.build.assert_called_once_with("FCEE", notify=True)
+    mock_service.sync.prune_changes.assert_not_called()
+
+
+def test_all_devices_without_notify(mock_db, mock_service, monkeypatch):
+    """Test el refresco programado recorre todos los dispositivos sin avisar"""
+    repo = MagicMock()
+    repo.get_all.return_value = [MagicMock(location="FCEE"), MagicMock(location="lab1")]
+    monkeypatch.setattr(handler_module, '_device_repo', repo)
+    mock_service.build.side_effect = [{"device": "FCEE"}, LookupError("no existe")]
+
+    result = handler_module.lambda_handler({"notify": False}, None)
+
+    assert result["snapshots"] == [{"device": "FCEE"}]
+    assert "lab1" in result["failed"]
+    mock_service.build.assert_any_call("lab1", notify=False)
+    # La corrida completa purga el log de cambios
+    mock_service.sync.prune_changes.assert_called_once_with()
+    assert result["pruned"] == mock_service.sync.prune_changes.return_value
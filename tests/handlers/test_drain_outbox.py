@@ -0,0 +1,38 @@
+# tests/handlers/test_drain_outbox.py
+import handlers.drain_outbox as handler_module
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.fixture
+def mock_db():
+    """Mock para la conexión de base de datos"""
+    with patch.object(handler_module.db, 'is_closed', return_value=False):
+        with patch.object(handler_module.db, 'connect'):
+            with patch.object(handler_module.db, 'close'):
+                yield
+
+
+def test_drain_uses_remaining_time(mock_db, monkeypatch):
+    """Test el drainer corta según el tiempo restante de la invocación"""
+    drainer = MagicMock()
+    drainer.drain.return_value = {"claimed": 1, "published": 1, "retried": 0, "dead": 0}
+    monkeypatch.setattr(handler_module, '_drainer', drainer)
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 42000
+
+    result = handler_module.lambda_handler({}, context)
+
+    assert result["published"] == 1
+    time_left = drainer.drain.call_args[1]["time_left"]
+    assert time_left() == 42
+
+
+def test_drain_without_context(mock_db, monkeypatch):
+    """Test invocación local sin contexto de Lambda"""
+    drainer = MagicMock()
+    monkeypatch.setattr(handler_module, '_drainer', drainer)
+
+    handler_module.lambda_handler({}, None)
+
+    drainer.drain.assert_called_once_with(time_left=None)
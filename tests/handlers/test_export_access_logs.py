@@ -0,0 +1,58 @@
+# tests/handlers/test_export_access_logs.py
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+
+import handlers.export_access_logs as handler_module
+
+
+@pytest.fixture
+def mock_db():
+    """Mock para la conexión de base de datos"""
+    with patch.object(handler_module.db, 'is_closed', return_value=False):
+        with patch.object(handler_module.db, 'connect'):
+            with patch.object(handler_module.db, 'close'):
+                yield
+
+
+def test_export_success(mock_db, monkeypatch):
+    """Test exportación devuelve la URL firmada"""
+    mock_service = MagicMock()
+    mock_service.export_logs.return_value = {
+        "key": "exports/access_logs/x.csv", "url": "https://signed",
+        "expires_in": 3600, "format": "csv", "rows": 10,
+    }
+    monkeypatch.setattr(handler_module, '_service', mock_service)
+
+    event = {'queryStringParameters': {'format': 'csv', 'device_id': '1', 'from': '2024-01-01'}}
+    response = handler_module.lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['url'] == "https://signed"
+    mock_service.export_logs.assert_called_once_with(
+        user_id=None, device_id='1', event=None,
+        start='2024-01-01', end=None, fmt='csv'
+    )
+
+
+def test_export_default_format(mock_db, monkeypatch):
+    """Test sin query params exporta NDJSON"""
+    mock_service = MagicMock()
+    mock_service.export_logs.return_value = {"key": "k", "url": "u", "rows": 0}
+    monkeypatch.setattr(handler_module, '_service', mock_service)
+
+    response = handler_module.lambda_handler({'queryStringParameters': None}, None)
+
+    assert response['statusCode'] == 200
+    assert mock_service.export_logs.call_args.kwargs['fmt'] == 'ndjson'
+
+
+def test_export_invalid_params(mock_db, monkeypatch):
+    """Test parámetros inválidos devuelven 400"""
+    mock_service = MagicMock()
+    mock_service.export_logs.side_effect = ValueError("format debe ser uno de: ndjson, csv")
+    monkeypatch.setattr(handler_module, '_service', mock_service)
+
+    response = handler_module.lambda_handler({'queryStringParameters': {'format': 'xlsx'}}, None)
+
+    assert response['statusCode'] == 400
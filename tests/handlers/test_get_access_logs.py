@@ -141,4 +141,70 @@ def test_get_logs_null_query_params(mock_db, monkeypatch):
     response = handler_module.lambda_handler(event, None)
     
     assert response['statusCode'] == 200
-    mock_service.get_logs.assert_called_once_with(user_id=None, device_id=None)
\ No newline at end of file
+    mock_service.get_logs.assert_called_once_with(user_id=None, device_id=None)
+
+def test_get_logs_paginated(mock_db, monkeypatch):
+    """Test GET /access_logs con cursor y rango de fechas"""
+    mock_service = MagicMock()
+    mock_service.get_logs_page.return_value = {"items": [], "next_cursor": "abc"}
+    monkeypatch.setattr(handler_module, '_service', mock_service)
+    
+    event = make_event({
+        'device_id': '1',
+        'event': 'denied',
+        'from': '2024-01-01T00:00:00Z',
+        'to': '2024-02-01T00:00:00Z',
+        'limit': '20',
+        'cursor': 'xyz'
+    })
+    response = handler_module.lambda_handler(event, None)
+    
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body == {"items": [], "next_cursor": "abc"}
+    
+    mock_service.get_logs.assert_not_called()
+    mock_service.get_logs_page.assert_called_once_with(
+        user_id=None,
+        device_id='1',
+        event='denied',
+        start='2024-01-01T00:00:00Z',
+        end='2024-02-01T00:00:00Z',
+        cursor='xyz',
+        limit='20'
+    )
+
+
+def test_get_logs_paginated_invalid_cursor(mock_db, monkeypatch):
+    """Test cursor inválido devuelve 400"""
+    mock_service = MagicMock()
+    mock_service.get_logs_page.side_effect = ValueError("cursor inválido")
+    monkeypatch.setattr(handler_module, '_service', mock_service)
+    
+    response = handler_module.lambda_handler(make_event({'cursor': '???'}), None)
+    
+    assert response['statusCode'] == 400
+    assert "cursor inválido" in json.loads(response['body'])['error']
+
+
+def test_get_logs_paginated_with_count(mock_db, monkeypatch):
+    """Test count=cached agrega total y total_mode a la página"""
+    mock_service = MagicMock()
+    mock_service.get_logs_page.return_value = {"items": [], "next_cursor": None}
+    mock_service.count_logs.return_value = (1234, "cached")
+    monkeypatch.setattr(handler_module, '_service', mock_service)
+    
+    response = handler_module.lambda_handler(make_event({'device_id': '1', 'count': 'cached'}), None)
+    
+    assert response['statusCode'] == 200
+    body = json.loads(response['body'])
+    assert body["total"] == 1234
+    assert body["total_mode"] == "cached"
+    mock_service.count_logs.assert_called_once_with(
+        user_id=None,
+        device_id='1',
+        event=None,
+        start=None,
+        end=None,
+        mode='cached'
+    )
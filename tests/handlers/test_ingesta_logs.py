@@ -21,7 +21,7 @@ def dummy_event():
 def test_handler_ok(dummy_event):
     # Parcheamos _service.ingest → no error
     # También parchamos db.is_closed para que devuelva False (no conecte)
-    with patch.object(h._service, "ingest", return_value=None) as mock_ingest, \
+    with patch.object(h._service, "ingest", return_value="inserted") as mock_ingest, \
             patch.object(h.db, "is_closed", return_value=False), \
             patch.object(h, "eb") as mock_eb:
         mock_eb.put_events.return_value = {"FailedEntryCount": 0}
@@ -57,3 +57,116 @@ def test_handler_unexpected_error(dummy_event):
         assert resp["statusCode"] == 500
         assert "errorDB" in body["error"]
         mock_ingest.assert_called_once_with(dummy_event)
+
+
+def test_handler_sqs_batch_chunks_eventbridge(dummy_event):
+    records = []
+    for i in range(12):
+        payload = dict(dummy_event, uuid=f"evt-{i}")
+        records.append({"messageId": f"m-{i}", "body": json.dumps(payload)})
+    results = [{"uuid": f"evt-{i}", "status": "inserted", "error": None}
+               for i in range(12)]
+    results[3] = {"uuid": "evt-3", "status": "error", "error": "duplicado"}
+
+    with patch.object(h._service, "ingest_batch", return_value=results) as mock_batch, \
+            patch.object(h.db, "is_closed", return_value=False), \
+            patch.object(h, "eb") as mock_eb:
+        mock_eb.put_events.return_value = {"FailedEntryCount": 0, "Entries": []}
+
+        resp = h.handler({"Records": records}, None)
+        body = json.loads(resp["body"])
+
+        mock_batch.assert_called_once()
+        assert len(mock_batch.call_args[0][0]) == 12
+        # 11 insertados → bloques de 10 + 1
+        assert mock_eb.put_events.call_count == 2
+        assert len(mock_eb.put_events.call_args_list[0][1]["Entries"]) == 10
+        assert resp["batchItemFailures"] == []
+        assert body["results"][3]["status"] == "error"
+        assert body["results"][0]["messageId"] == "m-0"
+
+
+def test_handler_batch_db_error_fails_all_messages(dummy_event):
+    records = [{"messageId": "m-1", "body": json.dumps(dummy_event)}]
+
+    with patch.object(h._service, "ingest_batch", side_effect=Exception("db caída")), \
+            patch.object(h.db, "is_closed", return_value=False), \
+            patch.object(h, "eb") as mock_eb:
+        resp = h.handler({"Records": records}, None)
+
+        assert resp["batchItemFailures"] == [{"itemIdentifier": "m-1"}]
+        mock_eb.put_events.assert_not_called()
+
+
+def test_handler_duplicate_is_republished(dummy_event):
+    # Reentrega (MQTT QoS 1 o reintento): la BD no cambia, pero el evento se
+    # vuelve a publicar por si el intento anterior no llegó a EventBridge
+    with patch.object(h._service, "ingest", return_value="duplicate"), \
+            patch.object(h.db, "is_closed", return_value=False), \
+            patch.object(h, "eb") as mock_eb:
+        mock_eb.put_events.return_value = {"FailedEntryCount": 0, "Entries": [{"EventId": "e-0"}]}
+
+        resp = h.handler(dummy_event, None)
+
+        assert resp["statusCode"] == 200
+        assert "duplicado" in json.loads(resp["body"])["message"]
+        mock_eb.put_events.assert_called_once()
+
+
+@pytest.mark.parametrize("put_events", [
+    {"side_effect": Exception("throttled")},
+    {"return_value": {"FailedEntryCount": 1, "Entries": [{"ErrorCode": "InternalFailure"}]}},
+])
+def test_handler_failed_publish_returns_500(dummy_event, put_events):
+    # El log quedó guardado: el 500 hace que se reintente y el duplicado se republique
+    with patch.object(h._service, "ingest", return_value="inserted"), \
+            patch.object(h.db, "is_closed", return_value=False), \
+            patch.object(h, "eb") as mock_eb:
+        mock_eb.put_events.configure_mock(**put_events)
+
+        resp = h.handler(dummy_event, None)
+
+        assert resp["statusCode"] == 500
+        assert "EventBridge" in json.loads(resp["body"])["error"]
+
+
+def test_handler_batch_failed_publish_is_retried(dummy_event):
+    records = [{"messageId": f"m-{i}", "body": json.dumps(dict(dummy_event, uuid=f"evt-{i}"))}
+               for i in range(2)]
+    results = [{"uuid": f"evt-{i}", "status": "inserted", "error": None} for i in range(2)]
+
+    with patch.object(h._service, "ingest_batch", return_value=results), \
+            patch.object(h.db, "is_closed", return_value=False), \
+            patch.object(h, "eb") as mock_eb:
+        mock_eb.put_events.return_value = {
+            "FailedEntryCount": 1,
+            "Entries": [{"EventId": "e-0"}, {"ErrorCode": "InternalFailure"}]}
+
+        resp = h.handler({"Records": records}, None)
+
+        # El deny no se pierde: SQS reintenta solo el mensaje no publicado
+        assert resp["batchItemFailures"] == [{"itemIdentifier": "m-1"}]
+        assert json.loads(resp["body"])["results"][1]["published"] is False
+
+
+def test_handler_batch_redelivered_duplicate_is_republished(dummy_event):
+    records = [
+        {"messageId": "m-0", "body": json.dumps(dummy_event),
+         "attributes": {"ApproximateReceiveCount": "2"}},
+        {"messageId": "m-1", "body": json.dumps(dict(dummy_event, uuid="evt-dup")),
+         "attributes": {"ApproximateReceiveCount": "1"}},
+    ]
+    results = [{"uuid": "evt-123", "status": "duplicate", "error": None},
+               {"uuid": "evt-dup", "status": "duplicate", "error": None}]
+
+    with patch.object(h._service, "ingest_batch", return_value=results), \
+            patch.object(h.db, "is_closed", return_value=False), \
+            patch.object(h, "eb") as mock_eb:
+        mock_eb.put_events.return_value = {"FailedEntryCount": 0, "Entries": [{}]}
+
+        resp = h.handler({"Records": records}, None)
+
+        # Solo la reentrega SQS se vuelve a publicar; el duplicado MQTT no
+        entries = mock_eb.put_events.call_args[1]["Entries"]
+        assert [json.loads(e["Detail"])["uuid"] for e in entries] == ["evt-123"]
+        assert resp["batchItemFailures"] == []
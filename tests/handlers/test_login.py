@@ -85,3 +85,23 @@ def test_handler_returns_500_on_unexpected_error(monkeypatch):
     assert resp["statusCode"] == 500
     body = json.loads(resp["body"])
     assert "Internal error" in body["error"]
+
+
+@pytest.mark.parametrize("body, missing_env", [
+    ({"email": "", "password": ""}, None),
+    ({"email": "a@b.com", "password": "pass"}, "JWT_SECRET"),
+])
+def test_handler_validates_before_taking_connection(monkeypatch, body, missing_env):
+    # Los errores de configuración o de input no deben tomar la conexión
+    import shared.connection as connection
+
+    def fail_get_manager(database):
+        raise AssertionError("no debería pedir la conexión")
+
+    monkeypatch.setattr(connection, "get_manager", fail_get_manager)
+    if missing_env:
+        monkeypatch.delenv(missing_env, raising=False)
+
+    resp = login_module.lambda_handler(make_event(body), None)
+
+    assert resp["statusCode"] in (400, 500)
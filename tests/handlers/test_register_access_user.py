@@ -0,0 +1,93 @@
+# tests/handlers/test_register_access_user.py
+import importlib
+import json
+import sys
+import types
+
+import pytest
+import services
+from services.access_users_service import DuplicateFaceError
+import handlers.register_access_user as handler_module
+
+
+@pytest.fixture
+def mock_service(monkeypatch):
+    service = type("Service", (), {})()
+    monkeypatch.setattr(handler_module, "svc", service)
+    return service
+
+
+def test_duplicate_face_returns_409(mock_service):
+    """Test un rostro ya registrado responde 409 con el usuario existente"""
+    def create_user(body):
+        raise DuplicateFaceError(7, 0.31234)
+
+    mock_service.create_user = create_user
+
+    response = handler_module.lambda_handler({"body": json.dumps({})}, None)
+
+    assert response["statusCode"] == 409
+    body = json.loads(response["body"])
+    assert body["user_id"] == 7
+    assert body["distance"] == 0.3123
+
+
+def test_duplicate_cedula_still_409_without_user(mock_service):
+    """Test otros LookupError mantienen su respuesta"""
+    def create_user(body):
+        raise LookupError("Cédula already exists")
+
+    mock_service.create_user = create_user
+
+    response = handler_module.lambda_handler({"body": "{}"}, None)
+
+    assert response["statusCode"] == 409
+    assert json.loads(response["body"]) == {"error": "Cédula already exists"}
+
+
+def test_ping_skips_db_and_service(mock_service, monkeypatch):
+    """Test el ping de calentamiento responde sin tocar BD ni S3"""
+    def fail(*args, **kwargs):
+        raise AssertionError("el ping no debe conectarse")
+
+    mock_service.create_user = fail
+    monkeypatch.setattr(handler_module.db, "connect", fail)
+
+    response = handler_module.lambda_handler({"ping": True}, None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["status"] == "warm"
+
+
+def test_init_metrics_reported_once(mock_service, monkeypatch, capsys):
+    """Test los tiempos de init se publican en EMF una sola vez por contenedor"""
+    monkeypatch.setattr(handler_module, "_init_reported", False)
+
+    handler_module.lambda_handler({"ping": True}, None)
+    handler_module.lambda_handler({"ping": True}, None)
+
+    lines = [json.loads(l) for l in capsys.readouterr().out.splitlines() if '"_aws"' in l]
+    assert len(lines) == 1
+    metrics = lines[0]["_aws"]["CloudWatchMetrics"][0]["Metrics"]
+    assert [m["Name"] for m in metrics] == ["InitDuration", "ModelLoad", "WarmUp"]
+    assert lines[0]["InitDuration"] >= lines[0]["ModelLoad"]
+
+
+def test_warm_up_failure_does_not_break_init(monkeypatch):
+    """Test si el warm-up falla el módulo igual se inicializa"""
+    def warm_up():
+        raise RuntimeError("dlib sin memoria")
+
+    fake = types.ModuleType("services.face_service")
+    fake.warm_up = warm_up
+    monkeypatch.setitem(sys.modules, "services.face_service", fake)
+    monkeypatch.setattr(services, "face_service", fake, raising=False)
+    monkeypatch.setenv("FACE_WARMUP", "1")
+
+    try:
+        module = importlib.reload(handler_module)
+        assert module.face_service is fake
+        assert module.svc is not None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(handler_module)
@@ -0,0 +1,85 @@
+# tests/handlers/test_sync_device_users.py
+import handlers.sync_device_users as handler_module
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.fixture
+def mock_db():
+    """Mock para la conexión de base de datos"""
+    with patch.object(handler_module.db, 'is_closed', return_value=False):
+        with patch.object(handler_module.db, 'connect'):
+            with patch.object(handler_module.db, 'close'):
+                yield
+
+
+@pytest.fixture
+def mock_service(monkeypatch):
+    service = MagicMock()
+    monkeypatch.setattr(handler_module, '_service', service)
+    return service
+
+
+def test_get_changes(mock_db, mock_service):
+    """Test GET con since delega en get_changes"""
+    mock_service.get_changes.return_value = {"revision": 7, "upserts": [], "deletes": []}
+    event = {'httpMethod': 'GET', 'pathParameters': {'location': 'FCEE'},
+             'queryStringParameters': {'since': '5'}}
+
+    response = handler_module.lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['revision'] == 7
+    mock_service.get_changes.assert_called_once_with('FCEE', '5', None)
+
+
+def test_get_changes_without_since(mock_db, mock_service):
+    """Test sin since se pide el snapshot completo"""
+    mock_service.get_changes.return_value = {}
+    handler_module.lambda_handler({'pathParameters': {'location': 'FCEE'}}, None)
+
+    mock_service.get_changes.assert_called_once_with('FCEE', 0, None)
+
+
+def test_get_snapshot_next_page(mock_db, mock_service):
+    """Test after pide la página siguiente del snapshot"""
+    mock_service.get_changes.return_value = {}
+    event = {'pathParameters': {'location': 'FCEE'},
+             'queryStringParameters': {'since': '7', 'after': '120'}}
+
+    handler_module.lambda_handler(event, None)
+
+    mock_service.get_changes.assert_called_once_with('FCEE', '7', '120')
+
+
+def test_acknowledge(mock_db, mock_service):
+    """Test POST confirma la revisión aplicada"""
+    mock_service.acknowledge.return_value = {"revision": 7, "updated": True}
+    event = {'httpMethod': 'POST', 'pathParameters': {'location': 'FCEE'},
+             'body': json.dumps({'revision': 7})}
+
+    response = handler_module.lambda_handler(event, None)
+
+    assert response['statusCode'] == 200
+    mock_service.acknowledge.assert_called_once_with('FCEE', 7)
+
+
+@pytest.mark.parametrize("error,status", [
+    (ValueError("since debe ser un entero"), 400),
+    (LookupError("no existe"), 404),
+    (RuntimeError("boom"), 500),
+])
+def test_errors(mock_db, mock_service, error, status):
+    """Test mapeo de errores a códigos HTTP"""
+    mock_service.get_changes.side_effect = error
+    response = handler_module.lambda_handler({'pathParameters': {'location': 'FCEE'}}, None)
+
+    assert response['statusCode'] == status
+
+
+def test_missing_location(mock_db, mock_service):
+    """Test sin ubicación en el path"""
+    response = handler_module.lambda_handler({'pathParameters': None}, None)
+
+    assert response['statusCode'] == 400
@@ -5,7 +5,7 @@ import boto3
 import os
 from services.access_users_service import AccessUserService
 from repositories.access_user_repo import AccessUserRepository
-from shared.models import db, AccessUser, Device, DeviceUserMapping
+from shared.models import db, AccessUser, Device, DeviceUserMapping, DeviceUserChange
 
 # Configurar variables de entorno
 # Reemplazar con tu endpoint real
@@ -16,9 +16,9 @@ os.environ["IOT_ENDPOINT"] = "a11c3004sdvacu-ats.iot.us-east-1.amazonaws.com"
 def setup_db():
     """Crea las tablas necesarias para los tests"""
     db.connect()
-    db.create_tables([AccessUser, Device, DeviceUserMapping])
+    db.create_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
     yield
-    db.drop_tables([AccessUser, Device, DeviceUserMapping])
+    db.drop_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
     db.close()
 
 
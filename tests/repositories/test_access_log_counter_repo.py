@@ -0,0 +1,118 @@
+# tests/repositories/test_access_log_counter_repo.py
+import pytest
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch
+from shared.models import (db, AccessLog, AccessLogCounter, AccessUser, Configuration, Device,
+                           DeviceUserChange, OutboxMessage)
+from shared.migrations import apply_migrations
+from repositories.access_log_counter_repo import AccessLogCounterRepository
+
+
+@pytest.fixture
+def setup_db():
+    """Crea las tablas necesarias para los tests"""
+    db.connect()
+    db.create_tables([AccessUser, Device, AccessLog, Configuration])
+    yield
+    db.drop_tables([AccessUser, Device, AccessLog, AccessLogCounter, Configuration,
+                    OutboxMessage, DeviceUserChange])
+    db.close()
+
+
+@pytest.fixture
+def sample_logs(setup_db):
+    """Tres logs: dos del usuario 1 (dispositivos 1 y 2) y uno anónimo"""
+    AccessUser.create(id=1, cedula="12345678")
+    Device.create(id_device="1", location="raspberry-tic2")
+    Device.create(id_device="2", location="raspberry-lab1")
+    ts = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for user_id, device_id in [(1, "1"), (1, "2"), (None, "1")]:
+        AccessLog.create(id=uuid.uuid4(), access_user_id=user_id,
+                         device_id=device_id, event="accepted", timestamp=ts)
+
+
+def test_migration_creates_and_backfills_counters(sample_logs):
+    """Test la migración crea la tabla y hace el backfill desde access_logs"""
+    assert apply_migrations() == ["access_log_counters", "access_log_indexes", "config_version",
+                                  "face_embedding_bin", "outbox_messages", "device_sync"]
+
+    repo = AccessLogCounterRepository()
+    assert repo.count() == 3
+    assert repo.count(device_id="1") == 2
+    assert repo.count(user_id=1) == 2
+
+    # Idempotente: una segunda corrida no duplica los conteos
+    apply_migrations()
+    assert repo.count() == 3
+    indexes = {tuple(i.columns) for i in db.get_indexes(DeviceUserChange._meta.table_name)}
+    assert ("created_at", "revision") in indexes
+
+
+def test_count_without_counters_returns_none(setup_db):
+    """Test sin fila 'total' los contadores no están inicializados"""
+    db.create_tables([AccessLogCounter])
+    repo = AccessLogCounterRepository()
+
+    assert repo.count() is None
+    assert repo.count(device_id="1") is None
+
+
+def test_count_combined_filter_returns_none(sample_logs):
+    """Test usuario + dispositivo no se puede responder con contadores"""
+    db.create_tables([AccessLogCounter])
+    repo = AccessLogCounterRepository()
+    repo.rebuild()
+
+    assert repo.count(user_id=1, device_id="1") is None
+    assert repo.count(device_id="desconocido") == 0
+
+
+def test_increment_and_discount(sample_logs):
+    """Test incrementos agrupados y descuento de los logs de un usuario"""
+    db.create_tables([AccessLogCounter])
+    repo = AccessLogCounterRepository()
+    repo.rebuild()
+
+    repo.increment([
+        {"access_user_id": 1, "device_id": "2"},
+        {"access_user_id": None, "device_id": "2"},
+    ])
+    assert repo.count() == 5
+    assert repo.count(device_id="2") == 3
+    assert repo.count(user_id=1) == 3
+
+    repo.discount_user_logs(1)
+    assert repo.count() == 3
+    assert repo.count(device_id="1") == 1
+    assert repo.count(device_id="2") == 2
+    assert repo.count(user_id=1) == 0
+
+
+def test_ingest_does_not_touch_total_row(sample_logs):
+    """Test la ingesta no actualiza una fila compartida: el total sale de los dispositivos"""
+    db.create_tables([AccessLogCounter])
+    repo = AccessLogCounterRepository()
+    repo.rebuild()
+
+    repo.increment([{"access_user_id": 1, "device_id": "2"}])
+
+    assert repo.get("total") == 0
+    assert repo.count() == 4
+
+
+def test_apply_locks_in_sorted_order(setup_db):
+    """Test las filas del upsert van en orden fijo (scope, key)"""
+    db.create_tables([AccessLogCounter])
+    repo = AccessLogCounterRepository()
+    captured = []
+    original = AccessLogCounter.insert_many
+
+    def spy(rows):
+        captured.extend((r["scope"], r["key"]) for r in rows)
+        return original(rows)
+
+    with patch.object(AccessLogCounter, "insert_many", side_effect=spy):
+        repo.apply({("user", "7"): 1, ("device", "9"): -1, ("device", "10"): 2})
+
+    assert captured == [("device", "10"), ("device", "9"), ("user", "7")]
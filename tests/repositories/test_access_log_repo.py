@@ -2,7 +2,7 @@
 import pytest
 from datetime import datetime, timezone
 import uuid
-from shared.models import db, AccessLog, AccessUser, Device
+from shared.models import db, AccessLog, AccessLogCounter, AccessUser, Device
 from repositories.access_log_repo import AccessLogRepository
 
 
@@ -10,9 +10,9 @@ from repositories.access_log_repo import AccessLogRepository
 def setup_db():
     """Crea las tablas necesarias para los tests"""
     db.connect()
-    db.create_tables([AccessUser, Device, AccessLog])
+    db.create_tables([AccessUser, Device, AccessLog, AccessLogCounter])
     yield
-    db.drop_tables([AccessUser, Device, AccessLog])
+    db.drop_tables([AccessUser, Device, AccessLog, AccessLogCounter])
     db.close()
 
 
@@ -172,4 +172,156 @@ def test_get_logs_with_null_user(sample_data):
     assert null_user_logs[0].access_user_id is None
     assert null_user_logs[0].event == "denied"
     # No debe tener relación con usuario
-    assert not hasattr(null_user_logs[0], 'access_user') or null_user_logs[0].access_user is None
\ No newline at end of file
+    assert not hasattr(null_user_logs[0], 'access_user') or null_user_logs[0].access_user is None
+
+def test_bulk_ingest_and_existing_ids(sample_data):
+    """Test insertar varios logs en un solo INSERT y detectar UUIDs existentes"""
+    repo = AccessLogRepository()
+    new_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+
+    inserted = repo.bulk_ingest([
+        {"uuid": new_ids[0], "access_user_id": 66, "device_id": "1",
+         "event": "accepted", "timestamp": "2025-05-20T21:00:00Z"},
+        {"uuid": new_ids[1], "access_user_id": None, "device_id": "2",
+         "event": "denied", "timestamp": "2025-05-20T21:00:05Z"},
+    ])
+
+    assert inserted == set(new_ids)
+    assert AccessLog.select().count() == 6
+
+    unknown = str(uuid.uuid4())
+    assert repo.existing_ids(new_ids + [unknown]) == set(new_ids)
+    assert repo.existing_ids([]) == set()
+
+
+def test_ingest_is_idempotent(sample_data):
+    """Test una reentrega del mismo UUID es un no-op que reporta duplicado"""
+    repo = AccessLogRepository()
+    log_id = str(uuid.uuid4())
+    args = dict(uuid=log_id, access_user_id=66, device_id="1",
+                event="accepted", timestamp="2025-05-20T21:00:00Z")
+
+    assert repo.ingest(**args) is True
+    assert repo.ingest(**args) is False
+    assert AccessLog.select().where(AccessLog.id == log_id).count() == 1
+
+
+def test_bulk_ingest_skips_existing(sample_data):
+    """Test el insert multi-fila descarta los UUIDs ya existentes"""
+    repo = AccessLogRepository()
+    existing = str(sample_data['logs'][0].id)
+    new_id = str(uuid.uuid4())
+
+    inserted = repo.bulk_ingest([
+        {"uuid": existing, "access_user_id": 66, "device_id": "1",
+         "event": "accepted", "timestamp": "2025-05-20T21:00:00Z"},
+        {"uuid": new_id, "access_user_id": 66, "device_id": "1",
+         "event": "accepted", "timestamp": "2025-05-20T21:00:00Z"},
+    ])
+
+    assert inserted == {new_id}
+    assert AccessLog.select().count() == 5
+
+
+def test_get_logs_page_keyset(sample_data):
+    """Test paginación por keyset (timestamp, id) sin repetir ni saltar logs"""
+    repo = AccessLogRepository()
+    # Dos logs con el mismo timestamp para ejercitar el desempate por id
+    same_ts = datetime(2024, 1, 5, 8, 0, 0, tzinfo=timezone.utc)
+    for _ in range(2):
+        AccessLog.create(id=uuid.uuid4(), access_user_id=None, device_id="1",
+                         event="denied", timestamp=same_ts)
+
+    seen = []
+    after = None
+    while True:
+        page = repo.get_logs_page(after=after, limit=2)
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1].timestamp, str(page[-1].id))
+
+    assert len(seen) == 6
+    assert len({log.id for log in seen}) == 6
+    timestamps = [log.timestamp for log in seen]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_get_logs_page_filters(sample_data):
+    """Test filtros por evento y rango de fechas"""
+    repo = AccessLogRepository()
+
+    logs = repo.get_logs_page(
+        event="denied",
+        start=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        end=datetime(2024, 1, 3, tzinfo=timezone.utc),
+    )
+
+    assert len(logs) == 1
+    assert logs[0].device_id == "2"
+
+
+def test_count_by_filters_with_event_and_range(sample_data):
+    """Test conteo exacto con los mismos filtros que la paginación"""
+    repo = AccessLogRepository()
+
+    assert repo.count_by_filters() == 4
+    assert repo.count_by_filters(event="denied") == 2
+    assert repo.count_by_filters(
+        device_id="1",
+        start=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        end=datetime(2024, 1, 3, tzinfo=timezone.utc),
+    ) == 1
+
+
+def test_bulk_ingest_updates_counters(sample_data):
+    """Test la ingesta mantiene los contadores y no cuenta duplicados"""
+    repo = AccessLogRepository()
+    repo.counter_repo.rebuild()
+    log = {"uuid": str(uuid.uuid4()), "access_user_id": 67, "device_id": "2",
+           "event": "accepted", "timestamp": "2025-05-20T21:00:00Z"}
+
+    repo.bulk_ingest([log])
+    repo.bulk_ingest([log])
+
+    assert repo.count_cached() == 5
+    assert repo.count_cached(device_id="2") == 2
+    assert repo.count_cached(user_id=67) == 2
+    assert repo.count_cached(device_id="2") == repo.count_by_filters(device_id="2")
+
+
+def test_estimate_count_not_available_on_sqlite(sample_data):
+    """Test SQLite no tiene estadísticas del planner: no hay estimación"""
+    assert AccessLogRepository().estimate_count() is None
+
+
+def test_iter_logs_in_chunks(sample_data):
+    """Test iter_logs recorre todos los logs en bloques acotados"""
+    repo = AccessLogRepository()
+    calls = []
+    original = repo.get_logs_page
+
+    def recording(*args, **kwargs):
+        calls.append(kwargs.get("limit"))
+        return original(*args, **kwargs)
+
+    repo.get_logs_page = recording
+
+    logs = list(repo.iter_logs(chunk_size=3))
+
+    assert len(logs) == 4
+    assert len({log.id for log in logs}) == 4
+    assert calls == [3, 3]  # el segundo bloque incompleto corta la iteración
+    assert [log.id for log in repo.iter_logs(device_id="1", chunk_size=2)] == \
+        [log.id for log in repo.get_logs_page(device_id="1")]
+
+
+def test_iter_deny_times(sample_data):
+    """Test denies como tuplas (dispositivo, timestamp) ordenadas por dispositivo"""
+    repo = AccessLogRepository()
+
+    rows = list(repo.iter_deny_times())
+
+    assert [device for device, _ in rows] == ["1", "2"]
+    assert list(repo.iter_deny_times(device_id="2"))[0][1].year == 2024
+    assert list(repo.iter_deny_times(start=datetime(2024, 1, 2, tzinfo=timezone.utc))) == rows[:1]
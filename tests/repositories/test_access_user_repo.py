@@ -1,7 +1,9 @@
 # tests/repositories/test_access_user_repo.py
 import pytest
 from datetime import datetime
-from shared.models import db, AccessUser, Device, DeviceUserMapping
+from unittest.mock import patch
+from shared.models import db, AccessUser, Device, DeviceUserMapping, DeviceUserChange
+import repositories.access_user_repo as access_user_repo
 from repositories.access_user_repo import AccessUserRepository
 
 
@@ -9,9 +11,9 @@ from repositories.access_user_repo import AccessUserRepository
 def setup_db():
     """Crea las tablas necesarias para los tests"""
     db.connect()
-    db.create_tables([AccessUser, Device, DeviceUserMapping])
+    db.create_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
     yield
-    db.drop_tables([AccessUser, Device, DeviceUserMapping])
+    db.drop_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
     db.close()
 
 
@@ -124,4 +126,77 @@ def test_get_by_cedula(sample_data):
     user = repo.get_by_cedula("12345678")
     
     assert user.first_name == "Juan"
-    assert user.last_name == "Pérez"
\ No newline at end of file
+    assert user.last_name == "Pérez"
+
+def test_get_ids_by_cedulas(sample_data):
+    """Test resolver varias cédulas en una consulta"""
+    repo = AccessUserRepository()
+
+    ids = repo.get_ids_by_cedulas(["12345678", "87654321", "00000000"])
+
+    assert ids == {"12345678": 1, "87654321": 2}
+
+
+def test_cedula_deleted_elsewhere_expires_from_cache(sample_data, monkeypatch):
+    """Test una baja desde otro contenedor se ve al vencer el TTL corto de la cache"""
+    now = [0.0]
+    monkeypatch.setattr(access_user_repo._cedula_cache, "_clock", lambda: now[0])
+    repo = AccessUserRepository()
+    assert repo.get_id_by_cedula("12345678") == 1
+
+    # Baja directa en la BD, sin pasar por este repositorio
+    AccessUser.delete().where(AccessUser.id == 1).execute()
+
+    assert repo.exists("12345678") is False  # el alta siempre consulta la BD
+    assert repo.get_id_by_cedula("12345678") == 1
+    now[0] += access_user_repo._cedula_cache.ttl
+    assert repo.get_id_by_cedula("12345678") is None
+    assert repo.get_ids_by_cedulas(["12345678"]) == {}
+
+
+def test_get_ids_by_cedulas_uses_cache(sample_data):
+    """Test las cédulas ya resueltas no vuelven a la BD"""
+    repo = AccessUserRepository()
+    repo.get_ids_by_cedulas(["12345678"])
+
+    with patch.object(AccessUser, "select", side_effect=AssertionError("consulta a BD")):
+        assert repo.get_ids_by_cedulas(["12345678"]) == {"12345678": 1}
+        assert repo.get_id_by_cedula("12345678") == 1
+
+
+def test_bloom_rejects_unknown_without_db(sample_data, monkeypatch):
+    """Test con el prefiltro Bloom, la ingesta no consulta la BD por cédulas desconocidas"""
+    monkeypatch.setattr(access_user_repo._prefilter, "recheck_seconds", 3600)
+    repo = AccessUserRepository(use_bloom=True)
+    assert repo.get_id_by_cedula("12345678") == 1  # carga el filtro
+
+    with patch.object(AccessUser, "select", side_effect=AssertionError("consulta a BD")):
+        assert repo.get_id_by_cedula("99999999") is None
+        assert repo.get_ids_by_cedulas(["99999999"]) == {}
+
+
+def test_bloom_negative_rechecks_users_created_elsewhere(sample_data, monkeypatch):
+    """Test un usuario creado desde otro contenedor no queda afuera hasta el refresco"""
+    monkeypatch.setattr(access_user_repo._prefilter, "recheck_seconds", 0)
+    repo = AccessUserRepository(use_bloom=True)
+    assert repo.get_id_by_cedula("99999999") is None  # carga el filtro
+
+    # Alta directa en la BD, sin pasar por este repositorio
+    AccessUser.create(id=3, first_name="Ana", last_name="Ruiz", cedula="99999999",
+                      rfid="RFID-9", created_at=datetime.now())
+
+    assert repo.get_id_by_cedula("99999999") == 3
+    assert repo.exists("99999999") is True
+    assert repo.exists_rfid("RFID-9") is True
+
+
+def test_bloom_sees_users_created_in_container(sample_data):
+    """Test los usuarios creados por el repositorio entran al filtro"""
+    repo = AccessUserRepository(use_bloom=True)
+    repo.exists("12345678")
+
+    repo.create(id=3, first_name="Ana", last_name="Ruiz", cedula="55555555",
+                rfid="RFID-3", created_at=datetime.now())
+
+    assert repo.exists("55555555") is True
+    assert repo.exists_rfid("RFID-3") is True
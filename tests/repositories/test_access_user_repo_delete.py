@@ -1,8 +1,9 @@
 # tests/repositories/test_access_user_repo_delete.py
 import pytest
 from datetime import datetime
-from shared.models import db, AccessUser, Device, DeviceUserMapping, AccessLog
+from shared.models import db, AccessUser, Device, DeviceUserMapping, DeviceUserChange, AccessLog, AccessLogCounter
 from repositories.access_user_repo import AccessUserRepository
+from repositories.access_log_counter_repo import AccessLogCounterRepository
 import uuid
 
 
@@ -10,9 +11,9 @@ import uuid
 def setup_db():
     """Crea las tablas necesarias para los tests"""
     db.connect()
-    db.create_tables([AccessUser, Device, DeviceUserMapping, AccessLog])
+    db.create_tables([AccessUser, Device, DeviceUserMapping, AccessLog, AccessLogCounter, DeviceUserChange])
     yield
-    db.drop_tables([AccessUser, Device, DeviceUserMapping, AccessLog])
+    db.drop_tables([AccessUser, Device, DeviceUserMapping, AccessLog, AccessLogCounter, DeviceUserChange])
     db.close()
 
 
@@ -149,4 +150,39 @@ def test_delete_user_transaction_rollback(user_with_relations, monkeypatch):
     # Verificar que nada fue eliminado (rollback)
     assert AccessUser.select().count() == 1
     assert AccessLog.select().count() == 1
-    assert DeviceUserMapping.select().count() == 2
\ No newline at end of file
+    assert DeviceUserMapping.select().count() == 2
+
+def test_delete_drops_cached_cedula_id(user_with_relations):
+    """Test la baja invalida la cédula en la cache de este contenedor"""
+    repo = AccessUserRepository()
+    assert repo.get_id_by_cedula("12345678") == 1
+    assert repo.get_id_by_cedula("12345678") == 1  # desde la cache
+
+    assert repo.delete_user_and_related_data(1) is True
+
+    assert repo.get_id_by_cedula("12345678") is None
+    assert repo.exists("12345678") is False
+
+
+def test_delete_user_discounts_log_counters(user_with_relations):
+    """Test eliminar un usuario descuenta sus logs de los contadores"""
+    counters = AccessLogCounterRepository()
+    counters.rebuild()
+    assert counters.count(device_id="1") == 1
+
+    assert AccessUserRepository().delete_user_and_related_data(1) is True
+
+    assert counters.count() == 0
+    assert counters.count(device_id="1") == 0
+    assert counters.count(user_id=1) == 0
+
+
+def test_delete_user_logs_device_changes(user_with_relations):
+    """Test la baja registra un 'delete' por dispositivo para la sincronización"""
+    AccessUserRepository().delete_user_and_related_data(1)
+
+    changes = list(DeviceUserChange.select().order_by(DeviceUserChange.device))
+    assert [(c.device_id, c.op, c.access_user_id) for c in changes] == [
+        ("1", "delete", 1), ("2", "delete", 1)]
+    cedula = changes[0].cedula
+    assert cedula and all(c.cedula == cedula for c in changes)
@@ -1,7 +1,7 @@
 # tests/repositories/test_configuration_repo.py
 import pytest
 from shared.models import db, Configuration
-from repositories.configuration_repo import ConfigurationRepository
+from repositories.configuration_repo import CONFIG_VERSION, ConfigurationRepository
 
 
 @pytest.fixture
@@ -157,4 +157,16 @@ def test_update_value_not_found(sample_configs):
     
     updated = repo.update_value("non_existent", "value")
     
-    assert updated is False
\ No newline at end of file
+    assert updated is False
+
+def test_bump_version_creates_and_updates(sample_configs):
+    """Test la marca de versión se crea la primera vez y luego se actualiza"""
+    repo = ConfigurationRepository()
+
+    first = repo.bump_version()
+    second = repo.bump_version()
+
+    assert int(second) > int(first)
+    assert repo.get_value(CONFIG_VERSION) == second
+    # No se mezcla con las configuraciones visibles
+    assert CONFIG_VERSION not in [c.name_config for c in repo.get_all_global_configs()]
@@ -180,4 +180,75 @@ def test_update_last_sync(sample_devices):
     
     # Verificar que se actualizó
     device = repo.get_by_id("2")
-    assert device.last_sync == new_sync
\ No newline at end of file
+    assert device.last_sync == new_sync
+
+def test_get_ids_by_locations(sample_devices):
+    """Test resolver varias ubicaciones en una consulta"""
+    repo = DeviceRepository()
+
+    ids = repo.get_ids_by_locations(["raspberry-tic2", "raspberry-entrance", "nope"])
+
+    assert ids == {"raspberry-tic2": "1", "raspberry-entrance": "3"}
+    assert repo.get_ids_by_locations([]) == {}
+
+
+def test_get_id_by_location_uses_cache(sample_devices):
+    """Test la cache location -> id evita consultas repetidas"""
+    repo = DeviceRepository()
+
+    assert repo.get_id_by_location("raspberry-tic2") == "1"
+    assert repo.get_id_by_location("raspberry-tic2") == "1"
+
+    stats = repo.cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_get_id_by_location_caches_negative(setup_db):
+    """Test los negativos se cachean y create() los invalida"""
+    repo = DeviceRepository()
+
+    assert repo.get_id_by_location("raspberry-new") is None
+    assert repo.get_id_by_location("raspberry-new") is None
+    assert repo.cache_stats()["hits"] == 1
+
+    repo.create(id_device="10", location="raspberry-new", status="active")
+
+    assert repo.get_id_by_location("raspberry-new") == "10"
+
+
+def test_get_ids_by_locations_fills_cache(sample_devices):
+    """Test la resolución en bloque alimenta la cache"""
+    repo = DeviceRepository()
+
+    repo.get_ids_by_locations(["raspberry-tic2", "nope"])
+
+    assert repo.get_id_by_location("raspberry-tic2") == "1"
+    assert repo.get_id_by_location("nope") is None
+    assert repo.cache_stats()["hits"] == 2
+
+
+def test_get_ids_by_locations_recheck_missing(setup_db):
+    """Test un dispositivo creado desde otro contenedor se encuentra al re-consultar negativos"""
+    repo = DeviceRepository()
+    assert repo.get_ids_by_locations(["raspberry-new"]) == {}
+
+    Device.create(id_device="10", location="raspberry-new", status="active")  # sin invalidar
+
+    assert repo.get_ids_by_locations(["raspberry-new"]) == {}
+    assert repo.get_ids_by_locations(["raspberry-new"], recheck_missing=True) == {
+        "raspberry-new": "10"}
+    assert repo.get_id_by_location("raspberry-new") == "10"
+
+
+def test_update_status_keeps_location_cache(sample_devices):
+    """Test actualizar estado no invalida la cache location -> id"""
+    repo = DeviceRepository()
+    repo.get_id_by_location("raspberry-tic2")
+    repo.get_id_by_location("raspberry-lab1")
+
+    assert repo.update_status("1", "inactive")
+
+    assert repo.cache_stats()["size"] == 2
+    assert repo.get_ids_by_locations(["raspberry-tic2"]) == {"raspberry-tic2": "1"}
+    assert repo.get_by_id("1").status == "inactive"
@@ -1,5 +1,8 @@
+from datetime import datetime, timedelta
+
 import pytest
-from shared.models import db, AccessUser, Device, DeviceUserMapping
+from shared.models import db, AccessUser, Device, DeviceUserMapping, DeviceUserChange
+import repositories.device_user_mapping_repo as mapping_repo_module
 from repositories.device_user_mapping_repo import DeviceUserMappingRepository
 
 
@@ -7,9 +10,9 @@ from repositories.device_user_mapping_repo import DeviceUserMappingRepository
 def setup_db():
     """Crea las tablas necesarias para los tests"""
     db.connect()
-    db.create_tables([AccessUser, Device, DeviceUserMapping])
+    db.create_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
     yield
-    db.drop_tables([AccessUser, Device, DeviceUserMapping])
+    db.drop_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
     db.close()
 
 
@@ -166,11 +169,11 @@ def test_bulk_update_user_devices_transaction_rollback(sample_data, monkeypatch)
     repo = DeviceUserMappingRepository()
     user = sample_data['users'][0]  # Juan
     
-    # Simular error durante la actualización
-    def mock_add(*args, **kwargs):
+    # Simular error después del DELETE y el INSERT (al registrar los cambios)
+    def mock_record(*args, **kwargs):
         raise Exception("Error simulado")
     
-    monkeypatch.setattr(repo, "add_device_access", mock_add)
+    monkeypatch.setattr(mapping_repo_module, "record_changes", mock_record)
     
     # Intentar actualización que fallará
     with pytest.raises(Exception, match="Error simulado"):
@@ -184,3 +187,111 @@ def test_bulk_update_user_devices_transaction_rollback(sample_data, monkeypatch)
     devices = repo.get_user_devices(user.id)
     assert len(devices) == 1
     assert devices[0].id_device == "1"
+
+
+def test_mapping_changes_are_logged_with_revisions(sample_data):
+    """Test altas y bajas quedan en device_user_changes con revisión creciente"""
+    repo = DeviceUserMappingRepository()
+
+    repo.bulk_update_user_devices(1, [("3", "FCEE")], [("1", "raspberry-tic2")])
+    repo.add_device_access(1, "3")  # ya existía: no genera cambio
+
+    changes = list(DeviceUserChange.select().order_by(DeviceUserChange.revision))
+    assert [(c.device_id, c.op, c.cedula) for c in changes] == [
+        ("1", "delete", "12345678"), ("3", "upsert", "12345678")]
+    assert changes[0].revision < changes[1].revision
+    assert repo.current_revision() == changes[1].revision
+    assert [c.op for c in repo.get_changes_since("3", 0, 10)] == ["upsert"]
+    assert repo.get_changes_since("3", changes[1].revision, 10) == []
+
+
+def test_get_device_users(sample_data):
+    """Test usuarios con acceso a un dispositivo, opcionalmente filtrados"""
+    repo = DeviceUserMappingRepository()
+    repo.add_device_access(2, "1")
+
+    assert [u.id for u in repo.get_device_users("1")] == [1, 2]
+    assert [u.id for u in repo.get_device_users("1", user_ids=[2])] == [2]
+    assert repo.get_device_users("3") == []
+    assert [u.id for u in repo.get_device_users("1", limit=1)] == [1]
+    assert [u.id for u in repo.get_device_users("1", after_id=1, limit=1)] == [2]
+
+
+def test_prune_changes_keeps_latest(sample_data):
+    """Test la purga borra por antigüedad pero deja la última revisión"""
+    repo = DeviceUserMappingRepository()
+    repo.add_device_access(2, "1")
+    repo.add_device_access(2, "3")
+    first, latest = [c.revision for c in DeviceUserChange.select().order_by(DeviceUserChange.revision)]
+    assert repo.oldest_revision() == first
+
+    assert repo.prune_changes(datetime.utcnow() + timedelta(days=1)) == 1
+
+    assert repo.oldest_revision() == latest == repo.current_revision()
+    assert repo.prune_changes(datetime.utcnow() + timedelta(days=1)) == 0
+
+
+def test_bulk_update_reports_only_real_changes(sample_data):
+    """Test duplicados, mappings inexistentes y ya existentes no se informan"""
+    repo = DeviceUserMappingRepository()
+
+    added, removed = repo.bulk_update_user_devices(
+        1,
+        [("1", "raspberry-tic2"), ("2", "raspberry-lab1"), ("2", "raspberry-lab1")],
+        [("3", "FCEE")]
+    )
+
+    assert added == ["raspberry-lab1"]
+    assert removed == []
+    assert {d.id_device for d in repo.get_user_devices(1)} == {"1", "2"}
+
+
+def test_bulk_update_issues_constant_statements(sample_data):
+    """Test la cantidad de sentencias no crece con la cantidad de dispositivos"""
+    for i in range(4, 40):
+        Device.create(id_device=str(i), location=f"door-{i}")
+    repo = DeviceUserMappingRepository()
+    statements = []
+    original = db.execute_sql
+
+    def counting(sql, *args, **kwargs):
+        statements.append(sql)
+        return original(sql, *args, **kwargs)
+
+    db.execute_sql = counting
+    try:
+        added, removed = repo.bulk_update_user_devices(
+            1,
+            [(str(i), f"door-{i}") for i in range(4, 40)],
+            [("1", "raspberry-tic2")]
+        )
+    finally:
+        del db.execute_sql
+
+    assert len(added) == 36 and removed == ["raspberry-tic2"]
+    data_statements = [s for s in statements if not s.upper().startswith(("SAVEPOINT", "RELEASE", "BEGIN", "COMMIT"))]
+    # mappings actuales, DELETE, INSERT, cédula y un INSERT al log por operación
+    assert len(data_statements) == 6
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_bulk_update_user_devices_with_and_without_returning(sample_data, monkeypatch, returning):
+    """Test el diff informado es el mismo con RETURNING (Postgres) o sin él (emulado)"""
+    monkeypatch.setattr(db, "returning_clause", returning)
+    repo = DeviceUserMappingRepository()
+
+    # "1" ya estaba (no se agrega de nuevo) y "2" no estaba (no se elimina)
+    added, removed = repo.bulk_update_user_devices(
+        1,
+        [("1", "raspberry-tic2"), ("3", "FCEE")],
+        [("2", "raspberry-lab1")]
+    )
+
+    assert added == ["FCEE"]
+    assert removed == []
+
+    added, removed = repo.bulk_update_user_devices(1, [], [("1", "raspberry-tic2")])
+
+    assert added == []
+    assert removed == ["raspberry-tic2"]
+    assert {d.id_device for d in repo.get_user_devices(1)} == {"3"}
@@ -0,0 +1,133 @@
+# tests/repositories/test_outbox_repo.py
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared.models import db, OutboxMessage
+from repositories.outbox_repo import OutboxRepository, get_outbox
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def setup_db():
+    """Crea la tabla del outbox"""
+    db.connect()
+    db.create_tables([OutboxMessage])
+    yield
+    db.drop_tables([OutboxMessage])
+    db.close()
+
+
+def test_enqueue_one_row_per_location(setup_db):
+    """Test un mensaje por ubicación con el mismo JSON"""
+    repo = OutboxRepository()
+
+    count = repo.enqueue("access/users/delete", {"cedula": "123"}, ["FCEE", "lab1"], now=NOW)
+
+    rows = list(OutboxMessage.select().order_by(OutboxMessage.id))
+    assert count == 2
+    assert [r.topic for r in rows] == ["access/users/delete/FCEE", "access/users/delete/lab1"]
+    assert [r.location for r in rows] == ["FCEE", "lab1"]
+    assert all(json.loads(r.payload) == {"cedula": "123"} for r in rows)
+    assert all(r.status == "pending" and r.attempts == 0 for r in rows)
+    assert repo.enqueue("access/users/new", {}, [], now=NOW) == 0
+
+
+def test_claim_returns_oldest_per_location(setup_db):
+    """Test claim entrega como mucho el mensaje más antiguo de cada ubicación"""
+    repo = OutboxRepository()
+    repo.enqueue("access/users/delete", {"cedula": "1"}, ["FCEE", "lab1"], now=NOW)
+    repo.enqueue("access/users/new", {"cedula": "1"}, ["FCEE"], now=NOW)
+
+    claimed = repo.claim(10, now=NOW)
+
+    assert [m.topic for m in claimed] == ["access/users/delete/FCEE", "access/users/delete/lab1"]
+
+
+def test_claim_skips_messages_not_yet_available(setup_db):
+    """Test los mensajes en backoff no se toman"""
+    repo = OutboxRepository()
+    repo.enqueue("t", {}, ["FCEE"], now=NOW + timedelta(seconds=30))
+
+    assert repo.claim(10, now=NOW) == []
+    assert len(repo.claim(10, now=NOW + timedelta(seconds=30))) == 1
+
+
+def test_retry_postpones_later_messages_of_location(setup_db):
+    """Test un fallo posterga también lo que sigue en esa ubicación"""
+    repo = OutboxRepository(lease_seconds=30)
+    repo.enqueue("access/users/delete", {"cedula": "1"}, ["FCEE", "lab1"], now=NOW)
+    repo.enqueue("access/users/new", {"cedula": "1"}, ["FCEE"], now=NOW)
+    head = repo.claim(10, now=NOW)[0]
+
+    retry_at = NOW + timedelta(seconds=60)
+    repo.retry(head, "timeout", retry_at)
+
+    # Vencida la reserva vuelve lab1, pero FCEE sigue en backoff
+    assert [m.location for m in repo.claim(10, now=NOW + timedelta(seconds=30))] == ["lab1"]
+    head = OutboxMessage.get_by_id(head.id)
+    assert head.attempts == 1 and head.last_error == "timeout"
+    # Vencido el backoff vuelve primero el mensaje fallido
+    assert [m.topic for m in repo.claim(10, now=retry_at)] == [
+        "access/users/delete/FCEE", "access/users/delete/lab1"]
+
+
+def test_claim_counts_attempt_and_leases(setup_db):
+    """Test el intento y la reserva quedan confirmados al tomar el mensaje"""
+    repo = OutboxRepository(lease_seconds=30)
+    repo.enqueue("t", {}, ["FCEE"], now=NOW)
+
+    (claimed,) = repo.claim(10, now=NOW)
+
+    assert claimed.attempts == 1
+    assert OutboxMessage.get_by_id(claimed.id).attempts == 1
+    # Mientras dura la reserva nadie más lo toma; si quien lo tomó murió,
+    # vuelve al vencer
+    assert repo.claim(10, now=NOW + timedelta(seconds=29)) == []
+    assert [m.attempts for m in repo.claim(10, now=NOW + timedelta(seconds=30))] == [2]
+
+
+def test_enqueue_claimed_and_release(setup_db):
+    """Test los mensajes encolados ya tomados no los ve el drainer hasta liberarlos"""
+    repo = OutboxRepository(lease_seconds=30)
+
+    messages = repo.enqueue_claimed("access/users/delete", {"cedula": "1"},
+                                    ["FCEE", "lab1"], now=NOW)
+
+    assert [m.topic for m in messages] == ["access/users/delete/FCEE",
+                                           "access/users/delete/lab1"]
+    assert [OutboxMessage.get_by_id(m.id).location for m in messages] == ["FCEE", "lab1"]
+    assert repo.heads(["FCEE", "lab1"]) == {"FCEE": messages[0].id, "lab1": messages[1].id}
+    assert repo.claim(10, now=NOW) == []
+
+    repo.release([messages[0].id], now=NOW)
+
+    (claimed,) = repo.claim(10, now=NOW)
+    assert claimed.id == messages[0].id and claimed.attempts == 1
+    assert repo.enqueue_claimed("t", {}, [], now=NOW) == []
+
+
+def test_delete_and_mark_dead(setup_db):
+    """Test entregados se borran y los descartados dejan de bloquear"""
+    repo = OutboxRepository()
+    repo.enqueue("a", {}, ["FCEE"], now=NOW)
+    repo.enqueue("b", {}, ["FCEE"], now=NOW)
+    repo.enqueue("c", {}, ["lab1"], now=NOW)
+    first, other = repo.claim(10, now=NOW)
+
+    repo.mark_dead(first, "boom")
+    assert repo.delete([other.id]) == 1
+
+    assert OutboxMessage.get_by_id(first.id).status == "dead"
+    assert [m.topic for m in repo.claim(10, now=NOW)] == ["b/FCEE"]
+    assert repo.count_pending() == 1
+
+
+def test_get_outbox_can_be_disabled(monkeypatch):
+    """Test IOT_OUTBOX=0 vuelve a la publicación directa"""
+    monkeypatch.setenv("IOT_OUTBOX", "0")
+    assert get_outbox() is None
+    monkeypatch.delenv("IOT_OUTBOX")
+    assert isinstance(get_outbox(), OutboxRepository)
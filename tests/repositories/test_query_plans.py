@@ -0,0 +1,163 @@
+# tests/repositories/test_query_plans.py
+"""
+Verifica con EXPLAIN QUERY PLAN (SQLite) que las consultas calientes sobre
+access_logs usan los índices declarados en shared/models.py.
+"""
+import importlib.util
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from shared.models import db, AccessLog, AccessUser, Device
+from repositories.access_log_repo import AccessLogRepository
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_log_repository():
+    """Carga LogRepository de lambda_alert_check sin mezclar sus paquetes con los de la raíz"""
+    path = os.path.join(ROOT, "lambda_alert_check", "repositories", "log_repository.py")
+    spec = importlib.util.spec_from_file_location("alert_check_log_repository", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.LogRepository
+
+
+class RecordingConnection:
+    """Conexión estilo psycopg2 que ejecuta sobre SQLite y registra el SQL"""
+
+    def __init__(self):
+        self.statements = []
+
+    @contextmanager
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql, params=()):
+                sql = sql.replace("%s", "?")
+                conn.statements.append((sql, params))
+                self._cursor = db.execute_sql(sql, params)
+
+            def fetchone(self):
+                return self._cursor.fetchone()
+
+        yield Cursor()
+
+
+@pytest.fixture
+def seeded_db():
+    """Dataset con suficiente volumen y variedad para que el planner prefiera índices"""
+    db.connect()
+    db.create_tables([AccessUser, Device, AccessLog])
+
+    for i in range(20):
+        Device.create(id_device=str(i), location=f"raspberry-{i}")
+    for i in range(50):
+        AccessUser.create(id=i + 1, cedula=f"{10000000 + i}")
+
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [{
+        "id": uuid.uuid4(),
+        "access_user": (n % 50) + 1 if n % 7 else None,
+        "device": str(n % 20),
+        "event": "denied" if n % 5 == 0 else "accepted",
+        "timestamp": base + timedelta(minutes=n),
+    } for n in range(5000)]
+    with db.atomic():
+        for start in range(0, len(rows), 500):
+            AccessLog.insert_many(rows[start:start + 500]).execute()
+    db.execute_sql("ANALYZE")
+
+    yield
+    db.drop_tables([AccessUser, Device, AccessLog])
+    db.close()
+
+
+@contextmanager
+def captured_sql():
+    """Registra las sentencias que la capa de repositorio envía a la BD"""
+    statements = []
+    original = db.execute_sql
+
+    def recording(sql, params=None, *args, **kwargs):
+        statements.append((sql, params or ()))
+        return original(sql, params, *args, **kwargs)
+
+    db.execute_sql = recording
+    try:
+        yield statements
+    finally:
+        db.execute_sql = original
+
+
+def access_logs_plan(sql, params):
+    """Líneas del plan que corresponden a la tabla access_logs"""
+    match = re.search(r'"access_logs" AS "(\w+)"', sql)
+    alias = match.group(1) if match else "access_logs"
+    plan = db.execute_sql("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row[-1] for row in plan
+            if re.match(rf"(SCAN|SEARCH) {alias}\b", row[-1])]
+
+
+def assert_uses_index(sql, params, index_name=None):
+    details = access_logs_plan(sql, params)
+    assert details, f"access_logs no aparece en el plan de: {sql}"
+    for detail in details:
+        assert "INDEX" in detail, f"full scan de access_logs: {detail}"
+        if index_name:
+            assert index_name in detail, f"se esperaba {index_name}: {detail}"
+
+
+@pytest.mark.parametrize("kwargs, index_name", [
+    ({"device_id": "3"}, "accesslog_device_id_timestamp"),
+    ({"user_id": 7}, "accesslog_access_user_id_timestamp"),
+    ({}, "accesslog_timestamp_id"),
+    ({"device_id": "3", "start": datetime(2024, 1, 2, tzinfo=timezone.utc),
+      "end": datetime(2024, 1, 3, tzinfo=timezone.utc)}, "accesslog_device_id_timestamp"),
+    ({"after": (datetime(2024, 1, 3, tzinfo=timezone.utc), str(uuid.uuid4()))},
+     "accesslog_timestamp_id"),
+])
+def test_get_logs_page_uses_index(seeded_db, kwargs, index_name):
+    """Test listados paginados usan el índice compuesto correspondiente"""
+    repo = AccessLogRepository()
+
+    with captured_sql() as statements:
+        repo.get_logs_page(limit=51, **kwargs)
+
+    assert len(statements) == 1
+    assert_uses_index(*statements[0], index_name=index_name)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"device_id": "3"},
+    {"user_id": 7},
+    {"device_id": "3", "event": "denied"},
+])
+def test_count_by_filters_uses_index(seeded_db, kwargs):
+    """Test conteos filtrados no recorren toda la tabla"""
+    repo = AccessLogRepository()
+
+    with captured_sql() as statements:
+        repo.count_by_filters(**kwargs)
+
+    assert_uses_index(*statements[-1])
+
+
+def test_count_denies_uses_partial_index(seeded_db):
+    """Test LogRepository.count_denies usa el índice parcial de denegados"""
+    LogRepository = load_log_repository()
+    conn = RecordingConnection()
+
+    count = LogRepository(conn).count_denies(
+        "5",
+        datetime(2024, 1, 1, tzinfo=timezone.utc),
+        datetime(2024, 1, 2, tzinfo=timezone.utc),
+    )
+
+    assert count > 0
+    sql, params = conn.statements[0]
+    assert_uses_index(sql, params, index_name="access_logs_denied_device_timestamp")
@@ -46,7 +46,7 @@ class MockAccessLogRepository:
         
         return filtered[:limit]
     
-    def count_by_filters(self, user_id=None, device_id=None):
+    def count_by_filters(self, user_id=None, device_id=None, **kwargs):
         filtered = self.logs
         
         if user_id is not None:
@@ -242,4 +242,127 @@ def test_get_logs_count(mock_logs):
     
     # Con múltiples filtros
     count = service.get_logs_count(user_id="66", device_id="1")
-    assert count == 1
\ No newline at end of file
+    assert count == 1
+
+
+class CountingRepository(MockAccessLogRepository):
+    """Repositorio con contadores y estimación configurables"""
+
+    def __init__(self, logs, cached=None, estimated=None):
+        super().__init__(logs)
+        self.cached = cached
+        self.estimated = estimated
+        self.exact_calls = []
+
+    def count_by_filters(self, **kwargs):
+        self.exact_calls.append(kwargs)
+        return super().count_by_filters(**kwargs)
+
+    def count_cached(self, user_id=None, device_id=None):
+        return self.cached
+
+    def estimate_count(self, **kwargs):
+        return self.estimated
+
+
+def test_count_logs_cached(mock_logs):
+    """Test modo cached usa los contadores sin COUNT(*)"""
+    repo = CountingRepository(mock_logs, cached=1234)
+    service = AccessLogService(repo)
+
+    assert service.count_logs(device_id="1", mode="cached") == (1234, "cached")
+    assert repo.exact_calls == []
+
+
+def test_count_logs_cached_falls_back_to_exact(mock_logs):
+    """Test cached con filtros de evento/fecha o sin contadores cae a exacto"""
+    repo = CountingRepository(mock_logs, cached=1234)
+    service = AccessLogService(repo)
+
+    assert service.count_logs(user_id="66", event="denied", mode="cached") == (2, "exact")
+
+    repo.cached = None
+    assert service.count_logs(mode="cached") == (4, "exact")
+
+
+def test_count_logs_estimated(mock_logs):
+    """Test modo estimated usa el planner y cae a exacto si no hay estimación"""
+    repo = CountingRepository(mock_logs, estimated=5000)
+    service = AccessLogService(repo)
+
+    assert service.count_logs(start="2024-01-01T00:00:00Z", mode="estimated") == (5000, "estimated")
+
+    repo.estimated = None
+    assert service.count_logs(mode="estimated") == (4, "exact")
+    assert repo.exact_calls[-1]["start"] is None
+
+
+def test_count_logs_invalid_mode(mock_logs):
+    """Test modo de conteo desconocido"""
+    service = AccessLogService(CountingRepository(mock_logs))
+
+    with pytest.raises(ValueError, match="count debe ser uno de"):
+        service.count_logs(mode="approx")
+
+
+class PagingRepository:
+    """Repositorio mínimo que registra los argumentos de get_logs_page"""
+
+    def __init__(self, logs):
+        self.logs = logs
+        self.calls = []
+
+    def get_logs_page(self, **kwargs):
+        self.calls.append(kwargs)
+        logs = self.logs
+        if kwargs["after"] is not None:
+            after_ts, _ = kwargs["after"]
+            logs = [log for log in logs if log.timestamp < after_ts]
+        return logs[:kwargs["limit"]]
+
+
+def test_get_logs_page_next_cursor(mock_logs):
+    """Test la página incluye next_cursor solo si hay más resultados"""
+    repo = PagingRepository(mock_logs)
+    service = AccessLogService(repo)
+
+    first = service.get_logs_page(limit="3")
+    assert len(first["items"]) == 3
+    assert first["next_cursor"] is not None
+    assert repo.calls[0]["limit"] == 4  # uno extra para detectar más páginas
+
+    second = service.get_logs_page(limit="3", cursor=first["next_cursor"])
+    assert len(second["items"]) == 1
+    assert second["next_cursor"] is None
+    assert repo.calls[1]["after"] == (mock_logs[2].timestamp, str(mock_logs[2].id))
+
+
+def test_get_logs_page_parses_filters(mock_logs):
+    """Test conversión de from/to, event y user_id"""
+    repo = PagingRepository(mock_logs)
+    service = AccessLogService(repo)
+
+    service.get_logs_page(user_id="66", event="denied",
+                          start="2024-01-01T00:00:00Z", end="2024-01-09T00:00:00Z")
+
+    call = repo.calls[0]
+    assert call["user_id"] == 66
+    assert call["event"] == "denied"
+    assert call["start"] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert call["end"] == datetime(2024, 1, 9, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"event": "other"}, "event"),
+    ({"start": "ayer"}, "from"),
+    ({"limit": "0"}, "limit"),
+    ({"limit": "abc"}, "limit"),
+    ({"cursor": "no-es-un-cursor"}, "cursor"),
+])
+def test_get_logs_page_invalid_params(mock_logs, kwargs, message):
+    """Test parámetros inválidos lanzan ValueError"""
+    service = AccessLogService(PagingRepository(mock_logs))
+
+    with pytest.raises(ValueError) as excinfo:
+        service.get_logs_page(**kwargs)
+    assert message in str(excinfo.value)
@@ -1,19 +1,28 @@
 # tests/services/test_access_service.py
 
+import uuid as uuidlib
+
 import pytest
 from services.access_service import AccessService
 
 
+def _id(name):
+    """UUID estable a partir de un nombre legible"""
+    return str(uuidlib.uuid5(uuidlib.NAMESPACE_OID, name))
+
+
 class DummyLogRepo:
     def __init__(self, exists=False):
         self._exists = exists
         self.inserted = False
 
     def exists(self, log_id):
-        return self._exists
+        raise AssertionError("ingest no debe hacer la verificación previa")
 
-    def insert(self, *args, **kwargs):
-        self.inserted = True
+    def ingest(self, *args, **kwargs):
+        # Emula ON CONFLICT DO NOTHING: False si ya existía
+        self.inserted = not self._exists
+        return self.inserted
 
 
 class DummyDeviceRepo:
@@ -39,14 +48,14 @@ def test_ingest_success():
     svc = AccessService(log_repo, dev_repo, user_repo)
 
     payload = {
-        "uuid": "abc-111",
+        "uuid": _id("abc-111"),
         "access_user_id": "12345678",
         "device_name": "Puerta X",
         "event": "accepted",
         "timestamp": "2025-06-03T18:00:00Z"
     }
 
-    svc.ingest(payload)
+    assert svc.ingest(payload) == "inserted"
     assert log_repo.inserted is True
 
 
@@ -57,16 +66,16 @@ def test_ingest_duplicate():
     svc = AccessService(log_repo, dev_repo, user_repo)
 
     payload = {
-        "uuid": "dup-111",
+        "uuid": _id("dup-111"),
         "access_user_id": "12345678",
         "device_name": "Puerta X",
         "event": "accepted",
         "timestamp": "2025-06-03T18:00:00Z"
     }
 
-    with pytest.raises(ValueError) as excinfo:
-        svc.ingest(payload)
-    assert "Ya existe un log" in str(excinfo.value)
+    # Reentrega QoS 1: no-op en lugar de error
+    assert svc.ingest(payload) == "duplicate"
+    assert log_repo.inserted is False
 
 
 def test_ingest_invalid_event():
@@ -76,7 +85,7 @@ def test_ingest_invalid_event():
     svc = AccessService(log_repo, dev_repo, user_repo)
 
     payload = {
-        "uuid": "bad-evt",
+        "uuid": _id("bad-evt"),
         "access_user_id": "12345678",
         "device_name": "Puerta X",
         "event": "invalid",
@@ -95,7 +104,7 @@ def test_ingest_invalid_device():
     svc = AccessService(log_repo, dev_repo, user_repo)
 
     payload = {
-        "uuid": "no-dev",
+        "uuid": _id("no-dev"),
         "access_user_id": "12345678",
         "device_name": "Puerta Inexistente",
         "event": "accepted",
@@ -114,7 +123,7 @@ def test_ingest_user_not_found():
     svc = AccessService(log_repo, dev_repo, user_repo)
 
     payload = {
-        "uuid": "user-not",
+        "uuid": _id("user-not"),
         "access_user_id": "00000000",
         "device_name": "Puerta X",
         "event": "accepted",
@@ -124,3 +133,95 @@ def test_ingest_user_not_found():
     with pytest.raises(ValueError) as excinfo:
         svc.ingest(payload)
     assert "No existe usuario" in str(excinfo.value)
+
+
+class BatchLogRepo:
+    def __init__(self, existing=()):
+        self._existing = set(existing)
+        self.rows = []
+
+    def bulk_ingest(self, logs):
+        self.rows.extend(logs)
+        return {log["uuid"] for log in logs if log["uuid"] not in self._existing}
+
+
+class BatchDeviceRepo:
+    def __init__(self, devices):
+        self._devices = devices
+        self.calls = 0
+
+    def get_ids_by_locations(self, locations):
+        self.calls += 1
+        return {loc: self._devices[loc] for loc in locations if loc in self._devices}
+
+
+class BatchUserRepo:
+    def __init__(self, users):
+        self._users = users
+        self.calls = 0
+
+    def get_ids_by_cedulas(self, cedulas):
+        self.calls += 1
+        return {c: self._users[c] for c in cedulas if c in self._users}
+
+
+def _payload(name, device="Puerta X", cedula="12345678", event="accepted"):
+    return {
+        "uuid": _id(name),
+        "access_user_id": cedula,
+        "device_name": device,
+        "event": event,
+        "timestamp": "2025-06-03T18:00:00Z"
+    }
+
+
+def test_ingest_batch_reports_per_record():
+    log_repo = BatchLogRepo(existing={_id("dup")})
+    dev_repo = BatchDeviceRepo({"Puerta X": "1"})
+    user_repo = BatchUserRepo({"12345678": 42})
+    svc = AccessService(log_repo, dev_repo, user_repo)
+
+    results = svc.ingest_batch([
+        _payload("ok-1"),
+        _payload("dup"),
+        _payload("no-dev", device="Puerta Z"),
+        _payload("no-user", cedula="00000000"),
+        _payload("denied-1", cedula="UNKNOWN", event="denied"),
+        _payload("bad-evt", event="invalid"),
+        _payload("ok-1"),  # repetido dentro del lote
+    ])
+
+    assert [r["status"] for r in results] == [
+        "inserted", "duplicate", "error", "error", "inserted", "error", "duplicate"]
+    assert "No existe dispositivo" in results[2]["error"]
+    assert "No existe usuario" in results[3]["error"]
+    assert "Tipo de evento inválido" in results[5]["error"]
+
+    # Una consulta agrupada por tipo y un único insert
+    assert dev_repo.calls == 1
+    assert user_repo.calls == 1
+    assert [r["uuid"] for r in log_repo.rows] == [_id("ok-1"), _id("dup"), _id("denied-1")]
+    assert log_repo.rows[0]["access_user_id"] == 42
+    assert log_repo.rows[2]["access_user_id"] is None
+
+
+def test_ingest_invalid_uuid():
+    svc = AccessService(DummyLogRepo(), DummyDeviceRepo(device_id=1), DummyUserRepo(user_id=2))
+    payload = dict(_payload("x"), uuid="no-es-un-uuid")
+
+    with pytest.raises(ValueError) as excinfo:
+        svc.ingest(payload)
+    assert "UUID inválido" in str(excinfo.value)
+
+
+def test_ingest_batch_invalid_uuid_does_not_poison_batch():
+    """Un uuid mal formado queda como error propio y no llega al INSERT"""
+    log_repo = BatchLogRepo()
+    svc = AccessService(log_repo, BatchDeviceRepo({"Puerta X": "1"}),
+                        BatchUserRepo({"12345678": 42}))
+
+    results = svc.ingest_batch([_payload("ok-1"), dict(_payload("x"), uuid="abc-123")])
+
+    assert [r["status"] for r in results] == ["inserted", "error"]
+    assert "UUID inválido" in results[1]["error"]
+    assert [r["uuid"] for r in log_repo.rows] == [_id("ok-1")]
@@ -3,6 +3,8 @@ import pytest
 from unittest.mock import MagicMock, patch, call
 from services.access_users_service import AccessUserService
 from repositories.access_user_repo import AccessUserRepository
+from repositories.outbox_repo import OutboxRepository
+from shared.models import OutboxMessage, db
 
 
 class MockUser:
@@ -78,8 +80,11 @@ def test_delete_user_success(mock_repository, mock_aws_clients, monkeypatch):
     # Verificar notificaciones IoT
     assert mock_aws_clients['iot'].publish.call_count == 2
     calls = mock_aws_clients['iot'].publish.call_args_list
-    assert calls[0][1]['topic'] == "access/users/delete/RaspberryPi-001"
-    assert calls[1][1]['topic'] == "access/users/delete/RaspberryPi-002"
+    # El fan-out es concurrente: el orden entre dispositivos no está garantizado
+    assert sorted(c[1]['topic'] for c in calls) == [
+        "access/users/delete/RaspberryPi-001",
+        "access/users/delete/RaspberryPi-002",
+    ]
 
     # Verificar resultado
     assert result['message'] == "User and image deleted successfully"
@@ -171,3 +176,77 @@ def test_delete_user_iot_error_continues(mock_repository, mock_aws_clients, monk
     result = service.delete_user("1")
 
     assert result['message'] == "User and image deleted successfully"
+
+
+def test_delete_user_removes_from_face_index(mock_repository, mock_aws_clients):
+    """Test la baja también quita el embedding del índice de rostros"""
+    mock_repository.get_user_with_image.return_value = MockUser(1, "12345678")
+    mock_repository.get_user_devices_locations.return_value = []
+    mock_repository.delete_user_and_related_data.return_value = True
+    face_index = MagicMock()
+
+    service = AccessUserService(mock_repository, face_index=face_index)
+    service.delete_user("1")
+
+    face_index.remove.assert_called_once_with(1)
+
+
+@pytest.fixture
+def outbox():
+    """Outbox real sobre la BD de tests"""
+    db.connect()
+    db.create_tables([OutboxMessage])
+    yield OutboxRepository()
+    db.drop_tables([OutboxMessage])
+    db.close()
+
+
+def test_delete_user_with_outbox_publishes_after_commit(mock_repository, mock_aws_clients,
+                                                        outbox, monkeypatch):
+    """Test con outbox la baja se encola en la transacción y se publica al confirmar"""
+    monkeypatch.setenv("S3_BUCKET", "test-bucket")
+    mock_repository.get_user_with_image.return_value = MockUser(1, "12345678")
+    mock_repository.get_user_devices_locations.return_value = ["RaspberryPi-001"]
+    mock_repository.delete_user_and_related_data.side_effect = \
+        lambda user_id: db.in_transaction()
+
+    service = AccessUserService(mock_repository, outbox=outbox)
+    result = service.delete_user("1")
+
+    mock_aws_clients['iot'].publish.assert_called_once()
+    assert mock_aws_clients['iot'].publish.call_args[1]["topic"] == \
+        "access/users/delete/RaspberryPi-001"
+    assert result['notification_failures'] == []
+    assert outbox.count_pending() == 0
+
+
+def test_delete_user_with_outbox_failed_publish_is_kept(mock_repository, mock_aws_clients,
+                                                        outbox, monkeypatch):
+    """Test si IoT falla la baja queda en el outbox para el drainer"""
+    monkeypatch.setenv("S3_BUCKET", "test-bucket")
+    mock_repository.get_user_with_image.return_value = MockUser(1, "12345678")
+    mock_repository.get_user_devices_locations.return_value = ["RaspberryPi-001"]
+    mock_repository.delete_user_and_related_data.return_value = True
+    mock_aws_clients['iot'].publish.side_effect = Exception("IoT Error")
+
+    service = AccessUserService(mock_repository, outbox=outbox)
+    result = service.delete_user("1")
+
+    assert result['notification_failures'] == ["RaspberryPi-001"]
+    message = OutboxMessage.get()
+    assert message.topic == "access/users/delete/RaspberryPi-001"
+    assert message.attempts == 1 and message.last_error == "IoT Error"
+
+
+def test_delete_user_with_outbox_not_enqueued_on_failure(mock_repository, mock_aws_clients):
+    """Test si la baja en BD falla no queda nada encolado"""
+    mock_repository.get_user_with_image.return_value = MockUser(1, "12345678")
+    mock_repository.get_user_devices_locations.return_value = ["RaspberryPi-001"]
+    mock_repository.delete_user_and_related_data.return_value = False
+    outbox = MagicMock()
+
+    service = AccessUserService(mock_repository, outbox=outbox)
+    with pytest.raises(Exception):
+        service.delete_user("1")
+
+    outbox.enqueue_claimed.assert_not_called()
@@ -0,0 +1,95 @@
+# tests/services/test_access_user_service_register.py
+import base64
+import sys
+import types
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from services.access_users_service import AccessUserService, DuplicateFaceError
+from services.face_match_service import FaceIndex
+from repositories.access_user_repo import AccessUserRepository
+
+EXISTING = np.random.default_rng(1).normal(0, 0.1, size=(3, 128)).astype(np.float32)
+
+
+class MockUser:
+    def __init__(self, id, cedula, rfid):
+        self.id = id
+        self.first_name = "Ana"
+        self.last_name = "Pérez"
+        self.cedula = cedula
+        self.rfid = rfid
+
+
+@pytest.fixture
+def face_embedding(monkeypatch):
+    """Reemplaza services.face_service (OpenCV/dlib) por un embedding fijo"""
+    holder = {"embedding": EXISTING[0].tolist()}
+    module = types.ModuleType("services.face_service")
+    module.extract_embedding = lambda image_bytes: holder["embedding"]
+    monkeypatch.setitem(sys.modules, "services.face_service", module)
+    return holder
+
+
+@pytest.fixture
+def service(face_embedding, monkeypatch):
+    monkeypatch.setattr("services.storage_service.upload_jpeg", lambda data: "https://bucket/u.jpg")
+    repo = MagicMock(spec=AccessUserRepository)
+    repo.exists.return_value = False
+    repo.exists_rfid.return_value = False
+    repo.get_by_id.side_effect = lambda user_id: MockUser(user_id, "1", "R")
+    repo.create.return_value = MockUser(10, "55555555", "RFID-10")
+
+    rows = [(user_id, e.tolist()) for user_id, e in enumerate(EXISTING, start=1)]
+    index = FaceIndex(lambda: iter(rows))
+    with patch("boto3.client"):
+        service = AccessUserService(repo, face_index=index)
+    return service
+
+
+def body():
+    return {
+        "firstName": "Ana", "lastName": "Pérez", "cedula": "55555555",
+        "rfid": "RFID-10", "image": base64.b64encode(b"jpeg").decode(),
+    }
+
+
+def test_duplicate_face_rejected(service, face_embedding):
+    """Test el mismo rostro con otra cédula se rechaza con el usuario existente"""
+    face_embedding["embedding"] = (EXISTING[1] + 0.001).tolist()
+
+    with pytest.raises(DuplicateFaceError) as exc:
+        service.create_user(body())
+
+    assert exc.value.user_id == 2
+    assert exc.value.distance < 0.05
+    assert isinstance(exc.value, LookupError)
+    service.access_user_repo.create.assert_not_called()
+
+
+def test_new_face_registered_and_indexed(service, face_embedding):
+    """Test un rostro nuevo se registra y queda en el índice"""
+    face_embedding["embedding"] = np.full(128, 0.5).tolist()
+
+    result = service.create_user(body())
+
+    assert result["user_id"] == 10
+    assert service.face_index.identify(face_embedding["embedding"])[0] == 10
+
+
+def test_stale_match_is_dropped(service, face_embedding):
+    """Test si el usuario encontrado ya no existe se quita del índice y se sigue"""
+    face_embedding["embedding"] = EXISTING[2].tolist()
+    service.access_user_repo.get_by_id.side_effect = lambda user_id: None
+
+    result = service.create_user(body())
+
+    assert result["user_id"] == 10
+    assert len(service.face_index) == 3  # 3 originales - 1 obsoleto + el nuevo
+
+
+def test_tolerance_zero_disables_check(service, face_embedding):
+    """Test FACE_DUPLICATE_TOLERANCE=0 desactiva el control"""
+    service.face_duplicate_tolerance = 0
+
+    assert service.create_user(body())["user_id"] == 10
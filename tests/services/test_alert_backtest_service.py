@@ -0,0 +1,104 @@
+# tests/services/test_alert_backtest_service.py
+import numpy as np
+import pytest
+from datetime import datetime, timedelta, timezone
+from services.alert_backtest_service import AlertBacktestService, simulate
+
+T0 = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+class MockAccessLogRepository:
+    """Mock del repositorio: denies (device_id, timestamp) ya ordenados"""
+    def __init__(self, rows):
+        self.rows = sorted(rows)
+        self.calls = []
+
+    def iter_deny_times(self, start=None, end=None, device_id=None):
+        self.calls.append((start, end, device_id))
+        return iter(self.rows)
+
+
+def brute_force(times_by_device, thresholds, windows):
+    """Reglas de AlertService evaluadas deny por deny"""
+    alerts = np.zeros((len(times_by_device), len(windows), len(thresholds)), dtype=int)
+    incidents = np.zeros_like(alerts)
+    for d, times in enumerate(times_by_device):
+        for w, window in enumerate(windows):
+            previous = 0
+            for i, t in enumerate(times):
+                # Igual que el BETWEEN de count_denies
+                count = sum(1 for u in times if t - window <= u <= t)
+                for k, threshold in enumerate(thresholds):
+                    if count >= threshold:
+                        alerts[d, w, k] += 1
+                        if previous < threshold:
+                            incidents[d, w, k] += 1
+                previous = count
+    return alerts, incidents
+
+
+def test_simulate_matches_brute_force():
+    """Test la versión vectorizada coincide con evaluar cada deny"""
+    rng = np.random.default_rng(7)
+    times_by_device = [np.sort(rng.uniform(0, 3600, size)).round() for size in (80, 1, 150)]
+    times = np.concatenate(times_by_device)
+    starts = np.array([0, 80, 81])
+    thresholds, windows = [1, 3, 5, 10], [30, 120, 600]
+
+    alerts, incidents = simulate(times, starts, thresholds, windows)
+    expected_alerts, expected_incidents = brute_force(times_by_device, thresholds, windows)
+
+    np.testing.assert_array_equal(alerts, expected_alerts)
+    np.testing.assert_array_equal(incidents, expected_incidents)
+
+
+def test_simulate_counts_tied_timestamps():
+    """Test denies con el mismo timestamp cuentan todos, como el BETWEEN"""
+    times_by_device = [np.array([0.0, 10.0, 10.0, 10.0, 70.0])]
+    times = np.concatenate(times_by_device)
+    starts = np.array([0])
+
+    alerts, incidents = simulate(times, starts, [3, 4], [60])
+    expected_alerts, expected_incidents = brute_force(times_by_device, [3, 4], [60])
+
+    # Los tres denies de t=10 ven 4 en [t-60, t]; el de t=70 ve 4 (10, 10, 10, 70)
+    np.testing.assert_array_equal(alerts, [[[4, 4]]])
+    np.testing.assert_array_equal(alerts, expected_alerts)
+    np.testing.assert_array_equal(incidents, expected_incidents)
+
+
+def test_simulate_empty():
+    """Test sin denies todo es cero"""
+    alerts, incidents = simulate(np.zeros(0), np.zeros(0, dtype=int), [5], [60])
+
+    assert alerts.shape == (0, 1, 1)
+    assert incidents.sum() == 0
+
+
+def test_backtest_grid_per_device():
+    """Test el resultado agrega por combinación y detalla por dispositivo"""
+    rows = [("1", T0 + timedelta(seconds=s)) for s in range(10)]
+    rows += [("2", T0 + timedelta(hours=1, seconds=s * 100)) for s in range(3)]
+    repo = MockAccessLogRepository(rows)
+    service = AlertBacktestService(repo)
+
+    result = service.backtest([5], [60, 300], start=T0)
+
+    assert result["denies"] == 13
+    assert result["grid"] == [
+        {"threshold": 5, "window_seconds": 60, "alerts": 6, "incidents": 1},
+        {"threshold": 5, "window_seconds": 300, "alerts": 6, "incidents": 1},
+    ]
+    assert [d["device_id"] for d in result["devices"]] == ["1", "2"]
+    assert result["devices"][1]["denies"] == 3
+    assert repo.calls == [(T0, None, None)]
+
+
+def test_backtest_invalid_params():
+    """Test parámetros inválidos"""
+    service = AlertBacktestService(MockAccessLogRepository([]))
+
+    with pytest.raises(ValueError, match="At least one threshold"):
+        service.backtest([], [60])
+    with pytest.raises(ValueError, match="Thresholds must be at least 1"):
+        service.backtest([0], [60])
@@ -21,6 +21,7 @@ class MockConfigurationRepository:
         self.updated_values = {}  # Para trackear actualizaciones
         self.existing_configs = {c.name_config: c.value for c in self.configs}  # Configuraciones existentes
         self.should_fail = False  # Para simular fallos
+        self.version_bumps = 0
     
     def get_multiple_by_names(self, names, device_id=None):
         """Obtiene configuraciones por nombres (ignora device_id porque son globales)"""
@@ -42,6 +43,10 @@ class MockConfigurationRepository:
             self.updated_values[name] = value
             return True
         return False
+    
+    def bump_version(self):
+        self.version_bumps += 1
+        return str(self.version_bumps)
 
 
 @pytest.fixture
@@ -154,6 +159,8 @@ def test_update_alert_parameters_success():
     # Verificar que se actualizaron en el repo
     assert repo.updated_values['max_denied_attempts'] == "10"
     assert repo.updated_values['window_seconds'] == "300"
+    # Y se invalidaron las cachés de configuración
+    assert repo.version_bumps == 1
 
 
 def test_update_alert_parameters_missing_params():
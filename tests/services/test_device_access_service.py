@@ -2,6 +2,8 @@
 import pytest
 from unittest.mock import MagicMock, patch, call
 from services.device_access_service import DeviceAccessService
+from repositories.outbox_repo import OutboxRepository
+from shared.models import OutboxMessage, db
 
 
 class MockUser:
@@ -50,19 +52,14 @@ def test_update_user_device_access_success(mock_repositories, mock_iot_client, m
     user = MockUser(1, "Juan", "Pérez", "12345678", "RFID123", "https://bucket/user.jpg", "[0.1,0.2]")
     user_repo.get_by_id.return_value = user
     
-    device1 = MockDevice("1", "raspberry-tic2")
-    device2 = MockDevice("2", "raspberry-lab1")
-    device3 = MockDevice("3", "FCEE")
-    
-    def get_by_location_side_effect(location):
-        devices = {
-            "raspberry-tic2": device1,
-            "raspberry-lab1": device2,
-            "FCEE": device3
-        }
-        return devices.get(location)
-    
-    device_repo.get_by_location.side_effect = get_by_location_side_effect
+    devices = {
+        "raspberry-tic2": "1",
+        "raspberry-lab1": "2",
+        "FCEE": "3"
+    }
+    device_repo.get_ids_by_locations.side_effect = lambda locations, **kwargs: {
+        loc: devices[loc] for loc in locations if loc in devices
+    }
     
     mapping_repo.bulk_update_user_devices.return_value = (
         ["raspberry-tic2"],  # agregados
@@ -82,8 +79,10 @@ def test_update_user_device_access_success(mock_repositories, mock_iot_client, m
     
     # Verificar llamadas
     user_repo.get_by_id.assert_called_once_with(1)
-    device_repo.get_by_location.assert_any_call("raspberry-tic2")
-    device_repo.get_by_location.assert_any_call("FCEE")
+    # Todos los nombres se resuelven en una sola consulta
+    device_repo.get_ids_by_locations.assert_called_once_with(
+        ["raspberry-tic2", "FCEE"], recheck_missing=True)
+    device_repo.get_by_location.assert_not_called()
     
     mapping_repo.bulk_update_user_devices.assert_called_once_with(
         1,
@@ -97,13 +96,13 @@ def test_update_user_device_access_success(mock_repositories, mock_iot_client, m
     # Verificar notificación de eliminar
     delete_call = mock_iot_client.publish.call_args_list[0]
     assert delete_call[1]['topic'] == "access/users/delete/FCEE"
-    assert '"cedula": "12345678"' in delete_call[1]['payload']
+    assert '"cedula": "12345678"' in delete_call[1]['payload'].decode()
     
     # Verificar notificación de agregar
     add_call = mock_iot_client.publish.call_args_list[1]
     assert add_call[1]['topic'] == "access/users/new/raspberry-tic2"
-    assert '"cedula": "12345678"' in add_call[1]['payload']
-    assert '"first_name": "Juan"' in add_call[1]['payload']
+    assert '"cedula": "12345678"' in add_call[1]['payload'].decode()
+    assert '"first_name": "Juan"' in add_call[1]['payload'].decode()
     
     # Verificar resultado
     assert result['message'] == "User device access updated"
@@ -152,8 +151,7 @@ def test_update_user_device_access_device_not_found(mock_repositories, mock_iot_
     user_repo.get_by_id.return_value = user
     
     # Solo device1 existe
-    device1 = MockDevice("1", "raspberry-tic2")
-    device_repo.get_by_location.side_effect = lambda loc: device1 if loc == "raspberry-tic2" else None
+    device_repo.get_ids_by_locations.return_value = {"raspberry-tic2": "1"}
     
     mapping_repo.bulk_update_user_devices.return_value = (["raspberry-tic2"], [])
     
@@ -187,7 +185,7 @@ def test_update_user_device_access_no_changes(mock_repositories, mock_iot_client
     user = MockUser(1, "Juan", "Pérez", "12345678")
     user_repo.get_by_id.return_value = user
     
-    device_repo.get_by_location.return_value = None  # No encuentra ningún dispositivo
+    device_repo.get_ids_by_locations.return_value = {}  # No encuentra ningún dispositivo
     mapping_repo.bulk_update_user_devices.return_value = ([], [])
     
     service = DeviceAccessService(user_repo, device_repo, mapping_repo)
@@ -199,4 +197,27 @@ def test_update_user_device_access_no_changes(mock_repositories, mock_iot_client
     mock_iot_client.publish.assert_not_called()
     
     assert result['added'] == []
-    assert result['removed'] == []
\ No newline at end of file
+    assert result['removed'] == []
+
+def test_update_user_device_access_with_outbox(mock_repositories, mock_iot_client):
+    """Test con outbox baja y alta se encolan y se publican, en ese orden, al confirmar"""
+    user_repo, device_repo, mapping_repo = mock_repositories
+    user_repo.get_by_id.return_value = MockUser(1, "Juan", "Pérez", "12345678", "RFID123")
+    device_repo.get_ids_by_locations.side_effect = lambda locs, **kwargs: {loc: loc for loc in locs}
+    mapping_repo.bulk_update_user_devices.return_value = (["FCEE"], ["FCEE"])
+    db.connect()
+    db.create_tables([OutboxMessage])
+    outbox = OutboxRepository()
+
+    try:
+        service = DeviceAccessService(user_repo, device_repo, mapping_repo, outbox=outbox)
+        result = service.update_user_device_access("1", ["FCEE"], ["FCEE"])
+        pending = outbox.count_pending()
+    finally:
+        db.drop_tables([OutboxMessage])
+        db.close()
+
+    topics = [c[1]["topic"] for c in mock_iot_client.publish.call_args_list]
+    assert topics == ["access/users/delete/FCEE", "access/users/new/FCEE"]
+    assert result["notification_failures"] == []
+    assert pending == 0
@@ -0,0 +1,162 @@
+# tests/services/test_device_snapshot_service.py
+import base64
+import gzip
+import io
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from shared.embeddings import to_bytes
+from shared.models import db, AccessUser, Device, DeviceUserMapping, DeviceUserChange
+from repositories.device_repo import DeviceRepository
+from repositories.device_user_mapping_repo import DeviceUserMappingRepository
+from services.device_snapshot_service import DeviceSnapshotService
+
+
+class FakeStorage:
+    """storage_service en memoria"""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def put_object(self, key, body, content_type=None):
+        self.objects[key] = body
+
+    def open_object(self, key):
+        return io.BytesIO(self.objects[key]) if key in self.objects else None
+
+    def MultipartUpload(self, key, content_type=None):
+        storage = self
+
+        class Upload:
+            def __init__(self):
+                self.buffer = bytearray()
+
+            def write(self, data):
+                self.buffer.extend(data)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, exc_type, exc, tb):
+                if exc_type is None:
+                    storage.objects[key] = bytes(self.buffer)
+                    storage.uploads += 1
+                return False
+
+        return Upload()
+
+    def read_snapshot(self, key):
+        lines = gzip.decompress(self.objects[key]).decode("utf-8").splitlines()
+        return json.loads(lines[0]), [json.loads(line) for line in lines[1:]]
+
+
+@pytest.fixture
+def mapping_repo(monkeypatch):
+    monkeypatch.setenv("DEVICE_SYNC_SETTLE_SECONDS", "0")
+    db.connect()
+    db.create_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
+    for i in range(1, 4):
+        AccessUser.create(id=i, cedula=f"{i}" * 7, rfid=f"RFID{i}", first_name="N",
+                          face_embedding_bin=to_bytes([float(i)] * 128))
+    Device.create(id_device="1", location="FCEE")
+    yield DeviceUserMappingRepository()
+    db.drop_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
+    db.close()
+
+
+def make_service(storage, outbox=None):
+    return DeviceSnapshotService(DeviceRepository(), DeviceUserMappingRepository(),
+                                 storage=storage, outbox=outbox)
+
+
+def test_full_snapshot_is_gzip_ndjson(mapping_repo):
+    """Test sin snapshot previo se arma desde los mappings actuales"""
+    mapping_repo.add_device_access(2, "1")
+    mapping_repo.add_device_access(1, "1")
+    storage = FakeStorage()
+    outbox = MagicMock()
+
+    result = make_service(storage, outbox).build("FCEE")
+
+    revision = mapping_repo.current_revision()
+    assert result["key"] == f"snapshots/devices/1/{revision}.ndjson.gz"
+    assert result["count"] == 2 and result["incremental"] is False
+    header, records = storage.read_snapshot(result["key"])
+    assert header == {"device": "FCEE", "revision": revision}
+    assert [r["id"] for r in records] == [1, 2]
+    assert set(records[0]) == {"id", "cedula", "rfid", "face_embedding_b64"}
+    assert base64.b64decode(records[0]["face_embedding_b64"]) == to_bytes([1.0] * 128)
+    assert json.loads(storage.objects["snapshots/devices/1/latest.json"])["key"] == result["key"]
+    # El aviso MQTT solo lleva la key y la revisión
+    outbox.enqueue.assert_called_once_with(
+        "access/users/snapshot", {"key": result["key"], "revision": revision}, ["FCEE"])
+
+
+def test_full_snapshot_reads_every_page(mapping_repo, monkeypatch):
+    """Test el snapshot completo recorre todas las páginas del reset"""
+    monkeypatch.setenv("DEVICE_SYNC_PAGE_SIZE", "2")
+    for user_id in (3, 1, 2):
+        mapping_repo.add_device_access(user_id, "1")
+    storage = FakeStorage()
+
+    result = make_service(storage).build("FCEE", notify=False)
+
+    assert result["count"] == 3 and result["revision"] == mapping_repo.current_revision()
+    _, records = storage.read_snapshot(result["key"])
+    assert [r["id"] for r in records] == [1, 2, 3]
+
+
+def test_incremental_snapshot_applies_deltas(mapping_repo):
+    """Test el siguiente snapshot parte del anterior más los cambios"""
+    mapping_repo.add_device_access(1, "1")
+    mapping_repo.add_device_access(2, "1")
+    storage = FakeStorage()
+    service = make_service(storage)
+    first = service.build("FCEE", notify=False)
+
+    mapping_repo.remove_device_access(1, "1")
+    mapping_repo.add_device_access(3, "1")
+    second = service.build("FCEE", notify=False)
+
+    assert second["incremental"] is True
+    assert second["revision"] > first["revision"]
+    _, records = storage.read_snapshot(second["key"])
+    assert [r["id"] for r in records] == [2, 3]
+
+
+def test_unchanged_snapshot_is_reused(mapping_repo):
+    """Test sin cambios no se vuelve a subir el snapshot"""
+    mapping_repo.add_device_access(1, "1")
+    storage = FakeStorage()
+    service = make_service(storage)
+
+    first = service.build("FCEE", notify=False)
+    second = service.build("FCEE", notify=False)
+
+    assert second["reused"] is True
+    assert second["key"] == first["key"]
+    assert storage.uploads == 1
+
+
+def test_missing_previous_snapshot_rebuilds(mapping_repo):
+    """Test si el snapshot apuntado ya no existe se arma completo"""
+    mapping_repo.add_device_access(1, "1")
+    storage = FakeStorage()
+    service = make_service(storage)
+    first = service.build("FCEE", notify=False)
+    del storage.objects[first["key"]]
+
+    mapping_repo.add_device_access(2, "1")
+    result = service.build("FCEE", notify=False)
+
+    assert result["incremental"] is False
+    assert result["count"] == 2
+
+
+def test_unknown_device(mapping_repo):
+    """Test dispositivo inexistente"""
+    with pytest.raises(LookupError):
+        make_service(FakeStorage()).build("desconocido")
@@ -0,0 +1,183 @@
+# tests/services/test_device_sync_service.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared.models import db, AccessUser, Device, DeviceUserMapping, DeviceUserChange
+from repositories.device_repo import DeviceRepository
+from repositories.device_user_mapping_repo import DeviceUserMappingRepository
+from services.device_sync_service import DeviceSyncService
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime.utcnow() + timedelta(minutes=1)
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def setup_db():
+    db.connect()
+    db.create_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
+    for i, cedula in enumerate(["1111111", "2222222", "3333333"], start=1):
+        AccessUser.create(id=i, first_name=f"U{i}", last_name="X", cedula=cedula,
+                          rfid=f"RFID{i}", face_embedding="[0.5]")
+    Device.create(id_device="1", location="FCEE")
+    Device.create(id_device="2", location="lab1")
+    yield
+    db.drop_tables([AccessUser, Device, DeviceUserMapping, DeviceUserChange])
+    db.close()
+
+
+@pytest.fixture
+def mapping_repo(setup_db):
+    return DeviceUserMappingRepository()
+
+
+def make_service(page_size=100, clock=None):
+    return DeviceSyncService(DeviceRepository(), DeviceUserMappingRepository(),
+                             page_size=page_size, settle_seconds=5, clock=clock or Clock())
+
+
+def test_snapshot_for_fresh_device(mapping_repo):
+    """Test since=0 devuelve todos los usuarios con acceso y la revisión actual"""
+    mapping_repo.add_device_access(1, "1")
+    mapping_repo.add_device_access(2, "1")
+    mapping_repo.add_device_access(3, "2")
+
+    result = make_service().get_changes("FCEE", 0)
+
+    assert result["reset"] is True
+    assert [u["cedula"] for u in result["upserts"]] == ["1111111", "2222222"]
+    assert result["upserts"][0]["face_embedding"] == "[0.5]"
+    assert result["revision"] == mapping_repo.current_revision()
+    assert result["has_more"] is False
+
+
+def test_snapshot_pagination_keeps_first_revision(mapping_repo):
+    """Test el snapshot se pagina por usuario y todas las páginas llevan la misma revisión"""
+    for user_id in (1, 2, 3):
+        mapping_repo.add_device_access(user_id, "1")
+    service = make_service(page_size=2)
+
+    first = service.get_changes("FCEE", 0)
+    assert first["reset"] is True and first["has_more"] is True
+    assert [u["id"] for u in first["upserts"]] == [1, 2]
+    revision = first["revision"]
+
+    mapping_repo.add_device_access(1, "2")  # cambio entre páginas
+    second = service.get_changes("FCEE", revision, first["after"])
+    assert second["reset"] is False and second["has_more"] is False
+    assert [u["id"] for u in second["upserts"]] == [3]
+    assert second["revision"] == revision and second["after"] is None
+
+
+def test_pruned_revision_gets_reset(mapping_repo):
+    """Test pedir desde una revisión ya purgada devuelve un snapshot"""
+    mapping_repo.add_device_access(1, "1")
+    since = mapping_repo.current_revision()
+    mapping_repo.add_device_access(2, "1")
+    mapping_repo.remove_device_access(2, "1")
+    mapping_repo.add_device_access(3, "1")
+    clock = Clock()
+    clock.now += timedelta(days=31)
+    service = DeviceSyncService(DeviceRepository(), mapping_repo, page_size=100,
+                                settle_seconds=5, clock=clock, retention_days=30)
+
+    assert service.prune_changes() == 3
+
+    result = service.get_changes("FCEE", since)
+    assert result["reset"] is True
+    assert [u["id"] for u in result["upserts"]] == [1, 3]
+    # Desde la última revisión (la que se conserva) sigue siendo un delta
+    assert service.get_changes("FCEE", result["revision"])["reset"] is False
+
+
+def test_delta_collapses_to_last_change_per_user(mapping_repo):
+    """Test por usuario solo cuenta el último cambio desde la revisión pedida"""
+    mapping_repo.add_device_access(1, "1")
+    since = mapping_repo.current_revision()
+    mapping_repo.add_device_access(2, "1")
+    mapping_repo.remove_device_access(1, "1")
+    mapping_repo.add_device_access(3, "1")
+    mapping_repo.remove_device_access(3, "1")
+    mapping_repo.add_device_access(3, "2")  # otro dispositivo
+
+    result = make_service().get_changes("FCEE", since)
+
+    assert result["reset"] is False
+    assert [u["cedula"] for u in result["upserts"]] == ["2222222"]
+    assert sorted(result["deletes"]) == ["1111111", "3333333"]
+    assert result["revision"] == mapping_repo.current_revision()
+
+
+def test_delta_pagination(mapping_repo):
+    """Test con más cambios que el tamaño de página se informa has_more"""
+    mapping_repo.add_device_access(1, "2")
+    since = mapping_repo.current_revision()
+    for user_id in (1, 2, 3):
+        mapping_repo.add_device_access(user_id, "1")
+    service = make_service(page_size=2)
+
+    first = service.get_changes("FCEE", since)
+    assert first["has_more"] is True
+    assert [u["id"] for u in first["upserts"]] == [1, 2]
+
+    second = service.get_changes("FCEE", first["revision"])
+    assert second["has_more"] is False
+    assert [u["id"] for u in second["upserts"]] == [3]
+    assert second["revision"] == mapping_repo.current_revision()
+
+
+def test_recent_changes_wait_to_settle(mapping_repo):
+    """Test los cambios más nuevos que settle_seconds no se entregan todavía"""
+    mapping_repo.add_device_access(1, "2")
+    since = mapping_repo.current_revision()
+    mapping_repo.add_device_access(2, "1")
+    clock = Clock()
+    clock.now = datetime.utcnow()
+
+    result = make_service(clock=clock).get_changes("FCEE", since)
+    assert result["upserts"] == []
+    assert result["revision"] == since
+
+    clock.now += timedelta(seconds=10)
+    assert [u["id"] for u in make_service(clock=clock).get_changes("FCEE", since)["upserts"]] == [2]
+
+
+def test_acknowledge_moves_sync_revision_forward(mapping_repo):
+    """Test el ack actualiza sync_revision y last_sync, y nunca retrocede"""
+    mapping_repo.add_device_access(1, "1")
+    mapping_repo.add_device_access(2, "1")
+    latest = mapping_repo.current_revision()
+    clock = Clock()
+    service = make_service(clock=clock)
+
+    result = service.acknowledge("FCEE", latest)
+    device = Device.get_by_id("1")
+    assert result == {"device": "FCEE", "revision": latest, "updated": True}
+    assert device.sync_revision == latest
+    assert device.last_sync == clock.now
+
+    assert service.acknowledge("FCEE", latest - 1)["updated"] is False
+    assert Device.get_by_id("1").sync_revision == latest
+
+
+@pytest.mark.parametrize("location,revision,error", [
+    ("FCEE", "abc", ValueError),
+    ("FCEE", -1, ValueError),
+    ("FCEE", 999, ValueError),
+    ("desconocido", 0, LookupError),
+])
+def test_acknowledge_invalid(mapping_repo, location, revision, error):
+    """Test revisiones inválidas, futuras o dispositivo inexistente"""
+    with pytest.raises(error):
+        make_service().acknowledge(location, revision)
+
+
+def test_get_changes_unknown_device(setup_db):
+    """Test dispositivo inexistente"""
+    with pytest.raises(LookupError):
+        make_service().get_changes("desconocido", 0)
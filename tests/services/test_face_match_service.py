@@ -0,0 +1,134 @@
+# tests/services/test_face_match_service.py
+import json
+import numpy as np
+import pytest
+from services.face_match_service import FaceIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def random_embeddings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.1, size=(n, 128)).astype(np.float32)
+
+
+@pytest.fixture
+def embeddings():
+    return random_embeddings(50)
+
+
+@pytest.fixture
+def index(embeddings):
+    """Índice con 50 usuarios; los embeddings llegan como JSON, igual que en la BD"""
+    rows = [(user_id, json.dumps(e.tolist())) for user_id, e in enumerate(embeddings, start=1)]
+    loader_calls = []
+
+    def loader():
+        loader_calls.append(1)
+        return iter(rows)
+
+    index = FaceIndex(loader, refresh_seconds=300, clock=FakeClock())
+    index.loader_calls = loader_calls
+    return index
+
+
+def test_loads_lazily_once(index):
+    """Test el índice se carga en la primera consulta y no en cada una"""
+    assert not index.loaded
+
+    index.nearest(np.zeros(128), k=1)
+    index.nearest(np.zeros(128), k=1)
+
+    assert len(index) == 50
+    assert len(index.loader_calls) == 1
+
+
+def test_nearest_matches_brute_force(index, embeddings):
+    """Test top-k coincide con calcular cada distancia por separado"""
+    query = embeddings[7] + 0.01
+
+    result = index.nearest(query, k=3)
+
+    expected = np.linalg.norm(embeddings - query, axis=1)
+    expected_ids = (np.argsort(expected)[:3] + 1).tolist()
+    assert [user_id for user_id, _ in result] == expected_ids
+    assert result[0][1] == pytest.approx(expected.min(), abs=1e-4)
+
+
+def test_identify_with_tolerance(index, embeddings):
+    """Test identify devuelve el usuario solo dentro de la tolerancia"""
+    assert index.identify(embeddings[9])[0] == 10
+    assert index.identify(np.full(128, 5.0)) is None
+
+
+def test_identify_batch(index, embeddings):
+    """Test varias caras en un solo cálculo de distancias"""
+    queries = np.vstack([embeddings[0], embeddings[49], np.full(128, 5.0)])
+
+    assert index.identify_batch(queries) == [1, 50, None]
+
+
+def test_add_and_remove_incrementally(index, embeddings):
+    """Test altas y bajas sin recargar desde la BD"""
+    index.ensure_loaded()
+    new_face = random_embeddings(1, seed=99)[0]
+
+    index.add(100, new_face.tolist())
+    assert index.identify(new_face)[0] == 100
+
+    assert index.remove(1) is True
+    assert index.remove(1) is False
+    assert len(index) == 50
+    assert index.identify(embeddings[0], tolerance=0.01) is None
+    # La fila movida al hueco sigue respondiendo con su usuario
+    assert index.identify(new_face)[0] == 100
+    assert len(index.loader_calls) == 1
+
+
+def test_add_before_load_is_ignored(index):
+    """Test un alta antes de cargar no duplica: la carga la leerá de la BD"""
+    index.add(100, random_embeddings(1)[0])
+
+    assert not index.loaded
+    assert len(index) == 0
+
+
+def test_reload_after_refresh(index):
+    """Test pasado refresh_seconds se recarga desde la BD"""
+    index.ensure_loaded()
+    index._clock.now = 301
+    index.ensure_loaded()
+
+    assert len(index.loader_calls) == 2
+
+
+def test_invalid_embedding(index):
+    """Test embeddings de tamaño incorrecto"""
+    with pytest.raises(ValueError, match="expected 128 floats"):
+        index.nearest([0.1, 0.2])
+
+
+def test_empty_index():
+    """Test sin usuarios no hay coincidencias"""
+    index = FaceIndex(lambda: iter([]))
+
+    assert index.nearest(np.zeros(128)) == []
+    assert index.identify(np.zeros(128)) is None
+    assert index.identify_batch(np.zeros((2, 128))) == [None, None]
+
+
+def test_loads_binary_embeddings(embeddings):
+    """Test el índice acepta el formato binario de face_embedding_bin"""
+    from shared.embeddings import to_bytes
+
+    rows = [(1, memoryview(to_bytes(embeddings[0].tolist()))),
+            (2, json.dumps(embeddings[1].tolist()))]
+    index = FaceIndex(lambda: iter(rows))
+
+    assert index.identify_batch(embeddings[:2]) == [1, 2]
@@ -0,0 +1,99 @@
+# tests/services/test_iot_publisher.py
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+
+from services.iot_publisher import IotPublisher
+
+
+class SlowClient:
+    """Cliente iot-data falso: cada publish tarda `delay` segundos"""
+
+    def __init__(self, delay=0.0, fail=(), block=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.block = set(block)
+        self.release = threading.Event()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def publish(self, topic, qos, payload):
+        with self.lock:
+            self.calls.append((topic, qos, payload))
+        if topic in self.block:
+            self.release.wait(5)
+        time.sleep(self.delay)
+        if topic in self.fail:
+            raise RuntimeError(f"fallo {topic}")
+
+
+def test_payload_serialized_once_as_bytes():
+    """Test el mismo bytes JSON se envía a todos los topics"""
+    client = SlowClient()
+    topics = [f"access/users/new/rpi-{i}" for i in range(5)]
+
+    result = IotPublisher(client).publish_many(topics, {"cedula": "123"})
+
+    assert sorted(result["published"]) == sorted(topics)
+    payloads = {id(payload) for _, _, payload in client.calls}
+    assert len(payloads) == 1
+    assert json.loads(client.calls[0][2]) == {"cedula": "123"}
+    assert all(qos == 1 for _, qos, _ in client.calls)
+
+
+def test_publishes_run_concurrently():
+    """Test N publish lentos tardan bastante menos que N * latencia"""
+    client = SlowClient(delay=0.1)
+    topics = [f"t/{i}" for i in range(8)]
+
+    start = time.monotonic()
+    result = IotPublisher(client).publish_many(topics, "x")
+    elapsed = time.monotonic() - start
+
+    assert len(result["published"]) == 8
+    assert elapsed < 0.5
+
+
+def test_failures_are_collected_per_topic():
+    """Test un topic que falla no corta al resto"""
+    client = SlowClient(fail={"t/1"})
+
+    result = IotPublisher(client).publish_many(["t/0", "t/1", "t/2"], "x")
+
+    assert sorted(result["published"]) == ["t/0", "t/2"]
+    assert list(result["failed"]) == ["t/1"]
+    assert "fallo t/1" in result["failed"]["t/1"]
+    assert result["timed_out"] == []
+
+
+def test_deadline_reports_unconfirmed_topics():
+    """Test lo que no termina antes del deadline queda en timed_out"""
+    client = SlowClient(block={"t/lento"})
+    try:
+        result = IotPublisher(client, deadline_seconds=0.1).publish_many(
+            ["t/ok", "t/lento"], "x")
+    finally:
+        client.release.set()
+
+    assert result["published"] == ["t/ok"]
+    assert result["timed_out"] == ["t/lento"]
+
+
+def test_single_topic_is_published_inline():
+    """Test con un solo topic no se usa el pool"""
+    client = MagicMock()
+    client.publish.side_effect = lambda **kwargs: threading.current_thread().name
+
+    result = IotPublisher(client).publish_many(["t/0"], b"raw")
+
+    client.publish.assert_called_once_with(topic="t/0", qos=1, payload=b"raw")
+    assert result == {"published": ["t/0"], "failed": {}, "timed_out": []}
+
+
+def test_empty_topics():
+    """Test sin topics no se publica nada"""
+    client = MagicMock()
+    assert IotPublisher(client).publish_many([], {"a": 1}) == {
+        "published": [], "failed": {}, "timed_out": []}
+    client.publish.assert_not_called()
@@ -0,0 +1,146 @@
+# tests/services/test_log_export_service.py
+import csv
+import io
+import json
+import pytest
+import uuid
+from datetime import datetime, timezone
+from services.log_export_service import LogExportService
+from services.storage_service import MultipartUpload
+
+
+class MockLog:
+    def __init__(self, n, user_id=None):
+        self.id = uuid.UUID(int=n)
+        self.access_user_id = user_id
+        self.device_id = "1"
+        self.event = "denied" if user_id is None else "accepted"
+        self.timestamp = datetime(2024, 1, 1, 0, n, tzinfo=timezone.utc)
+        self.access_user = None
+        self.device = None
+
+
+class ChunkedRepository:
+    """Repositorio que entrega logs a través de iter_logs y registra los argumentos"""
+
+    def __init__(self, logs):
+        self.logs = logs
+        self.calls = []
+
+    def iter_logs(self, **kwargs):
+        self.calls.append(kwargs)
+        return iter(self.logs)
+
+
+class FakeS3:
+    """Cliente S3 mínimo para multipart uploads en memoria"""
+
+    def __init__(self):
+        self.parts = []
+        self.completed = None
+        self.aborted = False
+
+    def create_multipart_upload(self, **kwargs):
+        self.created = kwargs
+        return {"UploadId": "up-1"}
+
+    def upload_part(self, PartNumber, Body, **kwargs):
+        self.parts.append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, MultipartUpload, **kwargs):
+        self.completed = MultipartUpload["Parts"]
+
+    def abort_multipart_upload(self, **kwargs):
+        self.aborted = True
+
+    @property
+    def body(self):
+        return b"".join(self.parts)
+
+
+class FakeStorage:
+    """Reemplazo de services.storage_service respaldado por FakeS3"""
+
+    def __init__(self):
+        self.client = FakeS3()
+
+    def MultipartUpload(self, key, content_type):
+        self.key = key
+        return MultipartUpload(key, content_type=content_type, client=self.client, bucket="test-bucket")
+
+    def presigned_get_url(self, key, expires_in):
+        return f"https://test-bucket.s3.amazonaws.com/{key}?expires={expires_in}"
+
+
+def test_export_ndjson():
+    """Test exportación NDJSON: una línea por log y URL firmada"""
+    logs = [MockLog(1, 66), MockLog(2)]
+    repo = ChunkedRepository(logs)
+    storage = FakeStorage()
+    service = LogExportService(repo, storage=storage, chunk_size=500, url_expires_in=600)
+
+    result = service.export_logs(user_id="66", event="accepted", start="2024-01-01T00:00:00Z")
+
+    assert result["rows"] == 2
+    assert result["format"] == "ndjson"
+    assert result["key"].startswith("exports/access_logs/") and result["key"].endswith(".ndjson")
+    assert result["url"].endswith("expires=600")
+    assert repo.calls[0]["user_id"] == 66
+    assert repo.calls[0]["chunk_size"] == 500
+    assert repo.calls[0]["start"] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    lines = storage.client.body.decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [str(log.id) for log in logs]
+    assert storage.client.created["ContentType"] == "application/x-ndjson"
+
+
+def test_export_csv():
+    """Test exportación CSV con encabezado"""
+    storage = FakeStorage()
+    service = LogExportService(ChunkedRepository([MockLog(1, 66)]), storage=storage)
+
+    result = service.export_logs(fmt="csv")
+
+    rows = list(csv.reader(io.StringIO(storage.client.body.decode())))
+    assert rows[0][0] == "id"
+    assert rows[1][1] == "66"
+    assert result["rows"] == 1
+    assert result["key"].endswith(".csv")
+
+
+def test_export_invalid_format():
+    """Test formato desconocido lanza ValueError antes de tocar S3"""
+    storage = FakeStorage()
+    service = LogExportService(ChunkedRepository([]), storage=storage)
+
+    with pytest.raises(ValueError, match="format"):
+        service.export_logs(fmt="xlsx")
+    assert storage.client.parts == []
+
+
+def test_multipart_upload_bounds_buffer():
+    """Test las partes se suben al llenarse el buffer y el resto al completar"""
+    client = FakeS3()
+    part_size = 5 * 1024 * 1024
+
+    with MultipartUpload("k", client=client, bucket="b", part_size=part_size) as upload:
+        for _ in range(11):
+            upload.write(b"x" * (1024 * 1024))
+        assert len(upload._buffer) < part_size
+
+    assert [len(p) for p in client.parts] == [part_size, part_size, 1024 * 1024]
+    assert [p["PartNumber"] for p in client.completed] == [1, 2, 3]
+
+
+def test_multipart_upload_aborts_on_error():
+    """Test una excepción durante la escritura aborta el upload"""
+    client = FakeS3()
+
+    with pytest.raises(RuntimeError):
+        with MultipartUpload("k", client=client, bucket="b") as upload:
+            upload.write(b"data")
+            raise RuntimeError("fallo de BD")
+
+    assert client.aborted is True
+    assert client.completed is None
@@ -0,0 +1,210 @@
+# tests/services/test_outbox_service.py
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from shared.models import db, OutboxMessage
+from repositories.outbox_repo import OutboxRepository
+from services.outbox_service import OutboxDrainer
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 1, 12, 0, 0)
+
+    def __call__(self):
+        return self.now
+
+
+class FakePublisher:
+    """IotPublisher falso: registra los publish y falla los topics indicados"""
+
+    def __init__(self, fail=(), timeout=()):
+        self.fail = set(fail)
+        self.timeout = set(timeout)
+        self.calls = []
+
+    def publish_many(self, topics, payload):
+        self.calls.append((list(topics), payload))
+        result = {"published": [], "failed": {}, "timed_out": []}
+        for topic in topics:
+            if topic in self.fail:
+                result["failed"][topic] = "boom"
+            elif topic in self.timeout:
+                result["timed_out"].append(topic)
+            else:
+                result["published"].append(topic)
+        return result
+
+
+@pytest.fixture
+def repo():
+    db.connect()
+    db.create_tables([OutboxMessage])
+    yield OutboxRepository()
+    db.drop_tables([OutboxMessage])
+    db.close()
+
+
+def make_drainer(repo, publisher, clock, **kwargs):
+    kwargs.setdefault("backoff_base", 2)
+    kwargs.setdefault("backoff_max", 60)
+    kwargs.setdefault("max_attempts", 3)
+    return OutboxDrainer(repo, publisher, clock=clock, **kwargs)
+
+
+def test_drain_publishes_and_deletes(repo):
+    """Test mismo payload a varias puertas sale en un solo fan-out"""
+    clock = Clock()
+    repo.enqueue("access/users/new", {"cedula": "1"}, ["FCEE", "lab1"], now=clock.now)
+    publisher = FakePublisher()
+
+    stats = make_drainer(repo, publisher, clock).drain()
+
+    assert stats == {"claimed": 2, "published": 2, "retried": 0, "dead": 0}
+    assert len(publisher.calls) == 1
+    topics, payload = publisher.calls[0]
+    assert sorted(topics) == ["access/users/new/FCEE", "access/users/new/lab1"]
+    assert json.loads(payload) == {"cedula": "1"}
+    assert repo.count_pending() == 0
+
+
+def test_drain_keeps_order_per_location(repo):
+    """Test la baja sale antes que el alta en la misma puerta"""
+    clock = Clock()
+    repo.enqueue("access/users/delete", {"cedula": "1"}, ["FCEE"], now=clock.now)
+    repo.enqueue("access/users/new", {"cedula": "1"}, ["FCEE"], now=clock.now)
+    publisher = FakePublisher()
+
+    make_drainer(repo, publisher, clock).drain()
+
+    assert [c[0] for c in publisher.calls] == [
+        ["access/users/delete/FCEE"], ["access/users/new/FCEE"]]
+
+
+def test_failed_publish_retries_with_backoff(repo):
+    """Test un fallo posterga el mensaje con backoff exponencial"""
+    clock = Clock()
+    repo.enqueue("t", {}, ["FCEE", "lab1"], now=clock.now)
+    publisher = FakePublisher(fail={"t/FCEE"}, timeout={"t/lab1"})
+    drainer = make_drainer(repo, publisher, clock)
+
+    stats = drainer.drain()
+    assert stats == {"claimed": 2, "published": 0, "retried": 2, "dead": 0}
+
+    message = OutboxMessage.get(OutboxMessage.location == "FCEE")
+    assert message.attempts == 1
+    assert message.last_error == "boom"
+    assert message.available_at == clock.now + timedelta(seconds=2)
+    assert OutboxMessage.get(OutboxMessage.location == "lab1").last_error == "deadline exceeded"
+
+    # Antes del backoff no se reintenta; después sí
+    assert drainer.drain()["claimed"] == 0
+    clock.now += timedelta(seconds=2)
+    drainer.drain()
+    assert OutboxMessage.get(OutboxMessage.location == "FCEE").available_at == \
+        clock.now + timedelta(seconds=4)
+
+
+def test_message_dead_after_max_attempts(repo):
+    """Test agotados los intentos el mensaje queda 'dead' y no bloquea la puerta"""
+    clock = Clock()
+    repo.enqueue("a", {}, ["FCEE"], now=clock.now)
+    repo.enqueue("b", {}, ["FCEE"], now=clock.now)
+    publisher = FakePublisher(fail={"a/FCEE"})
+    drainer = make_drainer(repo, publisher, clock, max_attempts=2)
+
+    drainer.drain()
+    clock.now += timedelta(minutes=5)
+    stats = drainer.drain()
+
+    assert stats["dead"] == 1
+    assert OutboxMessage.get(OutboxMessage.topic == "a/FCEE").status == "dead"
+    clock.now += timedelta(minutes=5)
+    drainer.drain()
+    assert ["b/FCEE"] in [c[0] for c in publisher.calls]
+    assert repo.count_pending() == 0
+
+
+def test_drain_stops_when_time_runs_out(repo):
+    """Test no empieza otro lote si queda poco tiempo de ejecución"""
+    clock = Clock()
+    repo.enqueue("a", {}, ["FCEE"], now=clock.now)
+    repo.enqueue("b", {}, ["FCEE"], now=clock.now)
+    publisher = FakePublisher()
+
+    stats = make_drainer(repo, publisher, clock).drain(time_left=lambda: 5)
+
+    assert stats["published"] == 1
+    assert repo.count_pending() == 1
+
+
+def test_claim_is_committed_before_publishing(repo):
+    """Test si la corrida muere publicando, el intento queda contado"""
+    clock = Clock()
+    repo.enqueue("a", {}, ["FCEE"], now=clock.now)
+
+    class CrashingPublisher:
+        def publish_many(self, topics, payload):
+            assert not db.in_transaction()  # sin locks mientras se publica
+            raise TimeoutError("Lambda timeout")
+
+    drainer = make_drainer(repo, CrashingPublisher(), clock, max_attempts=2)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            drainer.drain()
+        clock.now += timedelta(seconds=repo.lease_seconds)
+    assert OutboxMessage.get(OutboxMessage.topic == "a/FCEE").attempts == 2
+
+    # Agotados los intentos no se vuelve a publicar
+    stats = drainer.drain()
+    assert stats == {"claimed": 1, "published": 0, "retried": 0, "dead": 1}
+    assert OutboxMessage.get(OutboxMessage.topic == "a/FCEE").status == "dead"
+
+
+def test_deliver_publishes_in_order_after_commit(repo):
+    """Test la publicación inmediata respeta baja antes que alta por puerta"""
+    clock = Clock()
+    messages = repo.enqueue_claimed("access/users/delete", {"cedula": "1"},
+                                    ["FCEE", "lab1"], now=clock.now)
+    messages += repo.enqueue_claimed("access/users/new", {"cedula": "1"},
+                                     ["FCEE"], now=clock.now)
+    publisher = FakePublisher()
+
+    assert make_drainer(repo, publisher, clock).deliver(messages) == []
+
+    assert [sorted(c[0]) for c in publisher.calls] == [
+        ["access/users/delete/FCEE", "access/users/delete/lab1"],
+        ["access/users/new/FCEE"]]
+    assert repo.count_pending() == 0
+
+
+def test_deliver_leaves_failures_to_drainer(repo):
+    """Test lo no entregado (o detrás de un pendiente anterior) queda para el drainer"""
+    clock = Clock()
+    repo.enqueue("old", {}, ["lab1"], now=clock.now + timedelta(seconds=10))
+    messages = repo.enqueue_claimed("a", {}, ["FCEE", "lab1"], now=clock.now)
+    messages += repo.enqueue_claimed("b", {}, ["FCEE"], now=clock.now)
+    publisher = FakePublisher(fail={"a/FCEE"})
+    drainer = make_drainer(repo, publisher, clock)
+
+    undelivered = drainer.deliver(messages)
+
+    assert sorted(m.topic for m in undelivered) == ["a/FCEE", "a/lab1", "b/FCEE"]
+    assert [c[0] for c in publisher.calls] == [["a/FCEE"]]
+    assert OutboxMessage.get(OutboxMessage.topic == "a/FCEE").attempts == 1
+    # El drainer los entrega en orden por puerta cuando vencen backoff y pendientes
+    publisher.fail.clear()
+    clock.now += timedelta(seconds=10)
+    drainer.drain()
+    assert repo.count_pending() == 0
+    sent = [topic for topics, _ in publisher.calls[1:] for topic in topics]
+    assert [t for t in sent if t.endswith("/FCEE")] == ["a/FCEE", "b/FCEE"]
+    assert [t for t in sent if t.endswith("/lab1")] == ["old/lab1", "a/lab1"]
+
+
+def test_backoff_is_capped():
+    """Test el backoff se duplica hasta el tope"""
+    drainer = OutboxDrainer(None, None, backoff_base=2, backoff_max=10)
+    assert [drainer.backoff(n) for n in (1, 2, 3, 4)] == [2, 4, 8, 10]
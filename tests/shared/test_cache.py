@@ -0,0 +1,82 @@
+# tests/shared/test_cache.py
+from shared.cache import MISSING, BloomFilter, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_miss_and_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+
+    assert cache.get("a") is MISSING
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+
+    clock.now = 61
+    assert cache.get("a") is MISSING
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 0}
+
+
+def test_negative_results_use_negative_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=300, negative_ttl=30, clock=clock)
+
+    cache.set("desconocido", None)
+    assert cache.get("desconocido") is None
+
+    clock.now = 31
+    assert cache.get("desconocido") is MISSING
+
+
+def test_negative_results_not_cached_without_negative_ttl():
+    cache = TTLCache(ttl=300)
+
+    cache.set("desconocido", None)
+
+    assert cache.get("desconocido") is MISSING
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # "a" pasa a ser la más reciente
+    cache.set("c", 3)       # expulsa "b"
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_get_or_load_and_invalidate():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return key.upper()
+
+    assert cache.get_or_load("x", loader) == "X"
+    assert cache.get_or_load("x", loader) == "X"
+    assert calls == ["x"]
+
+    cache.invalidate("x")
+    cache.get_or_load("x", loader)
+    assert calls == ["x", "x"]
+
+
+def test_bloom_filter_membership():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"ced-{i}")
+
+    assert all(f"ced-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"otro-{i}" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% esperado
+    assert not bloom.saturated
@@ -0,0 +1,132 @@
+# tests/shared/test_connection.py
+import json
+import pytest
+from peewee import OperationalError, SqliteDatabase
+from shared.connection import ConnectionManager, db_connection, get_manager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def database():
+    database = SqliteDatabase(":memory:")
+    yield database
+    if not database.is_closed():
+        database.close()
+
+
+def test_connection_kept_across_invocations(database):
+    """Test la conexión se abre una vez y se reutiliza en invocaciones warm"""
+    manager = ConnectionManager(database, healthcheck_interval=30, keep_alive=True)
+
+    for _ in range(3):
+        manager.acquire()
+        database.execute_sql("SELECT 1")
+        manager.release()
+
+    assert manager.connects == 1
+    assert not database.is_closed()
+
+
+def test_keep_alive_disabled_closes(database):
+    """Test DB_KEEP_ALIVE=0 conserva el comportamiento de cerrar por invocación"""
+    manager = ConnectionManager(database, keep_alive=False)
+
+    manager.acquire()
+    manager.release()
+    manager.acquire()
+    manager.release()
+
+    assert manager.connects == 2
+    assert database.is_closed()
+
+
+def test_healthcheck_only_after_idle(database, monkeypatch):
+    """Test el SELECT 1 solo se hace tras superar el intervalo de inactividad"""
+    clock = FakeClock()
+    manager = ConnectionManager(database, healthcheck_interval=30, keep_alive=True, clock=clock)
+    manager.acquire()
+    manager.release()
+
+    executed = []
+    original = database.execute_sql
+    monkeypatch.setattr(database, "execute_sql",
+                        lambda sql, *a, **kw: executed.append(sql) or original(sql, *a, **kw))
+
+    clock.now = 10
+    manager.acquire()
+    manager.release()
+    assert executed == []
+
+    clock.now = 100
+    manager.acquire()
+    assert executed == ["SELECT 1"]
+    assert manager.reconnects == 0
+
+
+def test_broken_connection_reconnects(database, monkeypatch):
+    """Test si el health check falla con OperationalError se reconecta"""
+    clock = FakeClock()
+    manager = ConnectionManager(database, healthcheck_interval=30, keep_alive=True, clock=clock)
+    manager.acquire()
+    manager.release()
+    old_conn = database.connection()
+
+    def broken(sql, *args, **kwargs):
+        raise OperationalError("server closed the connection unexpectedly")
+
+    monkeypatch.setattr(database, "execute_sql", broken)
+    clock.now = 100
+    manager.acquire()
+
+    assert manager.reconnects == 1
+    assert not database.is_closed()
+    assert database.connection() is not old_conn
+
+
+def test_decorator_returns_500_when_connect_fails(database, monkeypatch):
+    """Test el decorador responde 500 si no puede obtener la conexión"""
+    def fail():
+        raise OperationalError("could not connect to server")
+
+    monkeypatch.setattr(database, "connect", fail)
+
+    @db_connection(database)
+    def handler(event, context):
+        raise AssertionError("no debería ejecutarse")
+
+    response = handler({}, None)
+
+    assert response["statusCode"] == 500
+    assert "could not connect" in json.loads(response["body"])["error"]
+
+
+def test_decorator_shares_manager_per_database(database):
+    """Test todos los handlers de una misma BD comparten el manager"""
+    @db_connection(database)
+    def handler(event, context):
+        return database.execute_sql("SELECT 1").fetchone()[0]
+
+    assert handler({}, None) == 1
+    assert handler({}, None) == 1
+    assert get_manager(database).connects == 1
+    assert not database.is_closed()
+
+
+def test_expired_connection_is_recycled(database, monkeypatch):
+    """Test una conexión que superó su vida máxima se recicla antes de usarla"""
+    manager = ConnectionManager(database, keep_alive=True)
+    manager.acquire()
+    manager.release()
+
+    monkeypatch.setattr(database, "connection_expired", lambda: True, raising=False)
+    manager.acquire()
+
+    assert manager.reconnects == 1
+    assert not database.is_closed()
@@ -0,0 +1,158 @@
+# tests/shared/test_db.py
+import pytest
+from shared.db import (
+    Engine,
+    ExternalPoolerBackend,
+    PoolBackend,
+    create_engine,
+    db_settings,
+)
+from shared.models import EngineDatabase
+
+
+class FakeConn:
+    def __init__(self, n):
+        self.n = n
+        self.closed = 0
+        self.autocommit = False
+        self.server_version = 150000
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool:
+    """Imita ThreadedConnectionPool: reutiliza conexiones devueltas"""
+
+    def __init__(self, minconn, maxconn, **settings):
+        self.settings = settings
+        self.idle = []
+        self.created = 0
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.created += 1
+        return FakeConn(self.created)
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.close()
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        self.idle.clear()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool_backend(max_age=900, clock=None):
+    return PoolBackend({"host": "db"}, max_age=max_age,
+                       clock=clock or FakeClock(), pool_factory=FakePool)
+
+
+def test_db_settings_password_and_statement_timeout(monkeypatch):
+    """Test DB_PASS (serverless.yml) como alternativa a DB_PASSWORD y statement_timeout"""
+    monkeypatch.delenv("DB_PASSWORD", raising=False)
+    monkeypatch.setenv("DB_PASS", "secreto")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+
+    settings = db_settings()
+
+    assert settings["password"] == "secreto"
+    assert settings["options"] == "-c statement_timeout=5000"
+
+
+def test_pool_backend_reuses_connections():
+    """Test el pool en proceso reutiliza la conexión devuelta"""
+    backend = make_pool_backend()
+
+    conn = backend.getconn()
+    backend.putconn(conn)
+
+    assert backend.getconn() is conn
+    assert backend._pool.created == 1
+
+
+def test_pool_backend_recycles_after_max_age():
+    """Test conexiones más viejas que max_age se cierran y se reemplazan"""
+    clock = FakeClock()
+    backend = make_pool_backend(max_age=60, clock=clock)
+    conn = backend.getconn()
+    backend.putconn(conn)
+
+    clock.now = 61
+    assert backend.expired(conn)
+    fresh = backend.getconn()
+
+    assert fresh is not conn
+    assert conn.closed
+    assert not backend.expired(fresh)
+
+
+def test_external_backend_closes_on_put():
+    """Test con pooler externo la conexión se cierra al devolverla"""
+    opened = []
+
+    def connect(**settings):
+        opened.append(FakeConn(len(opened) + 1))
+        return opened[-1]
+
+    backend = ExternalPoolerBackend({"host": "proxy"}, connect=connect)
+    conn = backend.getconn()
+    backend.putconn(conn)
+
+    assert conn.closed
+    assert backend.getconn() is not conn
+
+
+def test_engine_connection_commits_or_rolls_back():
+    """Test el context manager de SQL crudo hace commit o rollback"""
+    engine = Engine(make_pool_backend())
+
+    with engine.connection() as conn:
+        pass
+    assert conn.commits == 1 and conn.autocommit is False
+
+    with pytest.raises(RuntimeError):
+        with engine.connection() as conn:
+            raise RuntimeError("fallo")
+    assert conn.rollbacks == 1
+    assert not conn.closed  # vuelve al pool
+
+
+def test_create_engine_invalid_backend():
+    """Test backend desconocido"""
+    with pytest.raises(ValueError, match="DB_POOL_BACKEND"):
+        create_engine("pgbouncer-local", settings={})
+
+
+def test_engine_database_draws_from_engine():
+    """Test Peewee y el SQL crudo comparten las conexiones del Engine"""
+    engine = Engine(make_pool_backend())
+    database = EngineDatabase("test", engine=engine)
+
+    database.connect()
+    conn = database.connection()
+    assert conn.autocommit is True
+    database.close()
+
+    # La misma conexión vuelve al pool y la puede usar un repositorio de SQL crudo
+    with engine.connection() as raw:
+        assert raw is conn
+        assert raw.autocommit is False
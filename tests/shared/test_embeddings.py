@@ -0,0 +1,95 @@
+# tests/shared/test_embeddings.py
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from shared.embeddings import EMBEDDING_BYTES, from_bytes, iot_fields, to_bytes, to_list
+from shared.migrations import backfill_face_embedding_bin
+from shared.models import db, AccessUser
+
+EMBEDDING = [i / 256 for i in range(128)]  # representables exactos en float32
+
+
+def test_roundtrip_512_bytes():
+    """Test el binario ocupa 512 bytes y se decodifica igual"""
+    blob = to_bytes(EMBEDDING)
+
+    assert len(blob) == EMBEDDING_BYTES
+    assert to_list(blob) == EMBEDDING
+    assert to_bytes(json.dumps(EMBEDDING)) == blob
+    assert len(blob) < len(json.dumps(EMBEDDING)) / 2
+
+
+def test_from_bytes_is_zero_copy():
+    """Test np.frombuffer devuelve una vista sobre el mismo buffer"""
+    blob = to_bytes(EMBEDDING)
+
+    vector = from_bytes(blob)
+
+    assert vector.dtype == np.dtype("<f4")
+    assert not vector.flags.owndata
+    assert not vector.flags.writeable
+    np.testing.assert_array_equal(vector, np.array(EMBEDDING, dtype=np.float32))
+
+
+def test_invalid_sizes():
+    """Test embeddings o blobs de tamaño incorrecto"""
+    with pytest.raises(ValueError, match="expected 128 floats"):
+        to_bytes([0.1, 0.2])
+    with pytest.raises(ValueError, match="expected 512 bytes"):
+        to_list(b"\x00" * 10)
+
+
+def test_iot_fields_json_keeps_current_payload():
+    """Test por defecto el payload MQTT no cambia"""
+    assert iot_fields(embedding=EMBEDDING, fmt="json") == {"face_embedding": EMBEDDING}
+    assert iot_fields(json_text="[0.1]", fmt="json") == {"face_embedding": "[0.1]"}
+    assert iot_fields(blob=to_bytes(EMBEDDING), fmt="json") == {"face_embedding": EMBEDDING}
+
+
+def test_iot_fields_base64(monkeypatch):
+    """Test IOT_EMBEDDING_FORMAT=base64 envía los 512 bytes en base64"""
+    monkeypatch.setenv("IOT_EMBEDDING_FORMAT", "base64")
+
+    fields = iot_fields(json_text=json.dumps(EMBEDDING))
+
+    assert set(fields) == {"face_embedding_b64"}
+    assert base64.b64decode(fields["face_embedding_b64"]) == to_bytes(EMBEDDING)
+    assert iot_fields(blob=to_bytes(EMBEDDING)) == fields
+    # Un embedding corrupto se envía como estaba
+    assert iot_fields(json_text="[0.1]") == {"face_embedding": "[0.1]"}
+
+
+@pytest.fixture
+def legacy_users():
+    """access_users sin la columna face_embedding_bin (esquema anterior)"""
+    db.connect()
+    db.execute_sql(
+        "CREATE TABLE access_users (id INTEGER PRIMARY KEY, first_name VARCHAR(255), "
+        "last_name VARCHAR(255), cedula VARCHAR(255) UNIQUE, rfid VARCHAR(255), "
+        "image_ref VARCHAR(255), face_embedding TEXT, created_at DATETIME)")
+    rows = [(1, "1111111", json.dumps(EMBEDDING)), (2, "2222222", None),
+            (3, "3333333", "[0.5]"), (4, "4444444", json.dumps(EMBEDDING[::-1]))]
+    for user_id, cedula, embedding in rows:
+        db.execute_sql("INSERT INTO access_users (id, cedula, face_embedding) VALUES (?, ?, ?)",
+                       (user_id, cedula, embedding))
+    yield
+    db.drop_tables([AccessUser])
+    db.close()
+
+
+def test_backfill_adds_column_and_fills(legacy_users):
+    """Test la migración agrega la columna y completa los embeddings válidos"""
+    backfill_face_embedding_bin(batch_size=2)
+
+    blobs = {u.id: u.face_embedding_bin for u in AccessUser.select().order_by(AccessUser.id)}
+    assert to_list(blobs[1]) == EMBEDDING
+    assert blobs[2] is None  # sin embedding
+    assert blobs[3] is None  # embedding inválido
+    assert to_list(blobs[4]) == EMBEDDING[::-1]
+
+    # Idempotente
+    backfill_face_embedding_bin()
+    assert to_list(AccessUser.get_by_id(1).face_embedding_bin) == EMBEDDING
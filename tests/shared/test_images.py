@@ -0,0 +1,55 @@
+# tests/shared/test_images.py
+import struct
+
+import pytest
+
+from shared.images import downscale_ratio, jpeg_dimensions, reduction_factor, scale_box
+
+
+def segment(marker: int, payload: bytes) -> bytes:
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def fake_jpeg(width: int, height: int, sof: int = 0xC0) -> bytes:
+    """Encabezado JPEG mínimo: SOI, APP0, DHT y SOF con el tamaño"""
+    return (
+        b"\xff\xd8"
+        + segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00")
+        + segment(0xC4, b"\x00" * 17)
+        + segment(sof, b"\x08" + struct.pack(">HH", height, width) + b"\x03" + b"\x00" * 9)
+        + segment(0xDA, b"\x00" * 10)
+    )
+
+
+def test_jpeg_dimensions_baseline_and_progressive():
+    """Test tamaño desde SOF0 (baseline) y SOF2 (progresivo), salteando DHT"""
+    assert jpeg_dimensions(fake_jpeg(4032, 3024)) == (4032, 3024)
+    assert jpeg_dimensions(fake_jpeg(640, 480, sof=0xC2)) == (640, 480)
+
+
+def test_jpeg_dimensions_invalid():
+    """Test bytes que no son JPEG o sin SOF"""
+    assert jpeg_dimensions(b"\x89PNG\r\n\x1a\n") is None
+    assert jpeg_dimensions(b"\xff\xd8" + segment(0xDA, b"\x00" * 4)) is None
+    assert jpeg_dimensions(fake_jpeg(4032, 3024)[:30]) is None
+
+
+@pytest.mark.parametrize("width,height,min_side,expected", [
+    (4032, 3024, 1600, 2),
+    (4032, 3024, 480, 8),
+    (1200, 900, 1600, 1),
+    (4032, 3024, 0, 1),
+])
+def test_reduction_factor(width, height, min_side, expected):
+    """Test el mayor factor de libjpeg que respeta el lado mínimo"""
+    assert reduction_factor(width, height, min_side) == expected
+
+
+def test_downscale_ratio_and_scale_box():
+    """Test las cajas detectadas en la imagen chica vuelven a la original"""
+    ratio = downscale_ratio(2000, 1500, 500)
+    assert ratio == 0.25
+    assert downscale_ratio(400, 300, 500) == 1.0
+
+    assert scale_box((10, 60, 70, 20), ratio, 2000, 1500) == (40, 240, 280, 80)
+    assert scale_box((0, 500, 375, 0), ratio, 2000, 1500) == (0, 2000, 1500, 0)